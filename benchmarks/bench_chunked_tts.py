@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compares whole-reply TTS against sentence-chunked TTS using a local fake
+ElevenLabs server. For each mode it reports the time until Twilio could fetch
+the first audio byte and the time until the whole reply is available.
+
+    python benchmarks/bench_chunked_tts.py --latency 0.3 --cps 40
+
+Run from the repository root.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubTTSServer  # noqa: E402
+
+REPLIES = [
+    "Ah, you again. I was hoping for a quieter eternity. What do you want now?",
+    "Free will was a design choice. Honestly, I regret it. Next question, please.",
+    "Love is patient. I am not. Make it quick, mortal.",
+]
+
+def fetch(client, callgod, audio_file):
+    start = time.time()
+    response = client.get(f"/static/{os.path.relpath(audio_file, callgod.STATIC_DIR)}")
+    response.get_data()
+    return time.time() - start
+
+def run_whole(callgod, client, text):
+    start = time.time()
+    audio_file = callgod.audio_store.get_or_render(text)
+    fetch(client, callgod, audio_file)
+    elapsed = time.time() - start
+    return elapsed, elapsed
+
+def run_chunked(callgod, client, text):
+    start = time.time()
+    files = callgod.generate_tts_chunked(text)
+    first_byte = None
+    for audio_file in files:
+        fetch(client, callgod, audio_file)
+        if first_byte is None:
+            first_byte = time.time() - start
+    return first_byte, time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub time to first byte (s)")
+    parser.add_argument("--cps", type=float, default=40.0, help="Stub synthesis speed (chars/s)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server = StubTTSServer(latency=args.latency, chars_per_second=args.cps).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["ELEVENLABS_API_BASE"] = server.url
+
+    import callgod
+    callgod.DEBUG = False
+    callgod.debug_log = lambda *args, **kwargs: None
+    client = callgod.app.test_client()
+
+    results = {"whole": [], "chunked": []}
+    with tempfile.TemporaryDirectory() as base_dir:
+        callgod.BASE_DIR = base_dir
+        callgod.STATIC_DIR = os.path.join(base_dir, "static")
+        callgod.CACHE_DIR = os.path.join(callgod.STATIC_DIR, "cached_responses")
+        os.makedirs(callgod.CACHE_DIR)
+        callgod.audio_store = callgod.AudioStore(callgod.CACHE_DIR)
+        for run in range(args.runs):
+            for mode, runner in (("whole", run_whole), ("chunked", run_chunked)):
+                # Audio is keyed per voice, so a fresh voice id keeps every render a cache miss
+                callgod.current_voice = f"bench-{mode}-{run}"
+                for text in REPLIES:
+                    results[mode].append(runner(callgod, client, text))
+
+    server.stop()
+    print(f"{'mode':<10}{'first byte p50 (ms)':>22}{'total p50 (ms)':>18}")
+    for mode, samples in results.items():
+        first = statistics.median(sample[0] for sample in samples) * 1000
+        total = statistics.median(sample[1] for sample in samples) * 1000
+        print(f"{mode:<10}{first:>22.0f}{total:>18.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Simulates a spike of callers asking the same question at the same moment and
+counts how many OpenAI and ElevenLabs calls reach the (stub) providers. With
+single-flight coalescing every burst should cost one call per provider,
+however many callers are in it.
+
+    python benchmarks/bench_coalescing.py --callers 16 --bursts 5
+
+Each burst uses a fresh prompt, so every burst starts with a cold cache.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubOpenAIServer, StubTTSServer  # noqa: E402
+
+def ask(callgod, prompt, voice, barrier, results, index):
+    barrier.wait()
+    start = time.perf_counter()
+    reply = callgod.get_chatgpt_response(prompt, voice=voice)
+    path = callgod.audio_store.get_or_render(reply, voice)
+    results[index] = (time.perf_counter() - start, path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=16, help="concurrent callers per burst")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub provider latency (seconds)")
+    args = parser.parse_args()
+
+    tts_server = StubTTSServer(latency=args.latency).start()
+    openai_server = StubOpenAIServer(latency=args.latency).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ["ELEVENLABS_API_BASE"] = tts_server.url
+    os.environ["OPENAI_API_BASE"] = f"{openai_server.url}/v1"
+
+    import callgod
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        callgod.audio_store = callgod.AudioStore(base_dir)
+        callgod.response_cache = callgod.ResponseCache(os.path.join(base_dir, "responses.db"))
+        voice = callgod.current_voice
+        latencies, missing = [], 0
+        for burst in range(args.bursts):
+            prompt = f"what is the meaning of life number {burst} {time.time()}"
+            barrier = threading.Barrier(args.callers)
+            results = [None] * args.callers
+            threads = [threading.Thread(target=ask, args=(callgod, prompt, voice, barrier, results, i))
+                       for i in range(args.callers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            latencies.extend(seconds for seconds, _ in results)
+            missing += sum(1 for _, path in results if not path or not os.path.exists(path))
+
+    tts_server.stop()
+    openai_server.stop()
+
+    requests = args.callers * args.bursts
+    print(f"caller requests        {requests:6d}")
+    print(f"OpenAI calls           {openai_server.request_count:6d}")
+    print(f"ElevenLabs calls       {tts_server.request_count:6d}")
+    print(f"coalesced (llm / tts)  {callgod.llm_flight.counters['coalesced']:6d} / "
+          f"{callgod.tts_flight.counters['coalesced']}")
+    print(f"callers without audio  {missing:6d}")
+    print(f"max caller latency     {max(latencies):6.2f} s")
+
+if __name__ == "__main__":
+    main()
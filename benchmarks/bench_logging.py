@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Measures how much time debug logging adds to a /voice request on the request
+thread: the old debug_log (open, append, close and print on every call, with
+indented JSON) versus callgod's queued logger with debug enabled and disabled.
+
+    python benchmarks/bench_logging.py --requests 2000
+
+A simulated request makes the same debug_log calls as a typical /voice turn.
+The queued numbers exclude the listener thread, which formats and writes the
+records in the background while requests wait (--gap); the time it needs to
+flush whatever is still queued is printed separately. With --gap 0 the
+listener competes with the request thread for the GIL.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUEST_LOGS = [
+    ("Session loaded", {"CallSid": "CA0123456789abcdef", "Voice": "Nikki", "Mode": "normal"}),
+    ("Classified intent", {"Intent": "chat", "Dynamic": False}),
+    ("Cache miss for prompt: what is the meaning of life", None),
+    ("ChatGPT request", {"Model": "gpt-3.5-turbo", "Max Tokens": 60, "History Turns": 2}),
+    ("ChatGPT response received", {"Latency": 0.8123, "Characters": 142}),
+    ("Generating TTS for: Forty-two, obviously. Next question.", None),
+    ("TTS streaming completed", {"File": "static/cached_responses/nikki/ab12cd34.mp3", "Latency": 0.4521}),
+    ("Voice request processed", {
+        "User Input": "what is the meaning of life",
+        "AI Response": "Forty-two, obviously. Next question.",
+        "Audio Files": ["static/cached_responses/nikki/ab12cd34.mp3"],
+        "Latencies": {"ChatGPT": 0.8123, "TTS": 0.4521, "Total": 1.3011},
+        "Turn": 3,
+    }),
+]
+
+def legacy_debug_log(log_file):
+    def debug_log(message, structured_data=None):
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        if structured_data:
+            formatted_data = json.dumps(structured_data, indent=4)
+            log_message = f"{timestamp} DEBUG: {message}\n{formatted_data}"
+        else:
+            log_message = f"{timestamp} DEBUG: {message}"
+        with open(log_file, "a") as log:
+            log.write(log_message + "\n")
+        print(log_message)
+    return debug_log
+
+def run_requests(debug_log, requests, gap):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        for message, data in REQUEST_LOGS:
+            debug_log(message, dict(data) if data else None)
+        samples.append(time.perf_counter() - start)
+        # Real requests spend most of their time waiting on the providers
+        time.sleep(gap)
+    return samples
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<26}{statistics.mean(samples) * 1e6:>12.1f}{statistics.median(samples) * 1e6:>12.1f}{p95 * 1e6:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--gap", type=float, default=0.001, help="seconds of idle time between requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, "w") as devnull:
+        os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+        import callgod
+        # Send the queued logger's output to the scratch directory instead of app_debug.log
+        callgod.stop_logging()
+        file_handler = RotatingFileHandler(os.path.join(work_dir, "queued.log"),
+                                           maxBytes=callgod.LOG_MAX_BYTES, backupCount=callgod.LOG_BACKUP_COUNT)
+        file_handler.setFormatter(callgod.JsonLineFormatter())
+        console_handler = logging.StreamHandler(devnull)
+        console_handler.setFormatter(callgod.ConsoleFormatter("%(asctime)s - %(levelname)s - %(message)s"))
+        callgod.log_handlers[:] = [file_handler, console_handler]
+        callgod.start_logging()
+
+        with contextlib.redirect_stdout(devnull):
+            legacy = run_requests(legacy_debug_log(os.path.join(work_dir, "legacy.log")), args.requests, args.gap)
+
+        callgod.logger.setLevel(logging.DEBUG)
+        queued = run_requests(callgod.debug_log, args.requests, args.gap)
+        start = time.perf_counter()
+        callgod.stop_logging()
+        drain = time.perf_counter() - start
+        callgod.start_logging()
+
+        callgod.logger.setLevel(logging.INFO)
+        disabled = run_requests(callgod.debug_log, args.requests, args.gap)
+        callgod.stop_logging()
+
+        print(f"{len(REQUEST_LOGS)} debug_log calls per request, {args.requests} requests (microseconds)\n")
+        print(f"{'':<26}{'mean':>12}{'median':>12}{'p95':>12}")
+        summarize("legacy debug_log", legacy)
+        summarize("queued, debug enabled", queued)
+        summarize("queued, debug disabled", disabled)
+        print(f"\nListener flushed the queued records {drain * 1000:.1f} ms after the last request")
+
+if __name__ == "__main__":
+    main()
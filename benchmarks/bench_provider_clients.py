@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measures what the shared provider clients save per request against local stub
+servers: a fresh connection per call (the old requests.post / per-call client
+pattern) versus callgod's pooled keep-alive clients. It also shows how quickly
+a failing provider is short-circuited once its circuit breaker opens.
+
+    python benchmarks/bench_provider_clients.py --requests 200
+
+Loopback connections skip DNS and TLS, so the savings against the real
+providers (a TLS handshake per call) are larger than what is shown here.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubOpenAIServer, StubTTSServer  # noqa: E402
+
+def timed(samples, call):
+    start = time.perf_counter()
+    call()
+    samples.append(time.perf_counter() - start)
+
+def summarize(label, samples):
+    print(f"{label:<34}{statistics.mean(samples) * 1000:>10.2f}{statistics.median(samples) * 1000:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    tts_server = StubTTSServer(latency=0.0, chars_per_second=1e9, bytes_per_char=100).start()
+    openai_server = StubOpenAIServer(latency=0.0).start()
+    failing_server = StubTTSServer(latency=0.0, error_rate=1.0).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["ELEVENLABS_API_BASE"] = tts_server.url
+    os.environ["OPENAI_API_BASE"] = f"{openai_server.url}/v1"
+
+    import openai
+    import requests
+    import callgod
+    callgod.debug_log = lambda *args, **kwargs: None
+
+    tts_url = f"{tts_server.url}/v1/text-to-speech/bench/stream"
+    payload = {"text": "Benchmark line.", "voice_settings": callgod.TTS_VOICE_SETTINGS}
+    messages = [{"role": "user", "content": "benchmark"}]
+    results = {label: [] for label in ("tts_fresh", "tts_pooled", "openai_fresh", "openai_pooled")}
+
+    for _ in range(args.requests):
+        timed(results["tts_fresh"], lambda: requests.post(tts_url, json=payload, timeout=10).content)
+        timed(results["tts_pooled"], lambda: callgod.tts_http.post(tts_url, json=payload, timeout=10).content)
+        timed(results["openai_fresh"], lambda: openai.OpenAI(
+            api_key="benchmark", base_url=f"{openai_server.url}/v1"
+        ).chat.completions.create(model="gpt-3.5-turbo", messages=messages))
+        timed(results["openai_pooled"], lambda: callgod.openai_client.chat.completions.create(
+            model="gpt-3.5-turbo", messages=messages))
+
+    print(f"{'client':<34}{'mean ms':>10}{'p50 ms':>10}")
+    summarize("ElevenLabs, connection per call", results["tts_fresh"])
+    summarize("ElevenLabs, pooled session", results["tts_pooled"])
+    summarize("OpenAI, client per call", results["openai_fresh"])
+    summarize("OpenAI, shared client", results["openai_pooled"])
+
+    # Failing provider: retries and then the breaker trip, after which calls fail fast
+    callgod.ELEVENLABS_API_BASE = failing_server.url
+    closed, opened = [], []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for index in range(callgod.tts_breaker.failure_threshold + 20):
+            samples = closed if callgod.tts_breaker.state == "closed" else opened
+            timed(samples, lambda: callgod.generate_tts_streaming(f"line {index}", os.path.join(cache_dir, f"{index}.mp3")))
+    summarize("Failing TTS, breaker closed", closed)
+    summarize("Failing TTS, breaker open", opened)
+
+    for server in (tts_server, openai_server, failing_server):
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Measures callgod's cold start against a local stub TTS server: the old
+sequence (each preload rendered one after another before the server could
+start) versus start_preloads(), which renders them concurrently in the
+background while the server is already accepting requests.
+
+    python benchmarks/bench_startup.py --latency 0.4 --runs 3
+
+Every run starts from an empty static directory, so every clip is rendered.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubTTSServer  # noqa: E402
+
+def use_fresh_static_dir(callgod, base_dir):
+    callgod.STATIC_DIR = os.path.join(base_dir, "static")
+    callgod.CACHE_DIR = os.path.join(callgod.STATIC_DIR, "cached_responses")
+    callgod.FALLBACK_FILE = os.path.join(callgod.STATIC_DIR, "fallback.mp3")
+    callgod.WELCOME_FILE = os.path.join(callgod.STATIC_DIR, "welcome.mp3")
+    os.makedirs(callgod.CACHE_DIR)
+    callgod.audio_store = callgod.AudioStore(callgod.CACHE_DIR)
+    callgod.PRELOADED_RESPONSES.clear()
+
+def sequential_startup(callgod):
+    callgod.preload_static_files(callgod.COMMON_RESPONSES)
+    callgod.preload_fallback()
+    for response in callgod.COMMON_TTS_RESPONSES:
+        callgod.audio_store.get_or_render(response)
+    callgod.generate_tts_streaming(callgod.WELCOME_MESSAGE, callgod.WELCOME_FILE, play=False)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.4, help="stub TTS time to first byte (seconds)")
+    parser.add_argument("--cps", type=float, default=60.0, help="stub TTS characters per second")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server = StubTTSServer(latency=args.latency, chars_per_second=args.cps).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ["ELEVENLABS_API_BASE"] = server.url
+
+    start = time.perf_counter()
+    import callgod
+    import_seconds = time.perf_counter() - start
+
+    model_seconds = None
+    if os.path.exists(os.path.join(callgod.VOSK_MODEL_PATH, "am")):
+        start = time.perf_counter()
+        callgod.get_vosk_model()
+        model_seconds = time.perf_counter() - start
+
+    sequential, until_serving, until_ready = [], [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as base_dir:
+            use_fresh_static_dir(callgod, base_dir)
+            start = time.perf_counter()
+            sequential_startup(callgod)
+            sequential.append(time.perf_counter() - start)
+
+        with tempfile.TemporaryDirectory() as base_dir:
+            use_fresh_static_dir(callgod, base_dir)
+            start = time.perf_counter()
+            callgod.start_preloads()
+            until_serving.append(time.perf_counter() - start)
+            callgod.startup_ready.wait()
+            until_ready.append(time.perf_counter() - start)
+    server.stop()
+
+    print(f"import callgod                      {import_seconds:8.2f} s")
+    if model_seconds is not None:
+        print(f"Vosk model load (now on first use)  {model_seconds:8.2f} s")
+    print(f"\n{'':<36}{'median (s)':>10}")
+    print(f"{'sequential preloads':<36}{statistics.median(sequential):>10.2f}")
+    print(f"{'concurrent: server can start':<36}{statistics.median(until_serving):>10.2f}")
+    print(f"{'concurrent: /health ready':<36}{statistics.median(until_ready):>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compares time to first playable audio for a cold ChatGPT -> TTS turn in three
+modes, against stub OpenAI and ElevenLabs servers that decode and synthesize
+at a fixed rate:
+
+  whole      wait for the full reply, render it as one clip
+  chunked    wait for the full reply, render its first sentence (CHUNKED_TTS_MODE)
+  streamed   stream the reply and render clauses as they arrive (STREAMING_REPLY_MODE)
+
+    python benchmarks/bench_streaming_reply.py --tokens-per-second 15 --runs 5
+
+Every turn uses a fresh prompt, so nothing is served from a cache.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubOpenAIServer, StubTTSServer  # noqa: E402
+
+MODES = {
+    "whole": {"CHUNKED_TTS_MODE": False, "STREAMING_REPLY_MODE": False},
+    "chunked": {"CHUNKED_TTS_MODE": True, "STREAMING_REPLY_MODE": False},
+    "streamed": {"CHUNKED_TTS_MODE": False, "STREAMING_REPLY_MODE": True},
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--openai-latency", type=float, default=0.4, help="stub time to first token (seconds)")
+    parser.add_argument("--tokens-per-second", type=float, default=15.0, help="stub decode speed")
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="stub TTS time to first byte (seconds)")
+    parser.add_argument("--cps", type=float, default=60.0, help="stub TTS characters per second")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tts_server = StubTTSServer(latency=args.tts_latency, chars_per_second=args.cps).start()
+    openai_server = StubOpenAIServer(latency=args.openai_latency, tokens_per_second=args.tokens_per_second).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ["ELEVENLABS_API_BASE"] = tts_server.url
+    os.environ["OPENAI_API_BASE"] = f"{openai_server.url}/v1"
+
+    import callgod
+
+    results = {mode: [] for mode in MODES}
+    timeline = None
+    with tempfile.TemporaryDirectory() as base_dir:
+        callgod.audio_store = callgod.AudioStore(base_dir)
+        callgod.response_cache = callgod.ResponseCache(os.path.join(base_dir, "responses.db"))
+        for run in range(args.runs):
+            for mode, flags in MODES.items():
+                for name, value in flags.items():
+                    setattr(callgod, name, value)
+                prompt = f"tell me about creation, take {run} in {mode} mode {time.time()}"
+                start = time.perf_counter()
+                result = callgod.generate_reply_audio(prompt)
+                results[mode].append(time.perf_counter() - start)
+                if not result["audio_files"]:
+                    sys.exit(f"{mode}: no audio for {prompt!r}")
+                if mode == "streamed" and timeline is None:
+                    reply_timeline = callgod.ReplyTimeline()
+                    callgod.stream_reply_audio(f"one more {prompt}", callgod.current_voice, timeline=reply_timeline)
+                    timeline = reply_timeline.as_dict()
+        callgod.job_executor.shutdown(wait=True)
+
+    tts_server.stop()
+    openai_server.stop()
+
+    print(f"{'mode':<10}{'first audio median (s)':>24}{'p95 (s)':>10}")
+    for mode, seconds in results.items():
+        ordered = sorted(seconds)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"{mode:<10}{statistics.median(seconds):>24.2f}{p95:>10.2f}")
+    print("\nstreamed turn timeline (ms):")
+    for event, offset in timeline.items():
+        print(f"  {offset:>6}  {event}")
+
+if __name__ == "__main__":
+    main()
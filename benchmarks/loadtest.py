@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Load test for callgod.py: runs the Flask app on a local port against stub
+OpenAI and ElevenLabs servers and drives N simultaneous synthetic Twilio calls
+through /voice. Each call rings, then says a few things (mostly questions, with
+the odd song request or easter egg), following <Redirect>s the way Twilio does
+in async mode.
+
+    python benchmarks/loadtest.py --calls 20 --turns 4 --openai-latency 0.8 --tts-latency 0.4
+
+Reports throughput, p50/p95/p99 of each HTTP request and of each turn (from
+the utterance to TwiML that plays the reply), provider calls, and cache hit
+rates from /cache/stats. Pass --max-p95 to exit non-zero when the turn p95
+exceeds it, so the run can gate a deploy. Feature flags (ASYNC_VOICE_MODE,
+CHUNKED_TTS_MODE, ...) are read from the environment as usual.
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubOpenAIServer, StubTTSServer  # noqa: E402
+
+TOPICS = [
+    "the meaning of life", "my cat", "taxes", "pineapple on pizza", "the weather", "my ex",
+    "the stock market", "free will", "dinosaurs", "my job", "the moon landing", "coffee",
+    "social media", "my mother in law", "the afterlife", "cheese", "traffic", "aliens",
+    "my diet", "reality television",
+]
+CANNED_UTTERANCES = ["sing me a song", "what is love baby", "open the pod bay doors hal"]
+REDIRECT = re.compile(r"<Redirect[^>]*>([^<]+)</Redirect>")
+PAUSE = re.compile(r'<Pause length="(\d+)"')
+# fallback.mp3 or fallback.wav, depending on TWILIO_AUDIO_FORMAT
+FALLBACK_PLAY = re.compile(r"<Play>[^<]*/fallback\.\w+</Play>")
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def call_flow(base_url, turns, topics, canned_ratio, results, lock):
+    """One synthetic call: ring, then `turns` utterances, each followed to its reply."""
+    http = requests.Session()
+    call_sid = f"CA{uuid.uuid4().hex}"
+
+    def post(path, **form):
+        start = time.perf_counter()
+        try:
+            reply = http.post(f"{base_url}{path}", data=dict(form, CallSid=call_sid), timeout=60)
+            ok, body = reply.ok, reply.text
+        except requests.RequestException:
+            ok, body = False, ""
+        with lock:
+            results["requests"].append(time.perf_counter() - start)
+            results["errors"] += 0 if ok else 1
+        return body
+
+    post("/voice", CallStatus="ringing")
+    for _ in range(turns):
+        if random.random() < canned_ratio:
+            said = random.choice(CANNED_UTTERANCES)
+        else:
+            said = f"what do you think about {random.choice(topics)}"
+        start = time.perf_counter()
+        body = post("/voice", CallStatus="in-progress", SpeechResult=said)
+        # Async mode answers with filler and a redirect that is polled until the reply is ready
+        while (redirect := REDIRECT.search(body)):
+            pause = PAUSE.search(body)
+            time.sleep(int(pause.group(1)) if pause else 0)
+            body = post(redirect.group(1), CallStatus="in-progress")
+        with lock:
+            results["turns"].append(time.perf_counter() - start)
+            results["fallbacks"] += FALLBACK_PLAY.search(body) is not None
+    post("/voice/status", CallStatus="completed")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=10, help="simultaneous calls")
+    parser.add_argument("--turns", type=int, default=4, help="utterances per call")
+    parser.add_argument("--waves", type=int, default=1, help="rounds of --calls simultaneous calls")
+    parser.add_argument("--topics", type=int, default=10, help="distinct questions callers pick from")
+    parser.add_argument("--canned-ratio", type=float, default=0.2, help="share of song/easter egg turns")
+    parser.add_argument("--openai-latency", type=float, default=0.8)
+    parser.add_argument("--tts-latency", type=float, default=0.4)
+    parser.add_argument("--tts-chars-per-second", type=float, default=60.0, help="stub synthesis speed")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub provider calls that fail")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-p95", type=float, default=None, help="fail if the turn p95 exceeds this (seconds)")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    tts_server = StubTTSServer(latency=args.tts_latency, chars_per_second=args.tts_chars_per_second, jitter=args.jitter, error_rate=args.error_rate).start()
+    openai_server = StubOpenAIServer(latency=args.openai_latency, jitter=args.jitter, error_rate=args.error_rate).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "loadtest")
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ["ELEVENLABS_API_BASE"] = tts_server.url
+    os.environ["OPENAI_API_BASE"] = f"{openai_server.url}/v1"
+
+    import callgod
+    # Keep the per-caller rate limit out of the measurements
+    callgod.limiter.enabled = False
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        # Start from cold caches so runs are comparable
+        callgod.BASE_DIR = base_dir
+        callgod.STATIC_DIR = os.path.join(base_dir, "static")
+        callgod.CACHE_DIR = os.path.join(callgod.STATIC_DIR, "cached_responses")
+        os.makedirs(callgod.CACHE_DIR)
+        callgod.audio_store = callgod.AudioStore(callgod.CACHE_DIR)
+        callgod.response_cache = callgod.ResponseCache(os.path.join(base_dir, "response_cache.db"))
+
+        server = make_server("127.0.0.1", 0, callgod.app, threaded=True, request_handler=QuietRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        results = {"requests": [], "turns": [], "errors": 0, "fallbacks": 0}
+        lock = threading.Lock()
+        topics = TOPICS[:max(1, args.topics)]
+        started = time.perf_counter()
+        for _ in range(args.waves):
+            flows = [threading.Thread(target=call_flow, args=(base_url, args.turns, topics, args.canned_ratio, results, lock))
+                     for _ in range(args.calls)]
+            for flow in flows:
+                flow.start()
+            for flow in flows:
+                flow.join()
+        elapsed = time.perf_counter() - started
+
+        stats = requests.get(f"{base_url}/cache/stats", timeout=10).json()
+        server.shutdown()
+    tts_server.stop()
+    openai_server.stop()
+
+    turns = results["turns"]
+    print(f"{args.waves} x {args.calls} simultaneous calls, {args.turns} turns each, {elapsed:.1f} s\n")
+    print(f"throughput            {len(turns) / elapsed:8.2f} turns/s  {len(results['requests']) / elapsed:8.2f} requests/s")
+    print(f"{'':<22}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for label, samples in (("HTTP request", results["requests"]), ("turn", turns)):
+        print(f"{label:<22}" + "".join(f"{percentile(samples, q) * 1000:>9.0f}" for q in (0.5, 0.95, 0.99)))
+    print(f"\nHTTP errors           {results['errors']}")
+    print(f"fallback replies      {results['fallbacks']}")
+    print(f"OpenAI calls          {openai_server.request_count} ({openai_server.error_count} failed)")
+    print(f"ElevenLabs calls      {tts_server.request_count} ({tts_server.error_count} failed)")
+    print(f"response cache        hit rate {stats['responses'].get('hit_rate')}")
+    print(f"audio store           dedup rate {stats['audio'].get('dedup_rate')}, "
+          f"{stats['audio'].get('elevenlabs_calls_saved')} ElevenLabs calls saved")
+    if stats.get("semantic"):
+        print(f"semantic cache        {stats['semantic']}")
+
+    turn_p95 = percentile(turns, 0.95)
+    if args.max_p95 is not None and turn_p95 > args.max_p95:
+        print(f"\nFAIL: turn p95 {turn_p95:.2f} s exceeds --max-p95 {args.max_p95:.2f} s")
+        sys.exit(1)
+    if turns:
+        print(f"\nturn mean {statistics.mean(turns) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
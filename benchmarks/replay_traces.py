@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Replays /voice traces recorded with TRACE_DIR through the app, in process and
+one request at a time, against stub OpenAI and ElevenLabs servers whose
+latencies are taken from the traces. Use it to reproduce a slow period offline
+and to profile the hot path with real traffic shapes.
+
+    python benchmarks/replay_traces.py traces/*.jsonl
+    python benchmarks/replay_traces.py traces/*.jsonl --profile cprofile --output replay.prof
+    python benchmarks/replay_traces.py traces/*.jsonl --profile pyinstrument --output replay.html
+
+Feature flags recorded with the traces are applied unless --env-flags is given,
+in which case they are read from the environment as usual. Caches start cold
+unless --warm-cache is passed. Profilers see the request thread only; work
+handed to job_executor (async mode, later chunks) runs outside the profile.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_servers import StubOpenAIServer, StubTTSServer  # noqa: E402
+
+REDIRECT = re.compile(r"<Redirect[^>]*>([^<]+)</Redirect>")
+ASYNC_POLL_INTERVAL = 0.05  # Replays don't wait out Twilio's <Pause> between polls
+
+def load_traces(patterns):
+    traces = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path) as trace_file:
+                traces.extend(json.loads(line) for line in trace_file if line.strip())
+    return sorted((trace for trace in traces if trace.get("path") == "/voice"), key=lambda trace: trace["ts"])
+
+def provider_events(traces, provider):
+    return [event for trace in traces for event in trace["events"]
+            if event["kind"] == "provider" and event.get("provider") == provider and "duration_ms" in event]
+
+def stub_settings(traces):
+    """Median OpenAI latency, ElevenLabs first-byte latency and synthesis speed seen in the traces."""
+    openai_calls = provider_events(traces, "OpenAI")
+    tts_calls = [event for event in provider_events(traces, "ElevenLabs") if "first_byte_ms" in event]
+    settings = {"openai_latency": 0.8, "tts_latency": 0.4, "tts_cps": 60.0}
+    if openai_calls:
+        settings["openai_latency"] = statistics.median(event["duration_ms"] for event in openai_calls) / 1000
+    if tts_calls:
+        settings["tts_latency"] = statistics.median(event["first_byte_ms"] for event in tts_calls) / 1000
+        speeds = [event["request_bytes"] / ((event["duration_ms"] - event["first_byte_ms"]) / 1000)
+                  for event in tts_calls if event["duration_ms"] > event["first_byte_ms"]]
+        if speeds:
+            settings["tts_cps"] = statistics.median(speeds)
+    return settings
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def replay(client, traces):
+    """Posts each trace's form to /voice, following async redirects. Returns replayed ms per trace."""
+    replayed = []
+    for trace in traces:
+        form = trace["form"]
+        start = time.perf_counter()
+        body = client.post("/voice", data=form).get_data(as_text=True)
+        while (redirect := REDIRECT.search(body)):
+            time.sleep(ASYNC_POLL_INTERVAL)
+            body = client.post(redirect.group(1), data={"CallSid": form.get("CallSid", "")}).get_data(as_text=True)
+        replayed.append((time.perf_counter() - start) * 1000)
+    return replayed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="trace files or glob patterns")
+    parser.add_argument("--profile", choices=("cprofile", "pyinstrument"), default=None)
+    parser.add_argument("--output", default=None, help="profile output (.prof for cprofile, .html for pyinstrument)")
+    parser.add_argument("--top", type=int, default=25, help="functions to print from a cProfile run")
+    parser.add_argument("--openai-latency", type=float, default=None, help="override the recorded OpenAI latency")
+    parser.add_argument("--tts-latency", type=float, default=None, help="override the recorded ElevenLabs latency")
+    parser.add_argument("--env-flags", action="store_true", help="use feature flags from the environment")
+    parser.add_argument("--warm-cache", action="store_true", help="replay against the existing static/ and caches")
+    args = parser.parse_args()
+
+    traces = load_traces(args.traces)
+    if not traces:
+        sys.exit("No /voice traces found.")
+    settings = stub_settings(traces)
+    openai_latency = args.openai_latency if args.openai_latency is not None else settings["openai_latency"]
+    tts_latency = args.tts_latency if args.tts_latency is not None else settings["tts_latency"]
+
+    tts_server = StubTTSServer(latency=tts_latency, chars_per_second=settings["tts_cps"]).start()
+    openai_server = StubOpenAIServer(latency=openai_latency).start()
+    os.environ.setdefault("ELEVENLABS_API_KEY", "replay")
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ["ELEVENLABS_API_BASE"] = tts_server.url
+    os.environ["OPENAI_API_BASE"] = f"{openai_server.url}/v1"
+    os.environ.pop("TRACE_DIR", None)
+
+    import callgod
+    callgod.limiter.enabled = False
+    if not args.env_flags:
+        for flag, value in traces[0]["flags"].items():
+            # Media streams don't go through /voice turns, so there is nothing to replay for them
+            if flag != "MEDIA_STREAM_MODE" and value is not None and hasattr(callgod, flag):
+                setattr(callgod, flag, value)
+        # Paths derived from the audio format at import time have to follow it
+        callgod.TWILIO_AUDIO_EXTENSION = callgod.AUDIO_EXTENSIONS[callgod.TWILIO_AUDIO_FORMAT]
+        for name in ("FALLBACK_FILE", "WELCOME_FILE"):
+            setattr(callgod, name, os.path.splitext(getattr(callgod, name))[0] + callgod.TWILIO_AUDIO_EXTENSION)
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        if not args.warm_cache:
+            callgod.BASE_DIR = base_dir
+            callgod.STATIC_DIR = os.path.join(base_dir, "static")
+            callgod.CACHE_DIR = os.path.join(callgod.STATIC_DIR, "cached_responses")
+            os.makedirs(callgod.CACHE_DIR)
+            callgod.audio_store = callgod.AudioStore(callgod.CACHE_DIR)
+            callgod.response_cache = callgod.ResponseCache(os.path.join(base_dir, "response_cache.db"))
+        client = callgod.app.test_client()
+
+        if args.profile == "cprofile":
+            import cProfile
+            import pstats
+            profiler = cProfile.Profile()
+            replayed = profiler.runcall(replay, client, traces)
+            if args.output:
+                profiler.dump_stats(args.output)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+        elif args.profile == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                sys.exit("--profile pyinstrument needs the pyinstrument package: pip3 install pyinstrument")
+            profiler = Profiler()
+            profiler.start()
+            replayed = replay(client, traces)
+            profiler.stop()
+            if args.output:
+                with open(args.output, "w") as output_file:
+                    output_file.write(profiler.output_html())
+            print(profiler.output_text(unicode=True, color=False))
+        else:
+            replayed = replay(client, traces)
+        callgod.job_executor.shutdown(wait=True)
+
+    tts_server.stop()
+    openai_server.stop()
+
+    recorded = [trace["ms"] for trace in traces]
+    print(f"replayed {len(traces)} /voice requests from {len({trace['form'].get('CallSid') for trace in traces})} calls")
+    print(f"stubs: OpenAI {openai_latency:.2f} s, ElevenLabs {tts_latency:.2f} s to first byte "
+          f"at {settings['tts_cps']:.0f} chars/s")
+    print(f"\n{'':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}")
+    for name, samples in (("recorded", recorded), ("replayed", replayed)):
+        print(f"{name:<10}{percentile(samples, 0.5):>10.0f}{percentile(samples, 0.95):>10.0f}{max(samples):>10.0f}")
+    print(f"provider calls: OpenAI recorded {len(provider_events(traces, 'OpenAI'))}, replayed "
+          f"{openai_server.request_count}; ElevenLabs recorded {len(provider_events(traces, 'ElevenLabs'))}, "
+          f"replayed {tts_server.request_count}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the provider APIs used by callgod.py, so benchmarks can run
+without network access or API spend. Point ELEVENLABS_API_BASE at a TTS
+stub's url and OPENAI_API_BASE at an OpenAI stub's url + "/v1".
+"""
+import json
+import random
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping pooled connections is routine, not a stub failure
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class StubServer:
+    """Runs a ThreadingHTTPServer on a background thread with simulated latency."""
+
+    def __init__(self, latency=0.2, jitter=0.0, error_rate=0.0, port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._server = QuietHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self):
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.request_count += 1
+            if failed:
+                self.error_count += 1
+        return failed
+
+    def handle_post(self, handler, path, payload):
+        raise NotImplementedError
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if stub.should_fail():
+                    time.sleep(stub.delay())
+                    self.send_error(503, "Stubbed provider error")
+                    return
+                stub.handle_post(self, self.path, payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+class StubTTSServer(StubServer):
+    """
+    Mimics ElevenLabs' /v1/text-to-speech/<voice>/stream endpoint. The first byte
+    arrives after `latency` seconds and the rest streams at `chars_per_second`
+    of input text, so longer text takes proportionally longer to finish.
+    """
+
+    def __init__(self, latency=0.2, chars_per_second=60.0, bytes_per_char=400, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.chars_per_second = chars_per_second
+        self.bytes_per_char = bytes_per_char
+
+    def handle_post(self, handler, path, payload):
+        text = payload.get("text", "")
+        body_size = max(1, len(text)) * self.bytes_per_char
+        synthesis_time = len(text) / self.chars_per_second
+        slices = 10
+
+        time.sleep(self.delay())
+        handler.send_response(200)
+        handler.send_header("Content-Type", "audio/mpeg")
+        handler.send_header("Content-Length", str(body_size))
+        handler.end_headers()
+        piece = body_size // slices
+        for index in range(slices):
+            size = piece if index < slices - 1 else body_size - piece * (slices - 1)
+            handler.wfile.write(b"\xff" * size)
+            handler.wfile.flush()
+            time.sleep(synthesis_time / slices)
+
+class StubOpenAIServer(StubServer):
+    """
+    Mimics OpenAI's /v1/chat/completions endpoint. Replies are canned and
+    derived from the last user message, so identical prompts get identical replies.
+    With tokens_per_second, each word of the reply takes that long to decode,
+    and requests with "stream": true receive it as server-sent event chunks.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=None, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.tokens_per_second = tokens_per_second
+
+    def handle_post(self, handler, path, payload):
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        reply = f"You asked about {prompt[:40]}. Bold of you."
+        model = payload.get("model", "gpt-3.5-turbo")
+        tokens = [f" {word}" if index else word for index, word in enumerate(reply.split())]
+        decode_time = len(tokens) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+        time.sleep(self.delay())
+        if payload.get("stream"):
+            self.stream_reply(handler, model, tokens, decode_time / len(tokens))
+            return
+        time.sleep(decode_time)
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    @staticmethod
+    def stream_reply(handler, model, tokens, token_time):
+        def send(data):
+            event = f"data: {data}\n\n".encode()
+            handler.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            handler.wfile.flush()
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        for token in tokens + [None]:
+            send(json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": token} if token is not None else {},
+                    "finish_reason": None if token is not None else "stop",
+                }],
+            }))
+            if token is not None:
+                time.sleep(token_time)
+        send("[DONE]")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
@@ -1,45 +1,130 @@
 #!/usr/bin/env python3
+import atexit
+import base64
+import contextvars
+import functools
 import openai
 import os
+import httpx
 import requests
 import speech_recognition as sr
 import json
 import time
 import threading
 import hashlib
-import wave
 import subprocess
 import elevenlabs
+import fcntl
 import logging
+import math
+import mimetypes
+import multiprocessing
+import multiprocessing.queues
+import queue
 import random
+import re
+import sqlite3
+import struct
+import sys
+import uuid
+import zlib
 
 from vosk import Model, KaldiRecognizer
-from flask import Flask, request, send_from_directory
-from twilio.twiml.voice_response import VoiceResponse
-from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, send_file
+from twilio.twiml.voice_response import Connect, VoiceResponse
+from werkzeug.utils import safe_join
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from dotenv import load_dotenv
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+try:
+    import redis  # Only needed for SESSION_REDIS_URL or a Redis RATE_LIMIT_STORAGE_URI
+except ImportError:
+    redis = None
+
+try:
+    import numpy as np  # Only needed when SEMANTIC_CACHE_MODE is enabled
+except ImportError:
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer  # Optional local embedding model
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import webrtcvad  # Optional; voice activity falls back to an energy threshold
+except ImportError:
+    webrtcvad = None
+
+try:
+    from flask_sock import Sock  # Only needed when MEDIA_STREAM_MODE is enabled
+except ImportError:
+    Sock = None
+
+try:
+    import boto3  # Only needed when MEDIA_BUCKET is set
+    import botocore.exceptions
+except ImportError:
+    boto3 = None
+
+try:
+    import h2  # noqa: F401  Lets the OpenAI client negotiate HTTP/2 when installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 ############################### Flask App Setup ###############################
 
-app = Flask(__name__)
-limiter = Limiter(get_remote_address, app=app)
+# /static is served by serve_static, not Flask's built-in static route
+app = Flask(__name__, static_folder=None)
+
+# Twilio's webhooks all come from a few addresses, so /voice is limited per caller.
+# memory:// is per process; a redis:// URI shares the counts between workers.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", os.getenv("SESSION_REDIS_URL") or "memory://")
+VOICE_RATE_LIMIT = os.getenv("VOICE_RATE_LIMIT", "10/minute")
+if RATE_LIMIT_STORAGE_URI.startswith(("redis://", "rediss://")) and redis is None:
+    raise ValueError("RATE_LIMIT_STORAGE_URI is set to Redis but the redis package is not installed.")
+
+def caller_key():
+    """Rate limit key for a webhook: the caller's number, else the call, else the client address."""
+    caller = request.form.get("From") or request.form.get("CallSid")
+    return f"caller:{caller}" if caller else get_remote_address()
+
+limiter = Limiter(caller_key, app=app, storage_uri=RATE_LIMIT_STORAGE_URI)
+sock = Sock(app) if Sock is not None else None
 
 ############################### Var Declarations ###############################
 
 # Constants
 BASE_DIR = "."  # Adjust to your project folder
-RESPONSE_FILE = f"{BASE_DIR}/static/response.mp3"
-FALLBACK_FILE = f"{BASE_DIR}/static/fallback.mp3"
-WELCOME_FILE = f"{BASE_DIR}/static/welcome.mp3"
+STATIC_DIR = f"{BASE_DIR}/static"
+# Clips Twilio plays are ElevenLabs' default MP3 ("mp3") or 8 kHz mu-law WAV ("ulaw"),
+# the format phone audio is carried in. Clips played locally with mpg123 are always MP3.
+TWILIO_AUDIO_FORMAT = os.getenv("TWILIO_AUDIO_FORMAT", "mp3").lower()
+AUDIO_EXTENSIONS = {"mp3": ".mp3", "ulaw": ".wav"}
+if TWILIO_AUDIO_FORMAT not in AUDIO_EXTENSIONS:
+    raise ValueError(f"TWILIO_AUDIO_FORMAT must be one of {', '.join(AUDIO_EXTENSIONS)}.")
+TWILIO_AUDIO_EXTENSION = AUDIO_EXTENSIONS[TWILIO_AUDIO_FORMAT]
+FALLBACK_FILE = f"{BASE_DIR}/static/fallback{TWILIO_AUDIO_EXTENSION}"
+WELCOME_FILE = f"{BASE_DIR}/static/welcome{TWILIO_AUDIO_EXTENSION}"
 CACHE_DIR = f"{BASE_DIR}/static/cached_responses"
+CACHE_DB = f"{BASE_DIR}/response_cache.db"
+AUDIO_BANK_MANIFEST = f"{BASE_DIR}/audio_bank.json"
 LOG_FILE = f"{BASE_DIR}/app_debug.log"
 VOSK_MODEL_PATH = os.path.expanduser(f"{BASE_DIR}/vosk_models/vosk-model-small-en-us-0.15")
 
 ############################### Easter Eggs & Fun Responses ###############################
 
+WELCOME_MESSAGE = "Welcome, my child! What divine wisdom do you seek today?"
+
 # Fun interrupt responses
 INTERRUPT_RESPONSES = [
     "Alright, you have my full attention. What’s next?",
@@ -75,23 +160,34 @@ EASTER_EGGS = {
 ############################### Ensure Directories Exist ###############################
 
 os.makedirs(CACHE_DIR, exist_ok=True)
-if not os.path.exists(VOSK_MODEL_PATH):
-    raise FileNotFoundError(f"Vosk model not found at {VOSK_MODEL_PATH}")
 
 ############################### Load Vosk Model ###############################
 
-# (For Twilio, you might not use Vosk. You can comment this out if not needed.)
-try:
-    VOSK_MODEL = Model(VOSK_MODEL_PATH)
-    print("Vosk model loaded successfully.")
-except Exception as e:
-    print(f"Failed to load Vosk model: {e}")
+# Loaded on first use: the <Gather> call flow never needs it, and importing the app
+# (one gunicorn worker, a benchmark) should not pay for it.
+VOSK_MODEL = None
+vosk_model_lock = threading.Lock()
+
+def get_vosk_model():
+    global VOSK_MODEL
+    with vosk_model_lock:
+        if VOSK_MODEL is None:
+            if not os.path.exists(VOSK_MODEL_PATH):
+                raise FileNotFoundError(f"Vosk model not found at {VOSK_MODEL_PATH}")
+            start_time = time.time()
+            VOSK_MODEL = Model(VOSK_MODEL_PATH)
+            print(f"Vosk model loaded in {time.time() - start_time:.2f} seconds.")
+    return VOSK_MODEL
 
 ############################### API Keys ###############################
 
 load_dotenv()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+# Public address Twilio uses to reach this app (ngrok tunnel, load balancer, ...)
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "https://god.ngrok.app").rstrip("/")
 
 if not ELEVENLABS_API_KEY:
     raise ValueError("Missing ELEVENLABS_API_KEY environment variable.")
@@ -109,6 +205,332 @@ VOICE_NIKKI = "Insert your Voice ID Here"
 VOICE_TOM = "Insert another Voice ID Here"
 current_voice = VOICE_NIKKI
 
+VOICE_CONFIRMATIONS = {
+    VOICE_TOM: "Voice switched to Major Tom. Ground control, ready for lift-off for your mother.",
+    VOICE_NIKKI: "Voice switched to Nikki. Here I am, sassy and ready to judge you!",
+}
+
+TTS_VOICE_SETTINGS = {
+    "stability": 0.3,
+    "similarity_boost": 0.4
+}
+TTS_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID")  # None uses ElevenLabs' default model
+
+############################### Metrics ###############################
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0)
+ACTIVE_CALL_WINDOW = int(os.getenv("ACTIVE_CALL_WINDOW", "120"))  # Seconds since a call's last /voice request
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    """A labelled counter, gauge or histogram, rendered in the Prometheus text format."""
+
+    def __init__(self, name, help_text, kind, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # Unlabelled counters and gauges are exported as 0 before their first update
+        self.values = {} if self.labels or kind == "histogram" else {(): 0}
+
+    def series(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self.series(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self.series(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def observe(self, value, **labels):
+        key = self.series(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def totals(self):
+        """Current value per series, keyed by the first label (counters and gauges)."""
+        with self.lock:
+            return {key[0] if key else "": value for key, value in self.values.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            snapshot = {key: dict(value, buckets=list(value["buckets"])) if self.kind == "histogram" else value
+                        for key, value in self.values.items()}
+        for key, value in sorted(snapshot.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+                continue
+            for bound, count in zip(self.buckets, value["buckets"]):
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le=bound)} {count}")
+            lines.append(f'{self.name}_bucket{format_labels(self.labels, key, le="+Inf")} {value["count"]}')
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {value['sum']}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {value['count']}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, name, help_text, kind, labels=(), **kwargs):
+        metric = Metric(name, help_text, kind, labels, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+metrics = MetricsRegistry()
+stage_latency = metrics.register(
+    "callgod_stage_latency_seconds", "Latency of each /voice pipeline stage.", "histogram", ("stage",))
+first_audio_latency = metrics.register(
+    "callgod_time_to_first_audio_seconds",
+    "Time from the caller's utterance to TwiML that plays the reply, by intent.", "histogram", ("intent",))
+intents_total = metrics.register("callgod_intents_total", "Utterances by classified intent.", "counter", ("intent",))
+cache_lookups = metrics.register(
+    "callgod_cache_lookups_total", "Cache lookups by cache and result.", "counter", ("cache", "result"))
+provider_errors = metrics.register(
+    "callgod_provider_errors_total", "Failed provider calls.", "counter", ("provider",))
+provider_short_circuits = metrics.register(
+    "callgod_provider_short_circuits_total", "Provider calls skipped by an open circuit breaker.", "counter", ("provider",))
+rate_limited = metrics.register(
+    "callgod_rate_limited_total", "Requests over the rate limit, answered with the busy line.", "counter")
+provider_saturated = metrics.register(
+    "callgod_provider_saturated_total", "Provider calls abandoned waiting for a concurrency slot.", "counter",
+    ("provider",))
+voice_in_progress = metrics.register(
+    "callgod_voice_requests_in_progress", "/voice requests currently being handled.", "gauge")
+active_calls_gauge = metrics.register(
+    "callgod_active_calls", f"Calls with a /voice request in the last {ACTIVE_CALL_WINDOW} seconds.", "gauge")
+coalesced_requests = metrics.register(
+    "callgod_coalesced_requests_total",
+    "Provider calls skipped because an identical call was already in flight.", "counter", ("kind",))
+
+active_calls = OrderedDict()  # CallSid -> time of its last /voice request
+active_calls_lock = threading.Lock()
+
+
+def mark_call_active(call_sid):
+    if not call_sid:
+        return
+    with active_calls_lock:
+        active_calls[call_sid] = time.time()
+        active_calls.move_to_end(call_sid)
+
+
+def mark_call_ended(call_sid):
+    with active_calls_lock:
+        active_calls.pop(call_sid, None)
+
+
+def count_active_calls():
+    cutoff = time.time() - ACTIVE_CALL_WINDOW
+    with active_calls_lock:
+        while active_calls and next(iter(active_calls.values())) < cutoff:
+            active_calls.popitem(last=False)
+        return len(active_calls)
+
+############################### Provider Clients ###############################
+
+# Shared, keep-alive HTTP clients for ElevenLabs and OpenAI so each call reuses a
+# warm connection instead of paying DNS + TCP + TLS setup again.
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "3.05"))
+PROVIDER_READ_TIMEOUT = float(os.getenv("PROVIDER_READ_TIMEOUT", "10"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "2"))
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "32"))
+PROVIDER_TIMEOUT = (PROVIDER_CONNECT_TIMEOUT, PROVIDER_READ_TIMEOUT)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, failing calls fast for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+        provider_short_circuits.inc(provider=self.name)
+        return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        provider_errors.inc(provider=self.name)
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    debug_log(f"{self.name} circuit opened after {self.failures} consecutive failures.")
+                self.opened_at = time.time()
+
+def build_tts_session():
+    # Connect errors, read errors and 429/5xx are retried with jittered exponential backoff
+    retry = Retry(
+        total=PROVIDER_MAX_RETRIES,
+        backoff_factor=0.25,
+        backoff_jitter=0.25,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=PROVIDER_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"xi-api-key": ELEVENLABS_API_KEY})
+    return session
+
+def build_openai_client():
+    # The SDK retries with jittered backoff itself; we only supply the pooled transport
+    http_client = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=PROVIDER_POOL_SIZE, max_keepalive_connections=PROVIDER_POOL_SIZE),
+        timeout=httpx.Timeout(PROVIDER_READ_TIMEOUT, connect=PROVIDER_CONNECT_TIMEOUT),
+    )
+    return openai.OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_API_BASE,
+        max_retries=PROVIDER_MAX_RETRIES,
+        http_client=http_client,
+    )
+
+tts_http = build_tts_session()
+openai_client = build_openai_client()
+tts_breaker = CircuitBreaker("ElevenLabs")
+openai_breaker = CircuitBreaker("OpenAI")
+
+############################### Provider Concurrency ###############################
+
+# Caps concurrent calls to each provider, across every worker when the rate limit
+# storage is Redis, so a burst of callers queues briefly instead of tripping the
+# providers' own limits. A call that gets no slot in time degrades like an outage.
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "0"))  # 0 = no cap
+ELEVENLABS_CONCURRENCY = int(os.getenv("ELEVENLABS_CONCURRENCY", "0"))
+PROVIDER_QUEUE_TIMEOUT = float(os.getenv("PROVIDER_QUEUE_TIMEOUT", "5"))
+PROVIDER_SLOT_TTL = 120  # Seconds before a slot held by a worker that died is reclaimed
+PROVIDER_SLOT_POLL = 0.05
+
+class ProviderSlots:
+    """
+    Counting semaphore for one provider's calls. With a Redis URL the slots are
+    members of a sorted set scored by when they were taken, shared by all workers.
+    """
+
+    def __init__(self, name, limit, storage_uri=RATE_LIMIT_STORAGE_URI, timeout=PROVIDER_QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self.key = f"callgod:slots:{name}"
+        shared = limit and storage_uri.startswith(("redis://", "rediss://"))
+        self.client = redis.Redis.from_url(storage_uri) if shared else None
+        self.semaphore = threading.BoundedSemaphore(limit) if limit and not shared else None
+
+    def _take_shared(self, token):
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self.key, "-inf", now - PROVIDER_SLOT_TTL)
+        pipe.zadd(self.key, {token: now})
+        pipe.zrank(self.key, token)
+        if pipe.execute()[-1] < self.limit:
+            return True
+        self.client.zrem(self.key, token)
+        return False
+
+    def acquire(self):
+        """Returns a token for release(), or None if no slot came free within the timeout."""
+        if not self.limit:
+            return ""
+        if self.semaphore is not None:
+            if self.semaphore.acquire(timeout=self.timeout):
+                return "local"
+        else:
+            token = uuid.uuid4().hex
+            deadline = time.time() + self.timeout
+            try:
+                while True:
+                    if self._take_shared(token):
+                        return token
+                    if time.time() >= deadline:
+                        break
+                    time.sleep(PROVIDER_SLOT_POLL)
+            except redis.RedisError as e:
+                # Losing the cap is better than losing the call
+                debug_log(f"{self.name} slot store unavailable, calling without a slot: {e}")
+                return ""
+        provider_saturated.inc(provider=self.name)
+        debug_log(f"No {self.name} slot came free within {self.timeout} seconds.")
+        return None
+
+    def release(self, token):
+        if not token:
+            return
+        if self.semaphore is not None:
+            self.semaphore.release()
+            return
+        try:
+            self.client.zrem(self.key, token)
+        except redis.RedisError as e:
+            debug_log(f"Could not release {self.name} slot, it expires in {PROVIDER_SLOT_TTL} seconds: {e}")
+
+tts_slots = ProviderSlots("ElevenLabs", ELEVENLABS_CONCURRENCY)
+openai_slots = ProviderSlots("OpenAI", OPENAI_CONCURRENCY)
+
 ############################### Global State ###############################
 
 WAKE_UP_WORDS = ["wake up", "hello", "hey god"]
@@ -117,117 +539,1116 @@ DYNAMIC_KEYWORDS = ["new", "another", "different", "something else"]
 
 idle_mode = threading.Event()
 stop_playback = threading.Event()
-cache_lock = threading.Lock()
+shutdown_event = threading.Event()
 
-chatgpt_cache = {}
-chatgpt_cache.clear()
 PRELOADED_RESPONSES = {}
 
-executor = ThreadPoolExecutor(max_workers=4)
-MAX_CACHE_SIZE = 100
+EXECUTOR_WORKERS = 4
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+MAX_CACHE_SIZE = 100  # Replies kept in memory; the SQLite tier holds the rest
+MAX_DISK_CACHE_SIZE = 10000
+
+############################### Single-Flight ###############################
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers that arrive while a call for
+    their key is in flight wait on its future and share its result, so a burst of
+    identical requests costs one provider call.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> Future of the in-flight call
+        self.counters = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Returns (result, shared); shared is True when another caller did the work."""
+        with self.lock:
+            future = self.calls.get(key)
+            shared = future is not None
+            if shared:
+                self.counters["coalesced"] += 1
+            else:
+                future = self.calls[key] = Future()
+                self.counters["calls"] += 1
+        if shared:
+            coalesced_requests.inc(kind=self.kind)
+            return future.result(), True
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, in_flight=len(self.calls))
+
+
+llm_flight = SingleFlight("llm")
+tts_flight = SingleFlight("tts")
+
+############################### Response Cache ###############################
 
-def set_cache(key, value):
-    with cache_lock:
-        if len(chatgpt_cache) >= MAX_CACHE_SIZE:
-            chatgpt_cache.pop(next(iter(chatgpt_cache)))
-        chatgpt_cache[key] = value
+def normalize_prompt(prompt):
+    return " ".join(re.sub(r"[^\w\s']", " ", prompt.lower()).split())
+
+class ResponseCache:
+    """
+    Two-tier cache: a thread-safe in-memory LRU in front of a SQLite file.
+    Maps normalized prompt -> ChatGPT reply; the reply's audio for each voice is
+    then found in audio_store, so a warm restart skips OpenAI and ElevenLabs for
+    anything already paid for.
+    """
+
+    def __init__(self, db_path, max_entries=MAX_CACHE_SIZE, max_disk_entries=MAX_DISK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.lock = threading.Lock()
+        self.replies = OrderedDict()
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS replies ("
+                "prompt_key TEXT PRIMARY KEY, prompt TEXT, reply TEXT, last_used REAL)"
+            )
+
+    @staticmethod
+    def key(text):
+        return hashlib.md5(normalize_prompt(text).encode()).hexdigest()
+
+    def _remember(self, key, reply):
+        # Caller must hold self.lock
+        self.replies[key] = reply
+        self.replies.move_to_end(key)
+        while len(self.replies) > self.max_entries:
+            self.replies.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get_reply(self, prompt):
+        key = self.key(prompt)
+        with self.lock:
+            if key in self.replies:
+                self.replies.move_to_end(key)
+                self.counters["hits"] += 1
+                trace_event("cache", cache="response", result="hit")
+                return self.replies[key]
+            row = self.db.execute("SELECT reply FROM replies WHERE prompt_key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                trace_event("cache", cache="response", result="miss")
+                return None
+            with self.db:
+                self.db.execute("UPDATE replies SET last_used = ? WHERE prompt_key = ?", (time.time(), key))
+            self.counters["disk_hits"] += 1
+            trace_event("cache", cache="response", result="disk_hit")
+            self._remember(key, row[0])
+            return row[0]
+
+    def put_reply(self, prompt, reply):
+        key = self.key(prompt)
+        with self.lock:
+            self._remember(key, reply)
+            with self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?)",
+                    (key, normalize_prompt(prompt), reply, time.time()),
+                )
+                self.db.execute(
+                    "DELETE FROM replies WHERE prompt_key IN (SELECT prompt_key FROM replies "
+                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+
+    def clear_memory(self):
+        with self.lock:
+            self.replies.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                memory_entries=len(self.replies),
+                disk_entries=self.db.execute("SELECT COUNT(*) FROM replies").fetchone()[0],
+                hit_rate=round((lookups - self.counters["misses"]) / lookups, 3) if lookups else None,
+            )
+
+response_cache = ResponseCache(CACHE_DB)
+
+############################### Intent Matching ###############################
+
+EASTER_EGG_MATCH_THRESHOLD = float(os.getenv("EASTER_EGG_MATCH_THRESHOLD", "0.7"))
+# Voice switches need a switch phrase before the name: "let me talk to nikki" is one,
+# "is tom hanks a good actor" isn't. Longer phrases ("let me speak to") end in these.
+VOICE_SWITCH_PHRASES = ["switch to", "change to", "talk to", "speak to", "talk with", "speak with", "put on"]
+VOICE_NAMES = {"tom": VOICE_TOM, "major tom": VOICE_TOM, "nikki": VOICE_NIKKI}
+# Song requests need a request phrase: "sing me a song" is one, "I sing in the shower" isn't
+SONG_PHRASES = ["sing me", "sing us", "sing a", "sing something", "a song", "another song"]
+# Interrupt words only count at the start of a short utterance, after filler at most:
+# "stop" and "okay stop it" interrupt, "don't stop believing" and "what is next" don't
+INTERRUPT_LEAD_WORDS = {"okay", "ok", "oh", "alright", "please", "just", "god", "hey", "that's", "thats"}
+INTERRUPT_MAX_EXTRA_WORDS = 2
+
+class IntentMatcher:
+    """
+    Classifies an utterance in one pass. Command phrases are compiled into a
+    word-level Aho-Corasick automaton, so "switch to tom" matches but "switch to
+    tomorrow's news" doesn't. Easter eggs are also looked up in a token-set index, so
+    "what is love baby" or "open the pod bay doors hal please" still find their key.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        self.egg_tokens = {}
+        self.egg_index = {}
+        for phrase in WAKE_UP_WORDS:
+            self.add_phrase(phrase, ("wake", None))
+        for lead in VOICE_SWITCH_PHRASES:
+            for name, voice in VOICE_NAMES.items():
+                self.add_phrase(f"{lead} {name}", ("voice_switch", voice))
+        for phrase in SONG_PHRASES:
+            self.add_phrase(phrase, ("song", None))
+        for phrase in INTERRUPT_KEYWORDS:
+            self.add_phrase(phrase, ("interrupt", None))
+        for phrase in DYNAMIC_KEYWORDS:
+            self.add_phrase(phrase, ("dynamic", None))
+        for key in EASTER_EGGS:
+            self.add_phrase(normalize_prompt(key), ("easter_egg", key))
+            tokens = frozenset(normalize_prompt(key).split())
+            self.egg_tokens[key] = tokens
+            for token in tokens:
+                self.egg_index.setdefault(token, set()).add(key)
+        self.build_failure_links()
+
+    def add_phrase(self, phrase, match):
+        state = 0
+        for token in phrase.split():
+            if token not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[state][token] = len(self.goto) - 1
+            state = self.goto[state][token]
+        self.outputs[state].append(match + (len(phrase.split()),))
+
+    def build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(token, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def scan(self, text):
+        """Returns every (kind, payload, first word index, phrase length) found in text."""
+        matches = []
+        state = 0
+        for index, token in enumerate(normalize_prompt(text).split()):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            matches.extend((kind, payload, index + 1 - length, length) for kind, payload, length in self.outputs[state])
+        return matches
+
+    def match_easter_egg(self, tokens):
+        candidates = set()
+        for token in tokens:
+            candidates |= self.egg_index.get(token, set())
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            key_tokens = self.egg_tokens[key]
+            score = len(tokens & key_tokens) / len(tokens | key_tokens)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= EASTER_EGG_MATCH_THRESHOLD else None
+
+    def classify(self, text):
+        """
+        Returns (intent, payload, dynamic). Intent is one of voice_switch, song,
+        easter_egg, interrupt or chat, checked in that order.
+        """
+        tokens = normalize_prompt(text).split()
+        matches = self.scan(text)
+        kinds = {kind: payload for kind, payload, _, _ in matches}
+        dynamic = "dynamic" in kinds
+        if "voice_switch" in kinds:
+            return "voice_switch", kinds["voice_switch"], dynamic
+        if "song" in kinds:
+            return "song", None, dynamic
+        egg_key = kinds["easter_egg"] if "easter_egg" in kinds else self.match_easter_egg(frozenset(tokens))
+        if egg_key:
+            return "easter_egg", egg_key, dynamic
+        for kind, _, start, length in matches:
+            if (kind == "interrupt" and all(token in INTERRUPT_LEAD_WORDS for token in tokens[:start])
+                    and len(tokens) - start - length <= INTERRUPT_MAX_EXTRA_WORDS):
+                return "interrupt", None, dynamic
+        return "chat", None, dynamic
+
+    def has_wake_word(self, text):
+        return any(kind == "wake" for kind, _, _, _ in self.scan(text))
+
+intent_matcher = IntentMatcher()
+
+############################### Semantic Reply Cache ###############################
+
+# Optional near-duplicate cache: "are you real" and "are you real god" can share one
+# reply and its audio. Prompts are embedded with SEMANTIC_CACHE_MODEL (a local
+# sentence-transformers model) when set, otherwise with a hashed character n-gram
+# vectorizer that catches rewordings but not true paraphrases.
+SEMANTIC_CACHE_MODE = os.getenv("SEMANTIC_CACHE_MODE", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL")  # e.g. all-MiniLM-L6-v2
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_HASH_DIMENSIONS = 4096
+# Rough list prices, only used to report estimated savings
+OPENAI_COST_PER_CALL = float(os.getenv("OPENAI_COST_PER_CALL", "0.0002"))
+ELEVENLABS_COST_PER_CHAR = float(os.getenv("ELEVENLABS_COST_PER_CHAR", "0.0003"))
+
+class HashedNgramEmbedder:
+    def __init__(self, dimensions=SEMANTIC_HASH_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, text):
+        text = normalize_prompt(text)
+        padded = f" {text} "
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for index in range(len(padded) - 2):
+            vector[zlib.crc32(padded[index:index + 3].encode()) % self.dimensions] += 1.0
+        for word in text.split():
+            vector[zlib.crc32(f"w:{word}".encode()) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class SentenceModelEmbedder:
+    def __init__(self, model_name):
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text):
+        return self.model.encode(normalize_prompt(text), normalize_embeddings=True).astype(np.float32)
+
+class SemanticReplyCache:
+    """
+    Per-voice index of prompts whose reply has audio rendered in that voice. Each
+    namespace is a preallocated matrix of unit vectors, so a lookup is a single
+    matrix-vector product; when full, the oldest rows are overwritten. Entries keep
+    the clips the reply was played from, since chunked and streamed replies have
+    one clip per sentence or clause rather than one for the whole reply.
+    """
+
+    def __init__(self, embedder, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.namespaces = {}
+        self.miss_latency = None  # Moving average of a full ChatGPT + TTS turn
+        self.counters = {"hits": 0, "misses": 0, "avoided_openai_calls": 0, "avoided_tts_chars": 0,
+                         "estimated_savings_usd": 0.0, "estimated_latency_saved_s": 0.0}
+
+    def _namespace(self, voice):
+        # Caller must hold self.lock
+        if voice not in self.namespaces:
+            self.namespaces[voice] = {
+                "matrix": np.zeros((self.max_entries, self.embedder.dimensions), dtype=np.float32),
+                "prompts": [None] * self.max_entries,
+                "replies": [None] * self.max_entries,
+                "clips": [None] * self.max_entries,
+                "known": set(),
+                "size": 0,
+                "next": 0,
+            }
+        return self.namespaces[voice]
+
+    def add(self, prompt, reply, voice, clips=None):
+        key = normalize_prompt(prompt)
+        vector = self.embedder.embed(prompt)
+        with self.lock:
+            namespace = self._namespace(voice)
+            if key in namespace["known"]:
+                return
+            row = namespace["next"]
+            namespace["known"].discard(namespace["prompts"][row])
+            namespace["matrix"][row] = vector
+            namespace["prompts"][row] = key
+            namespace["replies"][row] = reply
+            namespace["clips"][row] = list(clips) if clips else None
+            namespace["known"].add(key)
+            namespace["next"] = (row + 1) % self.max_entries
+            namespace["size"] = min(namespace["size"] + 1, self.max_entries)
+
+    def lookup(self, prompt, voice):
+        """Returns (reply, similarity, matched prompt) for the closest prompt above the threshold, or None."""
+        vector = self.embedder.embed(prompt)
+        with self.lock:
+            namespace = self.namespaces.get(voice)
+            if namespace and namespace["size"]:
+                similarities = namespace["matrix"][:namespace["size"]] @ vector
+                row = int(np.argmax(similarities))
+                similarity = float(similarities[row])
+                reply = namespace["replies"][row]
+                clips = namespace["clips"][row]
+                if similarity >= self.threshold and (
+                        all(os.path.isfile(clip) for clip in clips) if clips else audio_store.contains(reply, voice)):
+                    self.counters["hits"] += 1
+                    self.counters["avoided_openai_calls"] += 1
+                    self.counters["avoided_tts_chars"] += len(reply)
+                    self.counters["estimated_savings_usd"] += OPENAI_COST_PER_CALL + ELEVENLABS_COST_PER_CHAR * len(reply)
+                    self.counters["estimated_latency_saved_s"] += self.miss_latency or 0.0
+                    return reply, similarity, namespace["prompts"][row]
+            self.counters["misses"] += 1
+            return None
+
+    def observe_miss_latency(self, seconds):
+        with self.lock:
+            self.miss_latency = seconds if self.miss_latency is None else 0.9 * self.miss_latency + 0.1 * seconds
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                estimated_savings_usd=round(self.counters["estimated_savings_usd"], 4),
+                estimated_latency_saved_s=round(self.counters["estimated_latency_saved_s"], 2),
+                threshold=self.threshold,
+                entries={voice: namespace["size"] for voice, namespace in self.namespaces.items()},
+            )
+
+def build_semantic_cache():
+    if not SEMANTIC_CACHE_MODE:
+        return None
+    if np is None:
+        raise ValueError("SEMANTIC_CACHE_MODE is enabled but numpy is not installed.")
+    if SEMANTIC_CACHE_MODEL:
+        if SentenceTransformer is None:
+            raise ValueError("SEMANTIC_CACHE_MODEL is set but sentence-transformers is not installed.")
+        return SemanticReplyCache(SentenceModelEmbedder(SEMANTIC_CACHE_MODEL))
+    return SemanticReplyCache(HashedNgramEmbedder())
+
+semantic_cache = build_semantic_cache()
 
 ############################### Debug Logging ###############################
 
-DEBUG = True
-LOG_FILE = f"{BASE_DIR}/app_debug.log"
+DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+CONSOLE_LOG = os.getenv("CONSOLE_LOG", "true").lower() == "true"
 
 # Ensure the log directory exists
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
-# Create and configure the logger
+
+class JsonLineFormatter(logging.Formatter):
+    """Formats a record as one compact JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        data = getattr(record, "structured_data", None)
+        if data:
+            entry["data"] = data
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable line, followed by the structured data as compact JSON."""
+
+    def format(self, record):
+        line = super().format(record)
+        data = getattr(record, "structured_data", None)
+        if data:
+            line = f"{line} {json.dumps(data, separators=(',', ':'), default=str)}"
+        return line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues the record untouched, leaving all formatting to the listener thread.
+    Records headed for another process are flattened first, as QueueHandler does,
+    since they have to be pickled.
+    """
+
+    def prepare(self, record):
+        if not isinstance(self.queue, multiprocessing.queues.Queue):
+            return record
+        record = super().prepare(record)
+        data = getattr(record, "structured_data", None)
+        if data:
+            record.structured_data = json.loads(json.dumps(data, default=str))
+        return record
+
+
+# Callers only enqueue records; formatting, serialization and file I/O happen
+# on the listener thread.
+log_queue = queue.SimpleQueue()
+
+file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+file_handler.setFormatter(JsonLineFormatter())
+
+log_handlers = [file_handler]
+if CONSOLE_LOG:
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(ConsoleFormatter("%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    log_handlers.append(console_handler)
+
 logger = logging.getLogger("app_logger")
 logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+queue_handler = DeferredQueueHandler(log_queue)
+logger.addHandler(queue_handler)
+logger.propagate = False
 
-# Create a file handler for logging to a file
-file_handler = logging.FileHandler(LOG_FILE)
-file_handler.setLevel(logging.DEBUG)
+log_listener = None
+worker_log_queue = None  # Set by share_log_queue under gunicorn
+worker_log_listener = None
 
-# Create a console handler for logging to the console
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
 
-# Define the logging format
-formatter = logging.Formatter(
-    "%(asctime)s - %(levelname)s - %(message)s", 
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
+def start_logging():
+    """Starts the listener thread that drains the log queue."""
+    global log_listener
+    if log_listener is None:
+        log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+        log_listener.start()
 
-# Add both handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
 
-def debug_log(message, structured_data=None):
-    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-    if structured_data:
-        formatted_data = json.dumps(structured_data, indent=4)
-        log_message = f"{timestamp} DEBUG: {message}\n{formatted_data}"
-    else:
-        log_message = f"{timestamp} DEBUG: {message}"
-    with open(LOG_FILE, "a") as log:
-        log.write(log_message + "\n")
-    print(log_message)
+def stop_logging():
+    """Flushes queued records and stops the listener threads."""
+    global log_listener, worker_log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+    if worker_log_listener is not None:
+        worker_log_listener.stop()
+        worker_log_listener = None
 
-############################### Free Port Utility ###############################
 
-def free_port(port):
-    try:
-        pid_output = subprocess.check_output(["lsof", "-t", f"-i:{port}"], text=True).strip()
-        for pid in pid_output.split("\n"):
-            subprocess.run(["kill", "-9", pid], check=True)
-        debug_log(f"Port {port} freed successfully.")
-        time.sleep(1)  # Allow time for the OS to release the port
-    except subprocess.CalledProcessError:
-        debug_log(f"No process found using port {port}.")
-    except Exception as e:
-        debug_log(f"Error freeing port {port}: {e}")
+def share_log_queue():
+    """
+    Creates the queue forked workers send their records on, drained here by a
+    second listener, so this process stays the only one writing (and rotating)
+    the log file. This process keeps logging through its own queue and never puts
+    to the shared one, whose feeder thread and lock must not be forked mid-write.
+    Call before forking.
+    """
+    global worker_log_queue, worker_log_listener
+    if worker_log_queue is None:
+        worker_log_queue = multiprocessing.Queue()
+        worker_log_listener = QueueListener(worker_log_queue, *log_handlers, respect_handler_level=True)
+        worker_log_listener.start()
+
+
+def detach_log_listener():
+    # In a forked worker: none of the parent's listener threads exist here, so
+    # records go to the parent over the shared queue
+    global log_listener, worker_log_listener
+    log_listener = worker_log_listener = None
+    if worker_log_queue is not None:
+        queue_handler.queue = worker_log_queue
+
+
+start_logging()
+atexit.register(stop_logging)
+
+
+def debug_log(message, structured_data=None):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug(message, extra={"structured_data": structured_data})
+
+############################### Call Tracing ###############################
+
+# With TRACE_DIR set, each /voice turn is written as one JSON line: the Twilio form
+# fields needed to replay it, the feature flags in effect, and a timeline of cache
+# decisions and provider calls. benchmarks/replay_traces.py re-drives the traces
+# through /voice against stub providers, optionally under a profiler.
+TRACE_DIR = os.getenv("TRACE_DIR")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+TRACE_FORM_FIELDS = ("CallSid", "CallStatus", "SpeechResult", "Confidence")  # Caller numbers are left out
+TRACE_FLAGS = (
+    "ASYNC_VOICE_MODE", "CHUNKED_TTS_MODE", "STREAMING_REPLY_MODE", "SPECULATIVE_MODE",
+    "MEDIA_STREAM_MODE", "TWILIO_AUDIO_FORMAT",
+)
+
+active_trace = contextvars.ContextVar("active_trace", default=None)
+trace_files = {}  # pid -> open trace file, so forked workers never share one
+trace_lock = threading.Lock()
+
+
+class CallTrace:
+    def __init__(self, path, form):
+        self.start = time.time()
+        self.record = {
+            "ts": round(self.start, 3),
+            "pid": os.getpid(),
+            "path": path,
+            "form": {field: form[field] for field in TRACE_FORM_FIELDS if field in form},
+            "flags": {flag: globals().get(flag) for flag in TRACE_FLAGS},
+            "events": [],
+        }
+        self.closed = False
+
+    def event(self, kind, **fields):
+        # Background work that outlives the request is not recorded
+        if not self.closed:
+            self.record["events"].append(dict(kind=kind, ms=round((time.time() - self.start) * 1000, 1), **fields))
+
+    def finish(self, status, body_bytes):
+        self.closed = True
+        self.record.update(status=status, response_bytes=body_bytes, ms=round((time.time() - self.start) * 1000, 1))
+
+
+def trace_event(kind, **fields):
+    """Adds an event to the trace of the /voice turn this thread is working for, if any."""
+    trace = active_trace.get()
+    if trace is not None:
+        trace.event(kind, **fields)
+
+
+def submit_traced(executor, fn, *args):
+    # Pool threads don't inherit context variables, so carry the active trace along
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def write_trace(trace):
+    line = json.dumps(trace.record, separators=(",", ":")) + "\n"
+    with trace_lock:
+        trace_file = trace_files.get(os.getpid())
+        if trace_file is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+            trace_file = trace_files[os.getpid()] = open(path, "a", buffering=1)
+        trace_file.write(line)
+
+
+def traced(view):
+    """Records a trace of each request to view when TRACE_DIR is set."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not TRACE_DIR or random.random() >= TRACE_SAMPLE_RATE:
+            return view(*args, **kwargs)
+        trace = CallTrace(request.path, request.form)
+        token = active_trace.set(trace)
+        status, body_bytes = 500, 0
+        try:
+            result = view(*args, **kwargs)
+            body, status = (result[0], result[1]) if isinstance(result, tuple) else (result, 200)
+            body_bytes = len(body) if isinstance(body, (str, bytes)) else 0
+            return result
+        finally:
+            active_trace.reset(token)
+            trace.finish(status, body_bytes)
+            try:
+                write_trace(trace)
+            except OSError as e:
+                debug_log(f"Could not write trace: {e}")
+    return wrapper
 
 ############################### ElevenLabs TTS ###############################
 
-def generate_tts_streaming(text, filename=None, play=False):
+ULAW_SAMPLE_RATE = 8000
+
+def audio_format_of(filename):
+    return "ulaw" if filename.endswith(AUDIO_EXTENSIONS["ulaw"]) else "mp3"
+
+def ulaw_wav_header(data_length):
+    """RIFF header for data_length bytes of 8 kHz mono mu-law (WAVE_FORMAT_MULAW)."""
+    return (
+        b"RIFF" + struct.pack("<I", 50 + data_length + data_length % 2) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHHH", 18, 7, 1, ULAW_SAMPLE_RATE, ULAW_SAMPLE_RATE, 1, 8, 0)
+        + b"fact" + struct.pack("<II", 4, data_length)
+        + b"data" + struct.pack("<I", data_length)
+    )
+
+def read_ulaw_wav(path):
+    """Returns the mu-law samples in a WAV file written by generate_tts_streaming."""
+    with open(path, "rb") as audio_file:
+        audio = audio_file.read()
+    offset = 12
+    while offset + 8 <= len(audio):
+        chunk_id, size = audio[offset:offset + 4], struct.unpack("<I", audio[offset + 4:offset + 8])[0]
+        if chunk_id == b"data":
+            return audio[offset + 8:offset + 8 + size]
+        offset += 8 + size + size % 2
+    raise ValueError(f"{path} has no data chunk")
+
+def generate_tts_streaming(text, filename=None, play=False, voice=None):
+    """
+    Renders text to filename. A .wav filename gets 8 kHz mu-law audio in a WAV
+    container; anything else gets ElevenLabs' default MP3.
+    """
+    voice = voice or current_voice
     if not filename:
-        filename = os.path.join(CACHE_DIR, f"dynamic_{hashlib.md5(text.encode()).hexdigest()}.mp3")
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{current_voice}/stream?optimize_streaming_latency=3"
-    headers = {"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
+        filename = audio_store.path_for(text, voice, "mp3" if play else None)
+    audio_format = audio_format_of(filename)
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice}/stream?optimize_streaming_latency=3"
+    if audio_format == "ulaw":
+        url += "&output_format=ulaw_8000"
     data = {
         "text": text,
-        "voice_settings": {
-            "stability": 0.3,
-            "similarity_boost": 0.4
-        }
+        "voice_settings": TTS_VOICE_SETTINGS
     }
+    if TTS_MODEL_ID:
+        data["model_id"] = TTS_MODEL_ID
+    slot = tts_slots.acquire()
+    if slot is None:
+        trace_event("provider", provider="ElevenLabs", skipped="no slot")
+        return None
+    if not tts_breaker.allow():
+        tts_slots.release(slot)
+        trace_event("provider", provider="ElevenLabs", skipped="circuit open")
+        # Fail fast so the caller plays fallback audio instead of waiting on timeouts
+        debug_log("ElevenLabs circuit open. Skipping TTS.")
+        return None
+    # Write to a private temp file and rename, so readers never see a partial clip
+    temp_filename = f"{filename}.{uuid.uuid4().hex}.part"
     try:
         start_time = time.time()
-        response = requests.post(url, json=data, headers=headers, stream=True)
-        if response.status_code == 200:
-            with open(filename, "wb") as audio_file:
+        with tts_http.post(url, json=data, stream=True, timeout=PROVIDER_TIMEOUT) as response:
+            if response.status_code == 429 or response.status_code >= 500:
+                tts_breaker.record_failure()
+            else:
+                tts_breaker.record_success()
+            if response.status_code != 200:
+                trace_event("provider", provider="ElevenLabs", status=response.status_code,
+                            duration_ms=round((time.time() - start_time) * 1000, 1))
+                debug_log(f"TTS failed with status {response.status_code}: {response.text}")
+                return None
+            first_byte_ms = round((time.time() - start_time) * 1000, 1)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(temp_filename, "wb") as audio_file:
+                if audio_format == "ulaw":
+                    # ElevenLabs sends bare samples; the header is rewritten once their length is known
+                    audio_file.write(ulaw_wav_header(0))
+                data_length = 0
                 for chunk in response.iter_content(chunk_size=512):
                     audio_file.write(chunk)
-            latency = time.time() - start_time
-            debug_log(f"TTS saved to {filename}. Latency: {latency:.2f} seconds")
-            # Kill any existing playback (to avoid overlapping audio on Pi)
-            os.system("pkill -9 mpg123")
-            # When used via Twilio, do not play locally.
-            if play:
-                os.system(f"mpg123 {filename}")
-            return filename
-        else:
-            debug_log(f"TTS failed with status {response.status_code}: {response.text}")
-            return None
+                    data_length += len(chunk)
+                if audio_format == "ulaw":
+                    audio_file.write(b"\0" * (data_length % 2))
+                    audio_file.seek(0)
+                    audio_file.write(ulaw_wav_header(data_length))
+        os.replace(temp_filename, filename)
+        audio_store.add(filename)
+        latency = time.time() - start_time
+        trace_event("provider", provider="ElevenLabs", status=200, duration_ms=round(latency * 1000, 1),
+                    first_byte_ms=first_byte_ms, request_bytes=len(text.encode()), response_bytes=data_length,
+                    format=audio_format)
+        debug_log(f"TTS saved to {filename}. Latency: {latency:.2f} seconds")
+        # Local playback is sequential (mpg123 blocks), so nothing needs killing here; clauses
+        # of a streamed reply render while the one before them is still playing.
+        # When used via Twilio, do not play locally.
+        if play and audio_format == "mp3":
+            os.system(f"mpg123 {filename}")
+        return filename
     except Exception as e:
+        tts_breaker.record_failure()
+        trace_event("provider", provider="ElevenLabs", duration_ms=round((time.time() - start_time) * 1000, 1),
+                    error=type(e).__name__)
         debug_log(f"TTS streaming exception: {e}")
         return None
+    finally:
+        tts_slots.release(slot)
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+############################### Audio Store ###############################
+
+def voice_partition(voice):
+    return re.sub(r"[^A-Za-z0-9_-]", "_", voice)
+
+ACCESS_TOUCH_INTERVAL = 60  # Seconds between on-disk access-time updates for a clip
+
+class AudioStore:
+    """
+    Content-addressed store for rendered speech. A clip lives at
+    <root>/<voice>/<sha256 of text, voice, settings and model>.<mp3 or wav>, so
+    the same line in the same voice and format always resolves to the same file. An in-memory index
+    of existing clips (path -> [size, last access]) answers lookups without
+    touching the filesystem and drives LRU eviction. Files directly under root,
+    such as welcome.mp3, are not managed by the store.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.index = {}
+        self.pinned = set()
+        self.counters = {"hits": 0, "renders": 0, "failed_renders": 0, "evictions": 0}
+        self.scan()
+
+    def partitions(self):
+        for partition in os.listdir(self.root):
+            directory = os.path.join(self.root, partition)
+            if os.path.isdir(directory):
+                yield directory
+
+    def scan(self):
+        index = {}
+        for directory in self.partitions():
+            for name in os.listdir(directory):
+                if name.endswith(tuple(AUDIO_EXTENSIONS.values())):
+                    path = os.path.abspath(os.path.join(directory, name))
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # Evicted by another worker since listdir
+                    index[path] = [stat.st_size, max(stat.st_atime, stat.st_mtime)]
+        with self.lock:
+            self.index = index
+
+    @staticmethod
+    def key(text, voice):
+        material = json.dumps([text.strip(), voice, TTS_VOICE_SETTINGS, TTS_MODEL_ID], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def path_for(self, text, voice=None, audio_format=None):
+        # Without an audio_format, the clip is the one Twilio plays
+        voice = voice or current_voice
+        extension = AUDIO_EXTENSIONS[audio_format or TWILIO_AUDIO_FORMAT]
+        return os.path.join(self.root, voice_partition(voice), f"{self.key(text, voice)}{extension}")
+
+    def manages(self, path):
+        return os.path.dirname(os.path.dirname(os.path.abspath(path))) == os.path.abspath(self.root)
+
+    def add(self, path):
+        path = os.path.abspath(path)
+        if self.manages(path):
+            size = os.path.getsize(path)
+            with self.lock:
+                self.index[path] = [size, time.time()]
+            if media_publisher is not None:
+                media_publisher.publish(path)
+
+    def discard(self, path):
+        with self.lock:
+            self.index.pop(os.path.abspath(path), None)
+
+    def pin(self, paths):
+        # Pinned clips (e.g. the audio bank) are never evicted
+        with self.lock:
+            self.pinned.update(os.path.abspath(path) for path in paths)
+
+    def contains(self, text, voice=None, audio_format=None):
+        # Like lookup, but doesn't count as a hit or refresh the clip's access time
+        with self.lock:
+            return os.path.abspath(self.path_for(text, voice, audio_format)) in self.index
+
+    def lookup(self, text, voice=None, audio_format=None):
+        path = self.path_for(text, voice, audio_format)
+        now = time.time()
+        with self.lock:
+            entry = self.index.get(os.path.abspath(path))
+            stale_access = entry is not None and now - entry[1] > ACCESS_TOUCH_INTERVAL
+            if entry is not None:
+                entry[1] = now
+        if entry is None:
+            # Another worker process may have rendered it since this index was built
+            if not os.path.exists(path):
+                trace_event("cache", cache="audio", result="miss")
+                return None
+            self.add(path)
+        elif stale_access:
+            # Record the access on disk too, for the janitor in whichever process runs it
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self.discard(path)
+                return None
+        with self.lock:
+            self.counters["hits"] += 1
+        trace_event("cache", cache="audio", result="hit")
+        return path
+
+    def get_or_render(self, text, voice=None, play=False, audio_format=None):
+        """
+        Returns the clip for text in voice, rendering it with ElevenLabs only on a
+        miss. Clips played locally are always MP3.
+        """
+        if play:
+            audio_format = "mp3"
+        path = self.lookup(text, voice, audio_format)
+        if path:
+            if play:
+                os.system(f"mpg123 {path}")
+            return path
+        # Concurrent requests for the same clip wait for one render instead of racing on its file
+        (path, played), shared = tts_flight.do(
+            self.path_for(text, voice, audio_format), self.render, text, voice, play, audio_format)
+        if shared:
+            trace_event("coalesced", work="tts")
+        if play and path and (shared or not played):
+            os.system(f"mpg123 {path}")
+        return path
+
+    def render(self, text, voice=None, play=False, audio_format=None):
+        """Renders a clip under tts_flight. Returns (path, whether it was played while rendering)."""
+        if self.contains(text, voice, audio_format):
+            # A duplicate finished rendering between our lookup and taking the flight
+            return self.lookup(text, voice, audio_format), False
+        path = generate_tts_streaming(text, self.path_for(text, voice, audio_format), play=play, voice=voice)
+        with self.lock:
+            self.counters["renders" if path else "failed_renders"] += 1
+        return path, play
+
+    def save_ulaw(self, text, voice, samples):
+        """Stores mu-law samples rendered elsewhere (e.g. for a media stream) as text's WAV clip."""
+        path = self.path_for(text, voice, "ulaw")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.part"
+        with open(temp_path, "wb") as audio_file:
+            audio_file.write(ulaw_wav_header(len(samples)) + samples + b"\0" * (len(samples) % 2))
+        os.replace(temp_path, path)
+        self.add(path)
+        with self.lock:
+            self.counters["renders"] += 1
+        return path
+
+    def evict(self, max_bytes, max_files, max_age):
+        """
+        Removes least recently used clips until the store is within max_bytes and
+        max_files, and no clip has gone unused for longer than max_age seconds.
+        """
+        now = time.time()
+        with self.lock:
+            total_bytes = sum(size for size, _ in self.index.values())
+            total_files = len(self.index)
+            victims = []
+            for path, (size, last_access) in sorted(self.index.items(), key=lambda item: item[1][1]):
+                if total_bytes <= max_bytes and total_files <= max_files and now - last_access <= max_age:
+                    break
+                if path in self.pinned:
+                    continue
+                victims.append(path)
+                total_bytes -= size
+                total_files -= 1
+            for path in victims:
+                del self.index[path]
+            self.counters["evictions"] += len(victims)
+        for path in victims:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return victims
+
+    def remove_stale_parts(self, max_age=3600):
+        # Temp files and render markers left behind by a crashed or killed render
+        cutoff = time.time() - max_age
+        for directory in self.partitions():
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name.endswith((".part", PENDING_SUFFIX)) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+
+    def occupancy(self):
+        with self.lock:
+            partitions = {}
+            for path, (size, _) in self.index.items():
+                partition = partitions.setdefault(os.path.basename(os.path.dirname(path)), {"files": 0, "bytes": 0})
+                partition["files"] += 1
+                partition["bytes"] += size
+        return {
+            "files": sum(partition["files"] for partition in partitions.values()),
+            "bytes": sum(partition["bytes"] for partition in partitions.values()),
+            "max_files": CACHE_MAX_FILES,
+            "max_bytes": CACHE_MAX_BYTES,
+            "max_age_seconds": CACHE_MAX_AGE,
+            "partitions": partitions,
+        }
+
+    def report(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["renders"]
+            return dict(
+                self.counters,
+                clips=len(self.index),
+                elevenlabs_calls_saved=self.counters["hits"],
+                dedup_rate=round(self.counters["hits"] / lookups, 3) if lookups else None,
+            )
+
+audio_store = AudioStore(CACHE_DIR)
+
+def cache_url(path):
+    if media_publisher is not None:
+        url = media_publisher.url_for(path)
+        if url:
+            return url
+    return f"{PUBLIC_BASE_URL}/static/{os.path.relpath(path, STATIC_DIR)}"
+
+############################### Media Publisher ###############################
+
+# Optional offload of audio store clips to an S3-compatible bucket (S3, R2, MinIO, ...),
+# so Twilio downloads replies from the bucket or a CDN in front of it instead of this host.
+MEDIA_BUCKET = os.getenv("MEDIA_BUCKET")
+MEDIA_BUCKET_ENDPOINT = os.getenv("MEDIA_BUCKET_ENDPOINT")  # e.g. http://localhost:9000 for MinIO
+MEDIA_BUCKET_PREFIX = os.getenv("MEDIA_BUCKET_PREFIX", "audio").strip("/")
+MEDIA_PUBLIC_URL = os.getenv("MEDIA_PUBLIC_URL")  # Where objects are served from, e.g. a CDN
+MEDIA_PUBLISH_WORKERS = int(os.getenv("MEDIA_PUBLISH_WORKERS", "4"))
+MEDIA_PUBLISHED_MAX = int(os.getenv("MEDIA_PUBLISHED_MAX", "10000"))  # Bucket URLs remembered per worker
+
+class MediaPublisher:
+    """
+    Uploads audio store clips to a bucket in the background and remembers which
+    ones are there. A clip is served from this host until its upload finishes.
+    Clips are content-addressed, so an object never needs to be replaced and one
+    that is already in the bucket (from before a restart, or another worker) is
+    only checked, not uploaded again.
+    """
+
+    def __init__(self, bucket, endpoint=None, prefix="", public_url=None):
+        if boto3 is None:
+            raise ValueError("MEDIA_BUCKET is set but the boto3 package is not installed.")
+        self.client = boto3.client("s3", endpoint_url=endpoint)
+        self.bucket = bucket
+        self.prefix = prefix
+        default_url = f"{endpoint.rstrip('/')}/{bucket}" if endpoint else f"https://{bucket}.s3.amazonaws.com"
+        self.public_url = (public_url or default_url).rstrip("/")
+        self.lock = threading.Lock()
+        self.published = OrderedDict()  # Path relative to STATIC_DIR -> public URL, least recently used first
+        self.pending = set()
+        self.pool = ThreadPoolExecutor(max_workers=MEDIA_PUBLISH_WORKERS, thread_name_prefix="publish")
+        self.counters = {"uploads": 0, "already_present": 0, "failures": 0}
+
+    def object_key(self, relative_path):
+        return f"{self.prefix}/{relative_path}" if self.prefix else relative_path
+
+    def publish(self, path):
+        relative_path = os.path.relpath(path, STATIC_DIR)
+        with self.lock:
+            if relative_path in self.published or relative_path in self.pending:
+                return
+            self.pending.add(relative_path)
+        self.pool.submit(self._upload, path, relative_path)
+
+    def _upload(self, path, relative_path):
+        key = self.object_key(relative_path)
+        try:
+            try:
+                self.client.head_object(Bucket=self.bucket, Key=key)
+                counter = "already_present"
+            except botocore.exceptions.ClientError:
+                self.client.upload_file(path, self.bucket, key, ExtraArgs={
+                    "ContentType": mimetypes.guess_type(path)[0] or "application/octet-stream",
+                    "CacheControl": "public, max-age=31536000, immutable",
+                })
+                counter = "uploads"
+            with self.lock:
+                self.published[relative_path] = f"{self.public_url}/{key}"
+                while len(self.published) > MEDIA_PUBLISHED_MAX:
+                    self.published.popitem(last=False)
+                self.counters[counter] += 1
+        except Exception as e:
+            with self.lock:
+                self.counters["failures"] += 1
+            debug_log(f"Publishing {relative_path} failed: {e}")
+        finally:
+            with self.lock:
+                self.pending.discard(relative_path)
+
+    def url_for(self, path):
+        """
+        Returns the clip's bucket URL, or None if it isn't there yet. A rendered clip
+        that isn't known to be in the bucket is scheduled for upload; one still being
+        rendered is published by AudioStore.add once it is complete.
+        """
+        relative_path = os.path.relpath(path, STATIC_DIR)
+        with self.lock:
+            url = self.published.get(relative_path)
+            if url is not None:
+                self.published.move_to_end(relative_path)
+        if url is None and audio_store.manages(path) and os.path.isfile(path):
+            self.publish(path)
+        return url
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, published=len(self.published), pending=len(self.pending))
+
+def build_media_publisher():
+    if not MEDIA_BUCKET:
+        return None
+    return MediaPublisher(MEDIA_BUCKET, MEDIA_BUCKET_ENDPOINT, MEDIA_BUCKET_PREFIX, MEDIA_PUBLIC_URL)
+
+media_publisher = build_media_publisher()
+
+############################### Cache Janitor ###############################
+
+# Quotas for the content-addressed audio store. Least recently played clips go first.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+CACHE_MAX_FILES = int(os.getenv("CACHE_MAX_FILES", "5000"))
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600
+JANITOR_INTERVAL = int(os.getenv("CACHE_JANITOR_INTERVAL", "300"))
+
+def run_cache_janitor():
+    try:
+        evicted = audio_store.evict(CACHE_MAX_BYTES, CACHE_MAX_FILES, CACHE_MAX_AGE)
+        audio_store.remove_stale_parts()
+        if evicted:
+            occupancy = audio_store.occupancy()
+            debug_log("Cache janitor evicted clips.", {
+                "Evicted": len(evicted),
+                "Files": occupancy["files"],
+                "Bytes": occupancy["bytes"],
+            })
+    except Exception as e:
+        debug_log(f"Cache janitor error: {e}")
+
+def try_lead(name, wait=False):
+    """
+    Takes an exclusive lock file so that only one worker process does a job, such
+    as running the janitor. Returns the open lock file (keep it open to stay the
+    leader) or None if another process holds it. With wait, blocks until the lock is free.
+    """
+    lock_file = open(f"{BASE_DIR}/.{name}.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return lock_file
+    except OSError:
+        lock_file.close()
+        return None
+
+def cache_janitor():
+    # Every process resyncs its index with the disk; only the leader evicts
+    leader = None
+    while True:
+        try:
+            leader = leader or try_lead("cache_janitor")
+            audio_store.scan()
+            if leader:
+                run_cache_janitor()
+        except Exception as e:
+            # One bad pass must not end the thread; the next one starts from a fresh scan
+            debug_log(f"Cache janitor error: {e}")
+        if shutdown_event.wait(JANITOR_INTERVAL):
+            break
+
+def start_cache_janitor():
+    janitor_thread = threading.Thread(target=cache_janitor, daemon=True)
+    janitor_thread.start()
+    return janitor_thread
 
 ############################### Define Personality ###############################
 
 current_mode = "john_oliver"
+LLM_FALLBACK_RESPONSE = "I'm having trouble connecting to divine wisdom right now."
 personality_prompts = {
     "john_oliver": (
         "You are a sarcastic and humorous version of God. Always respond with very short, witty, and punchy one-liners. "
@@ -235,149 +1656,568 @@ personality_prompts = {
     )
 }
 
+############################### Call Sessions ###############################
+
+# Per-call state keyed by Twilio's CallSid, so concurrent callers don't share a
+# voice or personality. Sessions are stored as JSON so the in-memory store and
+# the Redis store behave the same; point SESSION_REDIS_URL at any Redis-protocol
+# server to share sessions between workers.
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL")
+MAX_HISTORY_TURNS = 10
+CONVERSATION_CONTEXT_TURNS = int(os.getenv("CONVERSATION_CONTEXT_TURNS", "0"))  # Turns sent to ChatGPT
+
+class InMemorySessionStore:
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.last_prune = time.time()
+
+    def _prune(self):
+        # Caller must hold self.lock
+        now = time.time()
+        if now - self.last_prune < 60:
+            return
+        self.last_prune = now
+        for call_sid in [call_sid for call_sid, (expires, _) in self.sessions.items() if expires < now]:
+            del self.sessions[call_sid]
+
+    def load(self, call_sid):
+        with self.lock:
+            self._prune()
+            entry = self.sessions.get(call_sid)
+            if entry and entry[0] >= time.time():
+                return entry[1]
+            return None
+
+    def store(self, call_sid, data):
+        with self.lock:
+            self.sessions[call_sid] = (time.time() + self.ttl, data)
+
+    def delete(self, call_sid):
+        with self.lock:
+            self.sessions.pop(call_sid, None)
+
+class RedisSessionStore:
+    def __init__(self, url, ttl=SESSION_TTL):
+        if redis is None:
+            raise ValueError("SESSION_REDIS_URL is set but the redis package is not installed.")
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url)
+
+    def load(self, call_sid):
+        return self.client.get(f"callgod:session:{call_sid}")
+
+    def store(self, call_sid, data):
+        self.client.setex(f"callgod:session:{call_sid}", self.ttl, data)
+
+    def delete(self, call_sid):
+        self.client.delete(f"callgod:session:{call_sid}")
+
+session_store = RedisSessionStore(SESSION_REDIS_URL) if SESSION_REDIS_URL else InMemorySessionStore()
+
+def new_session():
+    return {
+        "voice": current_voice,
+        "mode": current_mode,
+        "history": [],
+        "latencies": [],
+        "turns": 0,
+        "started": time.time(),
+    }
+
+def get_session(call_sid):
+    data = session_store.load(call_sid) if call_sid else None
+    return json.loads(data) if data else new_session()
+
+def save_session(call_sid, session):
+    if call_sid:
+        session_store.store(call_sid, json.dumps(session))
+
+def record_turn(session, user_said, god_said, latencies):
+    session["turns"] += 1
+    session["history"].append({"user": user_said, "god": god_said})
+    session["latencies"].append(latencies)
+    del session["history"][:-MAX_HISTORY_TURNS]
+    del session["latencies"][:-MAX_HISTORY_TURNS]
+
 ############################### ChatGPT Response ###############################
 
-def get_chatgpt_response(prompt, dynamic=False):
-    cache_key = hashlib.md5(prompt.encode()).hexdigest()
-    if not dynamic and cache_key in chatgpt_cache:
-        debug_log(f"Cache hit for prompt: {prompt}")
-        return chatgpt_cache[cache_key]
+def get_chatgpt_response(prompt, dynamic=False, mode=None, history=None, voice=None, splitter=None, remember=True):
+    # Replies that depend on earlier turns are specific to one call, so skip the cache
+    if history:
+        dynamic = True
+    if not dynamic:
+        cached_reply = response_cache.get_reply(prompt)
+        if cached_reply is not None:
+            debug_log(f"Cache hit for prompt: {prompt}")
+            return cached_reply
+        if semantic_cache is not None and voice:
+            match = semantic_cache.lookup(prompt, voice)
+            trace_event("cache", cache="semantic", result="hit" if match else "miss")
+            if match:
+                debug_log("Semantic cache hit.", {
+                    "Prompt": prompt,
+                    "Matched Prompt": match[2],
+                    "Similarity": round(match[1], 3),
+                })
+                return match[0]
+        # Identical prompts in flight share one OpenAI call
+        reply, shared = llm_flight.do(
+            ResponseCache.key(prompt), fetch_chatgpt_reply, prompt, mode=mode, splitter=splitter, remember=remember)
+        if shared:
+            trace_event("coalesced", work="llm")
+            debug_log("Coalesced with an in-flight ChatGPT request.", {"Prompt": prompt})
+        return reply
+    return fetch_chatgpt_reply(prompt, dynamic=True, mode=mode, history=history, splitter=splitter)
+
+def fetch_chatgpt_reply(prompt, dynamic=False, mode=None, history=None, splitter=None, remember=True):
+    """
+    Calls OpenAI. With a ClauseSplitter, the reply is streamed and fed to it token
+    by token. Without remember, the reply is not stored in the response cache.
+    """
+    if not dynamic:
+        # A duplicate may have finished between our cache miss and taking the flight
+        cached_reply = response_cache.get_reply(prompt)
+        if cached_reply is not None:
+            return cached_reply
+    slot = openai_slots.acquire()
+    if slot is None:
+        trace_event("provider", provider="OpenAI", skipped="no slot")
+        return LLM_FALLBACK_RESPONSE
+    if not openai_breaker.allow():
+        openai_slots.release(slot)
+        trace_event("provider", provider="OpenAI", skipped="circuit open")
+        debug_log("OpenAI circuit open. Using fallback reply.")
+        return LLM_FALLBACK_RESPONSE
     try:
         start_time = time.time()
-        response = openai.ChatCompletion.create(
+        messages = [{"role": "system", "content": personality_prompts.get(mode or current_mode, "You are an AI.")}]
+        for turn in history or []:
+            messages.append({"role": "user", "content": turn["user"][:100]})
+            messages.append({"role": "assistant", "content": turn["god"]})
+        messages.append({"role": "user", "content": prompt[:100]})
+        response = openai_client.chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": personality_prompts.get("john_oliver", "You are an AI.")},
-                {"role": "user", "content": prompt[:100]}
-            ],
+            messages=messages,
             max_tokens=25,
-            temperature=0.7
+            temperature=0.7,
+            stream=splitter is not None,
         )
+        if splitter is None:
+            ai_response = response.choices[0].message.content
+        else:
+            tokens = []
+            for chunk in response:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    tokens.append(token)
+                    splitter.feed(token)
+            splitter.close()
+            ai_response = "".join(tokens)
         latency = time.time() - start_time
         debug_log(f"ChatGPT response latency: {latency:.2f} seconds")
-        ai_response = response["choices"][0]["message"]["content"]
-        if not dynamic:
-            set_cache(cache_key, ai_response)
+        trace_event("provider", provider="OpenAI", duration_ms=round(latency * 1000, 1), stream=splitter is not None,
+                    request_bytes=len(json.dumps(messages)), response_bytes=len(ai_response.encode()))
+        openai_breaker.record_success()
+        if not dynamic and remember:
+            response_cache.put_reply(prompt, ai_response)
         return ai_response
     except Exception as e:
+        openai_breaker.record_failure()
+        trace_event("provider", provider="OpenAI", duration_ms=round((time.time() - start_time) * 1000, 1),
+                    error=type(e).__name__)
         debug_log(f"Error fetching ChatGPT response: {e}")
-        return "I'm having trouble connecting to divine wisdom right now."
+        return LLM_FALLBACK_RESPONSE
+    finally:
+        openai_slots.release(slot)
 
 ############################### Vosk Speech Recognition ###############################
 
-def listen_to_user(audio_file="temp.wav"):
+MIC_DEVICE = os.getenv("MIC_DEVICE", "plughw:1,0")
+MIC_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30  # webrtcvad accepts 10, 20 or 30 ms frames
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "2"))  # 0-3, webrtcvad only
+VAD_ENERGY_THRESHOLD = int(os.getenv("VAD_ENERGY_THRESHOLD", "500"))  # RMS, used without webrtcvad
+VAD_START_FRAMES = 3  # Consecutive voiced frames before speech counts as started
+VAD_END_SILENCE = float(os.getenv("VAD_END_SILENCE", "0.6"))  # Seconds of silence that end an utterance
+LISTEN_NO_SPEECH_TIMEOUT = float(os.getenv("LISTEN_NO_SPEECH_TIMEOUT", "5"))
+LISTEN_MAX_SECONDS = float(os.getenv("LISTEN_MAX_SECONDS", "15"))
+MIC_BUFFER_SECONDS = 2.0
+MIC_PREROLL_SECONDS = 0.3  # Audio kept from just before listening starts, so first syllables aren't clipped
+RECOGNIZER_POOL_SIZE = int(os.getenv("RECOGNIZER_POOL_SIZE", "4"))
+
+
+class RecognizerPool:
+    """Reuses KaldiRecognizer instances for one sample rate instead of building one per utterance."""
+
+    def __init__(self, sample_rate, size=RECOGNIZER_POOL_SIZE):
+        self.sample_rate = sample_rate
+        self.size = size
+        self.idle = queue.LifoQueue()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return KaldiRecognizer(get_vosk_model(), self.sample_rate)
+
+    def release(self, recognizer):
+        recognizer.Reset()
+        if self.idle.qsize() < self.size:
+            self.idle.put(recognizer)
+
+
+recognizer_pools = {}
+recognizer_pools_lock = threading.Lock()
+
+
+def get_recognizer_pool(sample_rate):
+    with recognizer_pools_lock:
+        if sample_rate not in recognizer_pools:
+            recognizer_pools[sample_rate] = RecognizerPool(sample_rate)
+        return recognizer_pools[sample_rate]
+
+
+class VoiceActivityDetector:
+    """Classifies 16-bit mono PCM frames as speech, with webrtcvad when installed or an RMS threshold."""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(VAD_AGGRESSIVENESS) if webrtcvad is not None else None
+
+    def is_speech(self, frame):
+        if self.vad is not None:
+            return self.vad.is_speech(frame, self.sample_rate)
+        samples = array("h", frame)
+        if not samples:
+            return False
+        return math.sqrt(sum(sample * sample for sample in samples) / len(samples)) >= VAD_ENERGY_THRESHOLD
+
+
+class MicrophoneStream:
+    """
+    Keeps arecord running and holds the most recent PCM frames in an in-memory
+    ring buffer, so listening starts instantly and never touches the disk.
+    """
+
+    def __init__(self, device=MIC_DEVICE, sample_rate=MIC_SAMPLE_RATE, frame_ms=VAD_FRAME_MS):
+        self.device = device
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.frames = deque(maxlen=int(MIC_BUFFER_SECONDS * 1000 / frame_ms))
+        self.preroll_frames = int(MIC_PREROLL_SECONDS * 1000 / frame_ms)
+        self.condition = threading.Condition()
+        self.process = None
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.process = subprocess.Popen(
+                ["arecord", "-D", self.device, "-f", "S16_LE", "-r", str(self.sample_rate), "-c", "1", "-t", "raw", "-q"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+            threading.Thread(target=self._capture, args=(self.process,), daemon=True).start()
+
+    def _capture(self, process):
+        while True:
+            frame = process.stdout.read(self.frame_bytes)
+            if len(frame) < self.frame_bytes:
+                break
+            with self.condition:
+                self.frames.append(frame)
+                self.condition.notify_all()
+        with self.condition:
+            self.condition.notify_all()
+
+    def discard_stale(self):
+        # Keep only the pre-roll, so an utterance that has just begun is not clipped
+        with self.condition:
+            while len(self.frames) > self.preroll_frames:
+                self.frames.popleft()
+
+    def read(self, timeout=1.0):
+        with self.condition:
+            self.condition.wait_for(lambda: self.frames or not self.running, timeout)
+            return self.frames.popleft() if self.frames else None
+
+    def stream(self):
+        """
+        Yields frames until arecord exits. A frame that is late (a stalled device
+        or a busy Pi) is yielded as silence so the VAD can keep counting, rather
+        than ending the utterance.
+        """
+        silence = bytes(self.frame_bytes)
+        frame_seconds = self.frame_bytes / 2 / self.sample_rate
+        while True:
+            frame = self.read(timeout=frame_seconds)
+            if frame is None:
+                if not self.running:
+                    return
+                frame = silence
+            yield frame
+
+    def stop(self):
+        with self.condition:
+            if self.running:
+                self.process.terminate()
+
+
+microphone = MicrophoneStream()
+
+
+def transcribe_stream(frames, recognizer, vad, frame_seconds, on_partial=None,
+                      max_seconds=LISTEN_MAX_SECONDS, no_speech_timeout=LISTEN_NO_SPEECH_TIMEOUT):
+    """
+    Feeds PCM frames into a recognizer until voice activity detection says the
+    speaker has finished, and returns the transcript. `frames` yields frames or
+    None when the source has dried up. on_partial receives the running
+    transcript whenever it changes; returning True from it stops listening and
+    returns that transcript.
+    """
+    finished = []
+    last_partial = ""
+    voiced = silent = 0
+    speech_started = False
+    elapsed = 0.0
+    for frame in frames:
+        if frame is None:
+            break
+        elapsed += frame_seconds
+        if recognizer.AcceptWaveform(frame):
+            text = json.loads(recognizer.Result()).get("text", "")
+            if text:
+                finished.append(text)
+        elif on_partial is not None:
+            partial = json.loads(recognizer.PartialResult()).get("partial", "")
+            if partial and partial != last_partial:
+                last_partial = partial
+                transcript = " ".join(finished + [partial])
+                if on_partial(transcript):
+                    return transcript
+
+        if vad.is_speech(frame):
+            voiced += 1
+            silent = 0
+            speech_started = speech_started or voiced >= VAD_START_FRAMES
+        else:
+            voiced = 0
+            silent += 1
+        if speech_started and silent * frame_seconds >= VAD_END_SILENCE:
+            break
+        if not speech_started and elapsed >= no_speech_timeout:
+            break
+        if elapsed >= max_seconds:
+            break
+
+    text = json.loads(recognizer.FinalResult()).get("text", "")
+    if text:
+        finished.append(text)
+    return " ".join(finished).strip()
+
+
+def listen_to_user(on_partial=None):
+    """Transcribes the next utterance from the local microphone; see transcribe_stream."""
+    pool = get_recognizer_pool(MIC_SAMPLE_RATE)
     try:
-        subprocess.run(
-            ["arecord", "-D", "plughw:1,0", "-f", "S16_LE", "-r", "16000", "-d", "4", "-q", audio_file],
-            check=True
-        )
-        with wave.open(audio_file, "rb") as wf:
-            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != 16000:
-                raise ValueError("Audio file must be mono, 16-bit, with a 16kHz sample rate.")
-            recognizer = KaldiRecognizer(VOSK_MODEL, wf.getframerate())
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if recognizer.AcceptWaveform(data):
-                    result = json.loads(recognizer.Result())
-                    return result.get("text", "").strip()
-        return ""
+        microphone.start()
+        microphone.discard_stale()
+        recognizer = pool.acquire()
+        try:
+            return transcribe_stream(microphone.stream(), recognizer, VoiceActivityDetector(MIC_SAMPLE_RATE),
+                                     VAD_FRAME_MS / 1000, on_partial=on_partial)
+        finally:
+            pool.release(recognizer)
     except Exception as e:
         debug_log(f"Error during Vosk recognition: {e}")
         return ""
 
-   
+
 ############################### Implement Parallel Processing ###############################
 
-def handle_user_request(prompt):
+def handle_user_request(prompt, play=False):
+    """
+    Streams the reply to prompt into TTS clause by clause, so rendering overlaps
+    the rest of the ChatGPT response instead of waiting for it. With play, each
+    clause is played locally as soon as it and the clauses before it are ready.
+    Returns the reply's clips in playback order.
+    """
     try:
         start_time = time.time()
-        # Fetch ChatGPT response
-        future_response = executor.submit(get_chatgpt_response, prompt)
-        ai_response = future_response.result()
-        
-        # Generate TTS in parallel
-        future_tts = executor.submit(generate_tts_streaming, ai_response)
-        tts_file = future_tts.result()
-        
+        _, clips = stream_reply_clips(prompt, current_voice, audio_format="mp3")
+        files = []
+        for path, future in clips:
+            if future is not None and not future.result():
+                break
+            files.append(path)
+            if play:
+                os.system(f"mpg123 {path}")
+
         total_latency = time.time() - start_time
         debug_log(f"Total latency for handling user request: {total_latency:.2f} seconds")
-        return tts_file
+        return files
     except Exception as e:
         debug_log(f"Error handling user request: {e}")
-        return None
+        return []
 
 ############################### Get Random Responses & Impressions ###############################
 
 def get_random_response(response_pool):
     return random.choice(response_pool)
 
+############################### Audio Bank ###############################
+
+# Every canned line (songs, easter eggs, interrupts, voice confirmations) is
+# rendered ahead of time for every voice, so those branches never call ElevenLabs
+# while a caller is waiting. The manifest maps voice -> line -> clip under static/.
+# Clips in another format than TWILIO_AUDIO_FORMAT (from before it was changed)
+# are ignored, so the next build renders them again.
+AUDIO_BANK_VOICES = [VOICE_NIKKI, VOICE_TOM]
+AUDIO_BANK_WORKERS = int(os.getenv("AUDIO_BANK_WORKERS", "4"))
+
+audio_bank = {}
+audio_bank_lock = threading.Lock()
+
+def canned_lines():
+    lines = SONG_RESPONSES + list(EASTER_EGGS.values()) + INTERRUPT_RESPONSES + list(VOICE_CONFIRMATIONS.values())
+    return list(dict.fromkeys(lines))
+
+def load_audio_bank():
+    if not os.path.exists(AUDIO_BANK_MANIFEST):
+        return {}
+    with open(AUDIO_BANK_MANIFEST) as manifest_file:
+        manifest = json.load(manifest_file)
+    bank = {}
+    for voice, clips in manifest.items():
+        for line, relative_path in clips.items():
+            path = os.path.join(STATIC_DIR, relative_path)
+            if path.endswith(TWILIO_AUDIO_EXTENSION) and os.path.exists(path):
+                bank.setdefault(voice, {})[line] = path
+    with audio_bank_lock:
+        audio_bank.clear()
+        audio_bank.update(bank)
+    audio_store.pin(path for clips in bank.values() for path in clips.values())
+    return bank
+
+def build_audio_bank(voices=None, workers=AUDIO_BANK_WORKERS):
+    """
+    Renders every canned line in every voice with a bounded worker pool, skipping
+    clips already in the audio store, then writes and loads the manifest.
+    """
+    start_time = time.time()
+    voices = voices or AUDIO_BANK_VOICES
+    manifest = {}
+    missing = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(audio_store.get_or_render, line, voice): (voice, line)
+            for voice in voices for line in canned_lines()
+        }
+        for future in as_completed(futures):
+            voice, line = futures[future]
+            try:
+                path = future.result()
+            except Exception as e:
+                # One bad clip leaves a gap in the bank, not a missing bank
+                debug_log("Audio bank clip failed.", {"Voice": voice, "Line": line, "Error Message": str(e)})
+                path = None
+            if path:
+                manifest.setdefault(voice, {})[line] = os.path.relpath(path, STATIC_DIR)
+            else:
+                missing.append(line)
+    temp_manifest = f"{AUDIO_BANK_MANIFEST}.{uuid.uuid4().hex}.part"
+    with open(temp_manifest, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(temp_manifest, AUDIO_BANK_MANIFEST)
+    load_audio_bank()
+    debug_log("Audio bank built.", {
+        "Voices": len(voices),
+        "Clips": sum(len(clips) for clips in manifest.values()),
+        "Missing": len(missing),
+        "Duration (s)": round(time.time() - start_time, 2),
+    })
+    return manifest
+
+def canned_clip(line, voice=None):
+    """Returns the clip for a canned line, from the bank if possible, rendering it only as a last resort."""
+    voice = voice or current_voice
+    with audio_bank_lock:
+        path = audio_bank.get(voice, {}).get(line)
+    if path and path.endswith(TWILIO_AUDIO_EXTENSION):
+        if os.path.exists(path):
+            return path
+        # Deleted since the manifest was loaded; the store's index may still list it
+        audio_store.discard(path)
+    return audio_store.get_or_render(line, voice)
+
 ############################### Handle Easter Eggs ###############################
 
-def handle_easter_egg_request(user_input):
+def handle_easter_egg_request(user_input, voice=None, egg_key=None):
     """
-    Checks if the user's input exactly matches one of the predefined Easter egg keys.
-    If so, generates and plays the corresponding TTS response.
+    Checks if the user's input matches one of the predefined Easter egg keys, exactly
+    or closely enough. If so, returns the clip for the corresponding response, otherwise None.
     """
-    if user_input in EASTER_EGGS:
-        response = EASTER_EGGS[user_input]
+    if egg_key is None:
+        intent, egg_key, _ = intent_matcher.classify(user_input)
+        if intent != "easter_egg":
+            return None
+    if egg_key in EASTER_EGGS:
+        response = EASTER_EGGS[egg_key]
         debug_log(f"Easter egg triggered: {response}")
-        generate_tts_streaming(response)
-        return True
-    return False
+        return canned_clip(response, voice)
+    return None
 
 ############################### Song Request ###############################
 
-def handle_song_request():
+def handle_song_request(voice=None):
     response = random.choice(SONG_RESPONSES)
-    generate_tts_streaming(response)
     debug_log(f"Sang a song: {response}")
+    return canned_clip(response, voice)
 
 ############################### Process Switch Voice ###############################
 
-def switch_voice(user_input):
+def switch_voice(user_input, session=None):
+    """
+    Switches the caller's voice if they asked for one. Updates the call session
+    when given one, otherwise the process-wide voice used by the local Pi loop.
+    Returns the confirmation line to speak, or None if no switch was requested.
+    """
     global current_voice
-    voice_changed = False
-    if "tom" in user_input or "switch to tom" in user_input:
-        current_voice = VOICE_TOM
-        confirmation_message = "Voice switched to Major Tom. Ground control, ready for lift-off for your mother."
-        debug_log("Switched to Major Tom voice.")
-        voice_changed = True
-    elif "nikki" in user_input or "switch to nikki" in user_input:
-        current_voice = VOICE_NIKKI
-        confirmation_message = "Voice switched to Nikki. Here I am, sassy and ready to judge you!"
-        debug_log("Switched to Nikki voice.")
-        voice_changed = True
-    if voice_changed:
-        chatgpt_cache.clear()
-        for file in os.listdir(CACHE_DIR):
-            if file not in ["welcome.mp3", "fallback.mp3", "exit.mp3"]:
-                os.remove(os.path.join(CACHE_DIR, file))
-        debug_log(f"Cache cleared after switching voice to {current_voice}.")
-        generate_tts_streaming(confirmation_message, RESPONSE_FILE)
-        return True
-    return False
+    intent, new_voice, _ = intent_matcher.classify(user_input)
+    if intent != "voice_switch":
+        return None
+    debug_log("Switched to Major Tom voice." if new_voice == VOICE_TOM else "Switched to Nikki voice.")
+    if session is not None:
+        session["voice"] = new_voice
+    else:
+        current_voice = new_voice
+    # Each voice has its own cache partition, so nothing needs to be flushed here;
+    # the cache janitor keeps the total size in check.
+    debug_log(f"Switched voice to {new_voice}. Cache partitions kept.")
+    return VOICE_CONFIRMATIONS[new_voice]
 
 ############################### Idle Mode Management ###############################
 
 def idle_mode_manager():
     # Increase wait time (e.g. 20-30 sec) before entering idle mode if desired.
     while not stop_playback.is_set():
-        if idle_mode.is_set():
-            debug_log("System is idle. Listening for wake-up words...")
-            user_input = listen_to_user().strip().lower()
-            if any(word in user_input for word in WAKE_UP_WORDS):
-                idle_mode.clear()
-                debug_log("Wake-up word detected. Resuming interaction.")
-        time.sleep(1)
-
-############################### Validate Cache Response ###############################
-
-def validate_cache(user_input, cached_file):
-    cache_key = hashlib.md5(f"{user_input}_{current_voice}".encode()).hexdigest()
-    expected_file = os.path.join(CACHE_DIR, f"cached_{cache_key}.mp3")
-    return cached_file == expected_file and os.path.exists(cached_file)
+        if not idle_mode.is_set():
+            time.sleep(1)
+            continue
+        debug_log("System is idle. Listening for wake-up words...")
+        # Partials let a wake word end listening mid-utterance instead of at the endpoint
+        user_input = listen_to_user(on_partial=lambda text: intent_matcher.has_wake_word(text.lower()))
+        if intent_matcher.has_wake_word(user_input.lower()):
+            idle_mode.clear()
+            debug_log("Wake-up word detected. Resuming interaction.")
+        elif not microphone.running:
+            time.sleep(1)
 
 ############################### Process User Input ###############################
 
@@ -386,24 +2226,20 @@ def process_user_input(user_input):
     Process user input, generate AI response, and measure latencies.
     """
     total_start = time.time()
-    cache_key = hashlib.md5(user_input.encode()).hexdigest()
-    cached_file = os.path.join(CACHE_DIR, f"cached_{cache_key}.mp3")
-    
-    if validate_cache(ai_response, cached_file):
-        debug_log(f"Cache hit for prompt: {user_input}")
-        return cached_file
-    
-    if os.path.exists(cached_file):
+    chatgpt_start = time.time()
+    ai_response = get_chatgpt_response(user_input)
+    chatgpt_latency = time.time() - chatgpt_start
+
+    cached_file = audio_store.lookup(ai_response, audio_format="mp3")
+    if cached_file:
         debug_log("Using cached response for user input.", structured_data={
             "User Said": user_input,
             "Cached File": cached_file,
         })
         return cached_file
-    chatgpt_start = time.time()
-    ai_response = get_chatgpt_response(user_input)
-    chatgpt_latency = time.time() - chatgpt_start
+
     tts_start = time.time()
-    tts_file = generate_tts_streaming(ai_response, cached_file, play=False)
+    tts_file = audio_store.get_or_render(ai_response, audio_format="mp3")
     tts_latency = time.time() - tts_start
     total_latency = time.time() - total_start
     debug_log("Processed user input with detailed latencies.", structured_data={
@@ -411,7 +2247,7 @@ def process_user_input(user_input):
         "Message": "Processed user input with detailed latencies.",
         "User Said": user_input,
         "GOD Said": ai_response,
-        "Cached File": cached_file,
+        "Cached File": tts_file,
         "Latencies": {
             "ChatGPT Latency (s)": round(chatgpt_latency, 2),
             "TTS Latency (s)": round(tts_latency, 2),
@@ -427,52 +2263,918 @@ def preload_fallback():
         debug_log("Preloading fallback response.")
         generate_tts_streaming("Sorry, I didn't catch that. Can you repeat?", FALLBACK_FILE)
 
+def preload_welcome():
+    if not os.path.exists(WELCOME_FILE):
+        debug_log("Preloading welcome message.")
+        generate_tts_streaming(WELCOME_MESSAGE, WELCOME_FILE, play=False)
+
+COMMON_RESPONSES = {
+    "welcome": WELCOME_MESSAGE,
+    "fallback": "Sorry, I didn't catch that. Can you repeat?",
+    "exit": "Goodbye, my child!",
+    "thinking": "Hmm, let me consult the heavens.",
+    "busy": "Even I need a moment. Ask me again, slowly this time.",
+}
+
+COMMON_TTS_RESPONSES = [
+    "Oh, you're back. I was just starting to enjoy the peace and quiet.",
+    LLM_FALLBACK_RESPONSE,
+]
+
+def preload_static_file(key, text):
+    file_path = os.path.join(CACHE_DIR, f"{key}{TWILIO_AUDIO_EXTENSION}")
+    if not os.path.exists(file_path):
+        debug_log(f"Generating static file: {file_path}")
+        generate_tts_streaming(text, file_path)
+    if os.path.exists(file_path):
+        PRELOADED_RESPONSES[key] = file_path
+        debug_log(f"Preloaded response: {key} -> {file_path}")
+    else:
+        debug_log(f"Failed to preload response: {key}")
+
 def preload_static_files(files):
     for key, text in files.items():
-        file_path = os.path.join(CACHE_DIR, f"{key}.mp3")
-        if not os.path.exists(file_path):
-            debug_log(f"Generating static file: {file_path}")
-            generate_tts_streaming(text, file_path)
-        if os.path.exists(file_path):
-            PRELOADED_RESPONSES[key] = file_path
-            debug_log(f"Preloaded response: {key} -> {file_path}")
+        preload_static_file(key, text)
+
+############################### Startup ###############################
+
+STARTUP_WORKERS = int(os.getenv("STARTUP_WORKERS", "8"))
+startup_ready = threading.Event()
+startup_ready.set()  # Cleared while start_preloads() has jobs outstanding
+startup_jobs = {}  # Job name -> "pending", "done" or "failed"
+startup_timing = {"started": None, "seconds": None}
+
+def start_preloads(workers=STARTUP_WORKERS):
+    """
+    Renders the startup audio concurrently in the background instead of one clip
+    at a time before the server starts. startup_ready is set once every job has
+    finished; /health answers 503 until then.
+    """
+    jobs = {f"response:{key}": (preload_static_file, key, text) for key, text in COMMON_RESPONSES.items()}
+    jobs["fallback"] = (preload_fallback,)
+    jobs["welcome"] = (preload_welcome,)
+    jobs.update({f"tts:{index}": (audio_store.get_or_render, text) for index, text in enumerate(COMMON_TTS_RESPONSES)})
+    if MEDIA_STREAM_MODE:
+        jobs["vosk_model"] = (get_vosk_model,)
+
+    startup_ready.clear()
+    startup_timing["started"] = time.time()
+    startup_jobs.update({name: "pending" for name in jobs})
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="startup")
+
+    def wait_for_jobs():
+        # Worker processes take turns: the first renders what is missing, the
+        # rest find every clip on disk and only register it
+        lock_file = try_lead("preloads", wait=True)
+        try:
+            futures = {pool.submit(*job): name for name, job in jobs.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                    startup_jobs[name] = "done"
+                except Exception as e:
+                    startup_jobs[name] = "failed"
+                    debug_log(f"Startup job {name} failed: {e}")
+        finally:
+            lock_file.close()
+        pool.shutdown(wait=False)
+        startup_timing["seconds"] = round(time.time() - startup_timing["started"], 2)
+        startup_ready.set()
+        debug_log("System ready. Startup audio preloaded.", {"Seconds": startup_timing["seconds"], "Jobs": dict(startup_jobs)})
+
+    threading.Thread(target=wait_for_jobs, daemon=True).start()
+
+
+############################### Sentence-Chunked TTS ###############################
+
+# When enabled, replies are split into sentences and only the first one is rendered
+# before /voice answers. The rest render in the background and are played as
+# further <Play> verbs; their media fetches wait in wait_for_pending_render().
+CHUNKED_TTS_MODE = os.getenv("CHUNKED_TTS_MODE", "false").lower() == "true"
+MIN_CHUNK_CHARS = 20  # Shorter sentences are merged into the following one
+CHUNK_RENDER_TIMEOUT = 10  # Seconds a media fetch waits for a chunk still rendering
+# Request threads that may wait on chunk renders at once; by default all but two of a
+# gunicorn worker's threads, so webhooks are still answered while chunks render
+CHUNK_RENDER_WAITERS = int(os.getenv("CHUNK_RENDER_WAITERS", max(1, int(os.getenv("GUNICORN_THREADS", "8")) - 2)))
+CHUNK_SILENCE_SECONDS = 0.5  # Played in place of a chunk that isn't ready
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+")
+
+pending_renders = {}
+pending_renders_lock = threading.Lock()
+chunk_render_waiters = threading.BoundedSemaphore(CHUNK_RENDER_WAITERS)
+PENDING_SUFFIX = ".pending"  # Marks a clip rendering in some worker process, for the others
+
+def split_sentences(text):
+    chunks = []
+    buffer = ""
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        buffer = f"{buffer} {sentence}".strip()
+        if len(buffer) >= MIN_CHUNK_CHARS:
+            chunks.append(buffer)
+            buffer = ""
+    if buffer:
+        chunks.append(buffer)
+    return chunks
+
+def render_chunk(text, filename, voice, audio_format=None):
+    try:
+        return audio_store.get_or_render(text, voice, audio_format=audio_format)
+    finally:
+        with pending_renders_lock:
+            pending_renders.pop(os.path.abspath(filename), None)
+        try:
+            os.remove(f"{filename}{PENDING_SUFFIX}")
+        except FileNotFoundError:
+            pass
+
+def queue_chunk_render(text, voice, audio_format=None):
+    """
+    Starts rendering text on job_executor unless its clip is cached or already
+    rendering. Returns the clip's path and the render future (None if cached).
+    """
+    filename = audio_store.lookup(text, voice, audio_format)
+    if filename:
+        return filename, None
+    filename = audio_store.path_for(text, voice, audio_format)
+    render_key = os.path.abspath(filename)
+    with pending_renders_lock:
+        future = pending_renders.get(render_key)
+        if future is None:
+            # Twilio's fetch of this chunk may reach another worker
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            open(f"{filename}{PENDING_SUFFIX}", "a").close()
+            future = pending_renders[render_key] = submit_traced(
+                job_executor, render_chunk, text, filename, voice, audio_format)
+    return filename, future
+
+def generate_tts_chunked(text, voice=None):
+    """
+    Renders the first sentence of text synchronously and queues the rest on
+    job_executor. Returns the list of chunk files in playback order, or an empty
+    list if the first chunk could not be rendered.
+    """
+    files = []
+    for index, chunk in enumerate(split_sentences(text)):
+        if index == 0:
+            filename = audio_store.get_or_render(chunk, voice)
+            if not filename:
+                return []
         else:
-            debug_log(f"Failed to preload response: {key}")
+            filename, _ = queue_chunk_render(chunk, voice)
+        files.append(filename)
+    debug_log(f"Chunked TTS queued {len(files)} chunk(s) for: {text}")
+    return files
+
+@app.before_request
+def wait_for_pending_render():
+    # Twilio fetches later chunks while the first one plays; hold those fetches
+    # until the chunk is fully written instead of serving a partial file. One still
+    # rendering after that is answered with a moment of silence; one whose render
+    # failed gets the fallback clip from serve_static.
+    if not request.path.startswith("/static/"):
+        return
+    render_key = os.path.abspath(os.path.join(BASE_DIR, request.path.lstrip("/")))
+    marker = f"{render_key}{PENDING_SUFFIX}"
+    with pending_renders_lock:
+        future = pending_renders.get(render_key)
+    if future is None and not os.path.exists(marker):
+        return
+    if chunk_render_waiters.acquire(blocking=False):
+        try:
+            if future:
+                future.result(timeout=CHUNK_RENDER_TIMEOUT)
+            else:
+                # Rendering in another worker process, which removes the marker when done
+                deadline = time.time() + CHUNK_RENDER_TIMEOUT
+                while os.path.exists(marker) and time.time() < deadline:
+                    time.sleep(0.05)
+        except Exception as e:
+            debug_log(f"Waiting for chunk {render_key} failed: {e}")
+        finally:
+            chunk_render_waiters.release()
+    else:
+        debug_log("Too many fetches waiting on chunk renders. Not waiting.", {"Chunk": render_key})
+    with pending_renders_lock:
+        still_rendering = render_key in pending_renders
+    if not os.path.exists(render_key) and (still_rendering or os.path.exists(marker)):
+        # A pause in the reply, rather than the "didn't catch that" line in the middle of it
+        samples = b"\xff" * int(ULAW_SAMPLE_RATE * CHUNK_SILENCE_SECONDS)  # mu-law silence
+        response = app.response_class(ulaw_wav_header(len(samples)) + samples, mimetype="audio/wav")
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+############################### Streaming Replies ###############################
+
+# When enabled, ChatGPT replies are streamed and each clause goes to TTS as soon as
+# its last token arrives, so synthesis overlaps decoding of the rest of the reply.
+# Clauses play as consecutive <Play> verbs, like sentence chunks.
+STREAMING_REPLY_MODE = os.getenv("STREAMING_REPLY_MODE", "false").lower() == "true"
+CLAUSE_BOUNDARY = re.compile(r"(?<=[.!?…;:,—])\s+")
+MIN_CLAUSE_CHARS = 20  # Shorter clauses are merged into the following one
+
+
+class ClauseSplitter:
+    """
+    Splits text fed to it piece by piece into clauses, calling on_clause with each
+    one as soon as it is complete. Splitting is the same however the text is fed.
+    """
+
+    def __init__(self, on_clause):
+        self.on_clause = on_clause
+        self.buffer = ""   # Text after the last clause boundary
+        self.pending = ""  # Complete clauses still shorter than MIN_CLAUSE_CHARS
+        self.first_text_at = None
+
+    def feed(self, text):
+        if self.first_text_at is None:
+            self.first_text_at = time.time()
+        pieces = CLAUSE_BOUNDARY.split(self.buffer + text)
+        self.buffer = pieces.pop()
+        for piece in pieces:
+            self.pending = f"{self.pending} {piece}".strip()
+            if len(self.pending) >= MIN_CLAUSE_CHARS:
+                self.on_clause(self.pending)
+                self.pending = ""
+
+    def close(self):
+        rest = f"{self.pending} {self.buffer}".strip()
+        self.pending = self.buffer = ""
+        if rest:
+            self.on_clause(rest)
+
+
+def split_clauses(text):
+    clauses = []
+    splitter = ClauseSplitter(clauses.append)
+    splitter.feed(text)
+    splitter.close()
+    return clauses
 
-def preload_responses():
-    common_responses = {
-        "welcome": "Welcome, my child! What divine wisdom do you seek today?",
-        "fallback": "Sorry, I didn't catch that. Can you repeat?",
-        "exit": "Goodbye, my child!",
+
+class ReplyTimeline:
+    """Milliseconds from the start of a turn at which each pipeline event happened."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.events = []
+
+    def mark(self, event, at=None):
+        self.events.append((event, round(((at or time.time()) - self.start) * 1000)))
+
+    def as_dict(self):
+        return dict(sorted(self.events, key=lambda event: event[1]))
+
+
+def stream_reply_clips(user_input, voice, dynamic=False, mode=None, history=None, timeline=None, audio_format=None):
+    """
+    Streams the ChatGPT reply for user_input and queues each clause for TTS as soon
+    as it is complete. Returns the reply text and a (path, render future or None)
+    pair per clause, in playback order.
+    """
+    timeline = timeline or ReplyTimeline()
+    renders = {}  # clause -> (path, future)
+
+    def render(clause):
+        number = len(renders) + 1
+        path, future = renders[clause] = queue_chunk_render(clause, voice, audio_format)
+        timeline.mark(f"clause {number} text")
+        if future is None:
+            timeline.mark(f"clause {number} audio (cached)")
+        else:
+            future.add_done_callback(lambda done: timeline.mark(f"clause {number} audio"))
+
+    splitter = ClauseSplitter(render)
+    ai_response = get_chatgpt_response(
+        user_input, dynamic=dynamic, mode=mode, history=history, voice=voice, splitter=splitter)
+    if splitter.first_text_at:
+        timeline.mark("first token", splitter.first_text_at)
+    timeline.mark("llm done")
+
+    # The reply may have come from a cache or another caller's request instead,
+    # in which case nothing was streamed to us and its clauses are queued here
+    clips = []
+    for clause in split_clauses(ai_response):
+        if clause not in renders:
+            render(clause)
+        clips.append(renders[clause])
+    return ai_response, clips
+
+def stream_reply_audio(user_input, voice, dynamic=False, mode=None, history=None, timeline=None):
+    """
+    Like stream_reply_clips, but waits for the first clause's clip. Returns the
+    reply text and its clips in playback order (empty if the first clip failed).
+    """
+    timeline = timeline or ReplyTimeline()
+    ai_response, clips = stream_reply_clips(user_input, voice, dynamic, mode, history, timeline)
+    if not clips or (clips[0][1] is not None and not clips[0][1].result()):
+        return ai_response, []
+    timeline.mark("first audio")
+    return ai_response, [path for path, _ in clips]
+
+############################### Async Voice Pipeline ###############################
+
+# When enabled, /voice answers immediately with a filler clip and a <Redirect> to
+# /voice/result/<job_id>, while the LLM -> TTS job runs in the background.
+ASYNC_VOICE_MODE = os.getenv("ASYNC_VOICE_MODE", "false").lower() == "true"
+ASYNC_POLL_INTERVAL = 1  # Seconds Twilio pauses between result polls
+ASYNC_MAX_POLLS = 15
+ASYNC_JOB_TTL = 120  # Seconds before an unclaimed job is dropped
+
+VOICE_JOB_WORKERS = int(os.getenv("VOICE_JOB_WORKERS", "16"))
+job_executor = ThreadPoolExecutor(max_workers=VOICE_JOB_WORKERS)
+voice_jobs = {}
+# With a Redis session store, job state is shared so any worker can answer the poll
+SHARED_JOB_STATE = not isinstance(session_store, InMemorySessionStore)
+voice_jobs_lock = threading.Lock()
+
+def generate_reply_audio(user_input, dynamic=False, session=None, ai_response=None):
+    """
+    Runs the ChatGPT -> TTS pipeline for one utterance, in the session's voice and
+    personality when given one. Pass ai_response to skip ChatGPT when the reply is
+    already known (e.g. from a committed speculation). Returns the reply text, the
+    audio files to play in order (empty if TTS failed) and the per-stage latencies.
+    """
+    voice = session["voice"] if session else current_voice
+    mode = session["mode"] if session else current_mode
+    history = session["history"][-CONVERSATION_CONTEXT_TURNS:] if session and CONVERSATION_CONTEXT_TURNS else None
+
+    chatgpt_start = time.time()
+    if ai_response is None and not STREAMING_REPLY_MODE:
+        ai_response = get_chatgpt_response(user_input, dynamic=dynamic, mode=mode, history=history, voice=voice)
+        stage_latency.observe(time.time() - chatgpt_start, stage="chatgpt")
+    chatgpt_latency = time.time() - chatgpt_start
+
+    tts_latency = None
+    if STREAMING_REPLY_MODE and ai_response is None:
+        timeline = ReplyTimeline()
+        ai_response, audio_files = stream_reply_audio(
+            user_input, voice, dynamic=dynamic, mode=mode, history=history, timeline=timeline)
+        events = timeline.as_dict()
+        chatgpt_latency = events["llm done"] / 1000
+        # Only the synthesis left once the reply is complete adds to the wait
+        tts_latency = max(0.0, time.time() - chatgpt_start - chatgpt_latency)
+        stage_latency.observe(chatgpt_latency, stage="chatgpt")
+        if "first token" in events:
+            stage_latency.observe(events["first token"] / 1000, stage="first_token")
+        debug_log("Reply timeline.", {"User Said": user_input, "Timeline (ms)": events})
+    elif CHUNKED_TTS_MODE:
+        # Latency here is time to the first playable chunk
+        tts_start = time.time()
+        audio_files = generate_tts_chunked(ai_response, voice)
+        tts_latency = time.time() - tts_start
+    else:
+        # Audio is content-addressed on the reply text and voice
+        cached_file = audio_store.lookup(ai_response, voice)
+        if cached_file:
+            debug_log(f"Cache hit for prompt: {user_input}")
+        else:
+            tts_start = time.time()
+            # IMPORTANT: play=False so that the Pi does NOT play the audio locally when handling Twilio calls
+            cached_file = audio_store.get_or_render(ai_response, voice, play=False)
+            tts_latency = time.time() - tts_start
+            debug_log(f"TTS generated and cached for: {user_input}")
+        audio_files = [cached_file] if cached_file else []
+
+    if tts_latency is not None:
+        stage_latency.observe(tts_latency, stage="tts")
+
+    # The outage line isn't an answer; indexing it would replay it to similar prompts after recovery
+    if (semantic_cache is not None and audio_files and not dynamic and not history
+            and ai_response != LLM_FALLBACK_RESPONSE):
+        semantic_cache.add(user_input, ai_response, voice, audio_files)
+        if tts_latency is not None:
+            semantic_cache.observe_miss_latency(chatgpt_latency + tts_latency)
+
+    return {
+        "ai_response": ai_response,
+        "audio_files": audio_files,
+        "chatgpt_latency": chatgpt_latency,
+        "tts_latency": tts_latency,
     }
-    preload_static_files(common_responses)
-
-def preload_tts_responses():
-    common_responses = [
-        "Oh, you're back. I was just starting to enjoy the peace and quiet.",
-        "I'm having trouble connecting to divine knowledge right now."
-    ]
-    for response in common_responses:
-        cache_key = hashlib.md5(response.encode()).hexdigest()
-        cached_file = os.path.join(CACHE_DIR, f"cached_{cache_key}.mp3")
-        if not os.path.exists(cached_file):
-            generate_tts_streaming(response, cached_file)
+
+def prune_voice_jobs():
+    # Caller must hold voice_jobs_lock
+    cutoff = time.time() - ASYNC_JOB_TTL
+    for job_id in [job_id for job_id, job in voice_jobs.items() if job["created"] < cutoff]:
+        voice_jobs.pop(job_id)["future"].cancel()
+
+def publish_voice_job(job_id, record, future=None):
+    # Twilio's redirect may land on another worker, which finds the job here
+    if future is not None:
+        record["done"] = True
+        record["result"] = future.result() if not future.cancelled() and future.exception() is None else None
+    session_store.store(f"job:{job_id}", json.dumps(record))
+
+def load_shared_voice_job(job_id):
+    data = session_store.load(f"job:{job_id}") if SHARED_JOB_STATE else None
+    if not data:
+        return None
+    job = json.loads(data)
+    job["polls"] = int(request.args.get("polls", 0))
+    return job
+
+def submit_voice_job(user_input, dynamic=False, session=None, ai_response=None):
+    job_id = uuid.uuid4().hex
+    created = time.time()
+    future = submit_traced(job_executor, generate_reply_audio, user_input, dynamic, session, ai_response)
+    with voice_jobs_lock:
+        prune_voice_jobs()
+        voice_jobs[job_id] = {"future": future, "created": created, "polls": 0, "user_input": user_input}
+    if SHARED_JOB_STATE:
+        record = {"created": created, "user_input": user_input, "done": False, "result": None}
+        publish_voice_job(job_id, record)
+        future.add_done_callback(lambda done: publish_voice_job(job_id, record, done))
+    return job_id
+
+def gather_speech(response, timeout=3):
+    kwargs = {}
+    if SPECULATIVE_MODE:
+        kwargs["partial_result_callback"] = f"{PUBLIC_BASE_URL}/voice/partial"
+        kwargs["partial_result_callback_method"] = "POST"
+    response.gather(input="speech", action="/voice", method="POST", timeout=timeout, **kwargs)
+
+def play_filler(response):
+    filler_file = PRELOADED_RESPONSES.get("thinking")
+    if filler_file:
+        response.play(cache_url(filler_file))
+    else:
+        response.pause(length=1)
+
+############################### Speculative Pre-Generation ###############################
+
+# When enabled, <Gather> also reports partial transcripts to /voice/partial. Each
+# new stable partial starts the reply early; when the final SpeechResult arrives
+# the speculation is committed if the transcript matches, or cancelled otherwise.
+SPECULATIVE_MODE = os.getenv("SPECULATIVE_MODE", "false").lower() == "true"
+SPECULATION_MIN_WORDS = 2
+# Seconds /voice waits for an in-flight speculation before making its own call,
+# kept well under Twilio's 15 second webhook timeout
+SPECULATION_COMMIT_TIMEOUT = 2
+SPECULATION_TTL = 60
+
+speculations = {}
+# Reentrant: cancelling a speculation under it runs the future's done callback, which takes it too
+speculations_lock = threading.RLock()
+speculation_stats = {"started": 0, "committed": 0, "cancelled": 0, "deferred": 0, "timed_out": 0}
+
+def speculative_reply(text, session):
+    """
+    Work started from a stable partial transcript. Canned lines (songs, easter
+    eggs, interrupts) come from the audio bank and replies already in the
+    response cache are rendered to audio right away; anything else only gets its
+    ChatGPT call started, since the caller may still change the wording. That
+    reply is only stored in the response cache once a final transcript commits to it.
+    """
+    voice = session["voice"]
+    intent, payload, dynamic = intent_matcher.classify(text)
+    if intent == "voice_switch":
+        # Voice switches are handled by switch_voice and need no reply
+        return {"kind": intent, "ai_response": None}
+    if intent in ("song", "easter_egg", "interrupt"):
+        pool = {"song": SONG_RESPONSES, "interrupt": INTERRUPT_RESPONSES}
+        line = EASTER_EGGS[payload] if intent == "easter_egg" else random.choice(pool[intent])
+        canned_clip(line, voice)
+        return {"kind": intent, "ai_response": line}
+
+    cached_reply = None if dynamic else response_cache.get_reply(text)
+    if cached_reply is not None:
+        audio_store.get_or_render(cached_reply, voice)
+        return {"kind": "chat", "ai_response": cached_reply}
+    history = session["history"][-CONVERSATION_CONTEXT_TURNS:] if CONVERSATION_CONTEXT_TURNS else None
+    ai_response = get_chatgpt_response(
+        text, dynamic=dynamic, mode=session["mode"], history=history, voice=voice, remember=False)
+    unsaved = not dynamic and not history and ai_response != LLM_FALLBACK_RESPONSE
+    return {"kind": "chat", "ai_response": ai_response, "unsaved": unsaved}
+
+def speculate(call_sid, partial_text):
+    text = normalize_prompt(partial_text)
+    if len(text.split()) < SPECULATION_MIN_WORDS:
+        return
+    with speculations_lock:
+        cutoff = time.time() - SPECULATION_TTL
+        for stale_sid in [sid for sid, spec in speculations.items() if spec["started"] < cutoff]:
+            speculations.pop(stale_sid)["future"].cancel()
+        current = speculations.get(call_sid)
+        if current and current["text"] == text:
+            current["next"] = None
+            return
+        if current and not current["future"].cancel() and not current["future"].done():
+            # A running ChatGPT call can't be stopped, so each call keeps at most one
+            # in flight and speculates on the newest words once it finishes
+            current["next"] = text
+            speculation_stats["deferred"] += 1
+            return
+        if current:
+            speculation_stats["cancelled"] += 1
+        future = job_executor.submit(speculative_reply, text, get_session(call_sid))
+        speculations[call_sid] = {"text": text, "future": future, "started": time.time(), "next": None}
+        speculation_stats["started"] += 1
+    future.add_done_callback(lambda done: resume_speculation(call_sid, done))
+    debug_log(f"Speculating on partial transcript: {text}")
+
+def resume_speculation(call_sid, future):
+    # Starts the speculation deferred while future was running, if it is still wanted
+    with speculations_lock:
+        current = speculations.get(call_sid)
+        text = current["next"] if current and current["future"] is future else None
+    if text:
+        speculate(call_sid, text)
+
+def drop_speculation(call_sid):
+    """Cancels the call's speculation, for turns that don't need a ChatGPT reply."""
+    with speculations_lock:
+        speculation = speculations.pop(call_sid, None) if call_sid else None
+        if speculation is not None:
+            speculation["future"].cancel()
+            speculation_stats["cancelled"] += 1
+
+def claim_speculation(call_sid, user_input):
+    """
+    Returns the speculative result for this call if it was started from the same
+    words as the final transcript, waiting for it if it is still running.
+    Otherwise cancels it and returns None.
+    """
+    with speculations_lock:
+        speculation = speculations.pop(call_sid, None) if call_sid else None
+    if speculation is None:
+        return None
+    if speculation["text"] != normalize_prompt(user_input):
+        speculation["future"].cancel()
+        with speculations_lock:
+            speculation_stats["cancelled"] += 1
+        return None
+    try:
+        result = speculation["future"].result(timeout=SPECULATION_COMMIT_TIMEOUT)
+    except TimeoutError:
+        # The caller's turn goes ahead without it
+        with speculations_lock:
+            speculation_stats["timed_out"] += 1
+        debug_log("Speculation not ready in time.", {"User Said": user_input})
+        return None
+    except Exception as e:
+        debug_log(f"Speculation failed: {e}")
+        return None
+    if result.get("unsaved"):
+        response_cache.put_reply(speculation["text"], result["ai_response"])
+    with speculations_lock:
+        speculation_stats["committed"] += 1
+    debug_log("Committed speculative reply.", {
+        "User Said": user_input,
+        "Kind": result["kind"],
+        "Head Start (s)": round(time.time() - speculation["started"], 2),
+    })
+    return result
+
+############################### Twilio Media Streams ###############################
+
+# With MEDIA_STREAM_MODE the call is answered with <Connect><Stream>: Twilio sends the
+# caller's audio over a WebSocket, it is transcribed here with Vosk, and replies are
+# synthesized straight to 8 kHz mu-law and sent back on the same socket. This skips
+# the <Gather> round-trips and lets "stop" cut off a reply as it is being spoken.
+MEDIA_STREAM_MODE = os.getenv("MEDIA_STREAM_MODE", "false").lower() == "true"
+MEDIA_STREAM_URL = os.getenv("MEDIA_STREAM_URL", f"{re.sub(r'^http', 'ws', PUBLIC_BASE_URL)}/voice/stream")
+MEDIA_SAMPLE_RATE = 8000
+MEDIA_FRAME_SECONDS = 0.02  # Twilio sends 20 ms of audio per media message
+MEDIA_CHUNK_BYTES = 640  # 80 ms of mu-law per outbound media message
+ULAW_CLIP_CACHE_SIZE = 64
+
+
+def build_ulaw_tables():
+    """Lookup tables giving the low and high byte of the 16-bit sample for each mu-law code."""
+    low, high = bytearray(256), bytearray(256)
+    for code in range(256):
+        value = ~code & 0xFF
+        exponent = (value >> 4) & 0x07
+        sample = ((((value & 0x0F) << 3) + 0x84) << exponent) - 0x84
+        if value & 0x80:
+            sample = -sample
+        low[code] = sample & 0xFF
+        high[code] = (sample >> 8) & 0xFF
+    return bytes(low), bytes(high)
+
+
+ULAW_LOW_BYTES, ULAW_HIGH_BYTES = build_ulaw_tables()
+
+
+def ulaw_to_pcm16(payload):
+    # Two C-level translates straight into the output buffer, no per-sample Python loop
+    pcm = bytearray(len(payload) * 2)
+    pcm[0::2] = payload.translate(ULAW_LOW_BYTES)
+    pcm[1::2] = payload.translate(ULAW_HIGH_BYTES)
+    return bytes(pcm)
+
+
+ulaw_clips = OrderedDict()  # (text, voice) -> mu-law bytes, for lines that repeat across calls
+ulaw_clips_lock = threading.Lock()
+
+
+def stream_tts_ulaw(text, voice, on_chunk):
+    """
+    Streams ElevenLabs audio for text as 8 kHz mu-law, calling on_chunk with each
+    piece as it arrives. on_chunk returns False to abandon the reply. Returns True
+    if the whole reply was delivered.
+    """
+    key = (text, voice)
+    with ulaw_clips_lock:
+        clip = ulaw_clips.get(key)
+        if clip is not None:
+            ulaw_clips.move_to_end(key)
+    if clip is None:
+        # Clips rendered for <Play> with TWILIO_AUDIO_FORMAT=ulaw, or by an earlier stream
+        path = audio_store.lookup(text, voice, "ulaw")
+        if path:
+            try:
+                clip = read_ulaw_wav(path)
+            except (OSError, ValueError) as e:
+                debug_log(f"Could not read cached clip {path}: {e}")
+    if clip is not None:
+        return all(on_chunk(clip[i:i + MEDIA_CHUNK_BYTES]) for i in range(0, len(clip), MEDIA_CHUNK_BYTES))
+
+    slot = tts_slots.acquire()
+    if slot is None:
+        return False
+    if not tts_breaker.allow():
+        tts_slots.release(slot)
+        debug_log("ElevenLabs circuit open. Skipping media stream TTS.")
+        return False
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice}/stream?optimize_streaming_latency=3&output_format=ulaw_8000"
+    data = {"text": text, "voice_settings": TTS_VOICE_SETTINGS}
+    if TTS_MODEL_ID:
+        data["model_id"] = TTS_MODEL_ID
+    received = bytearray()
+    try:
+        with tts_http.post(url, json=data, stream=True, timeout=PROVIDER_TIMEOUT) as response:
+            if response.status_code == 429 or response.status_code >= 500:
+                tts_breaker.record_failure()
+            else:
+                tts_breaker.record_success()
+            if response.status_code != 200:
+                debug_log(f"Media stream TTS failed with status {response.status_code}")
+                return False
+            for chunk in response.iter_content(chunk_size=MEDIA_CHUNK_BYTES):
+                received += chunk
+                if not on_chunk(chunk):
+                    return False
+    except Exception as e:
+        tts_breaker.record_failure()
+        debug_log(f"Media stream TTS exception: {e}")
+        return False
+    finally:
+        tts_slots.release(slot)
+    with ulaw_clips_lock:
+        ulaw_clips[key] = bytes(received)
+        while len(ulaw_clips) > ULAW_CLIP_CACHE_SIZE:
+            ulaw_clips.popitem(last=False)
+    try:
+        audio_store.save_ulaw(text, voice, bytes(received))
+    except OSError as e:
+        debug_log(f"Could not store media stream clip: {e}")
+    return True
+
+
+class MediaStreamCall:
+    """One Twilio media stream: reads caller audio and speaks replies on the same socket."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.send_lock = threading.Lock()
+        self.stream_sid = None
+        self.call_sid = None
+        self.closed = False
+        self.generation = 0  # Bumped by clear() so replies in flight stop sending
+        self.pending_marks = set()
+        self.last_mark = 0
+
+    def send(self, message):
+        with self.send_lock:
+            self.ws.send(json.dumps(message))
+
+    def wait_for_start(self):
+        for message in self.messages():
+            if message.get("event") == "start":
+                self.stream_sid = message["start"]["streamSid"]
+                self.call_sid = message["start"].get("callSid")
+                return True
+        return False
+
+    def messages(self):
+        while not self.closed:
+            try:
+                raw = self.ws.receive()
+            except Exception:
+                raw = None
+            if raw is None:
+                self.closed = True
+                return
+            yield json.loads(raw)
+
+    def frames(self):
+        """Yields the caller's audio as 8 kHz 16-bit PCM frames until the stream stops."""
+        for message in self.messages():
+            event = message.get("event")
+            if event == "media":
+                yield ulaw_to_pcm16(base64.b64decode(message["media"]["payload"]))
+            elif event == "mark":
+                self.pending_marks.discard(message["mark"]["name"])
+            elif event == "stop":
+                self.closed = True
+                return
+
+    @property
+    def speaking(self):
+        # Twilio echoes each mark once the audio sent before it has played
+        return bool(self.pending_marks)
+
+    def say(self, text, voice, started=None, intent="chat"):
+        generation = self.generation
+        first_chunk = []
+
+        def forward(chunk):
+            if generation != self.generation or self.closed:
+                return False
+            if not first_chunk and started is not None:
+                first_chunk.append(True)
+                first_audio_latency.observe(time.time() - started, intent=intent)
+            self.send({"event": "media", "streamSid": self.stream_sid,
+                       "media": {"payload": base64.b64encode(chunk).decode("ascii")}})
+            return True
+
+        self.last_mark += 1
+        mark = f"reply-{self.last_mark}"
+        self.pending_marks.add(mark)
+        if stream_tts_ulaw(text, voice, forward):
+            self.send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": mark}})
         else:
-            debug_log(f"TTS response already cached: {response}")
+            self.pending_marks.discard(mark)
+
+    def clear(self):
+        # Drops audio Twilio has buffered but not played yet
+        self.generation += 1
+        self.pending_marks.clear()
+        self.send({"event": "clear", "streamSid": self.stream_sid})
+
+
+def media_stream_reply(text, session):
+    """Returns (intent, line to speak) for a transcribed utterance."""
+    intent, payload, dynamic = intent_matcher.classify(text)
+    intents_total.inc(intent=intent)
+    if intent == "voice_switch":
+        return intent, switch_voice(text, session)
+    if intent == "easter_egg":
+        return intent, EASTER_EGGS[payload]
+    if intent in ("song", "interrupt"):
+        return intent, random.choice(SONG_RESPONSES if intent == "song" else INTERRUPT_RESPONSES)
+    history = session["history"][-CONVERSATION_CONTEXT_TURNS:] if CONVERSATION_CONTEXT_TURNS else None
+    return intent, get_chatgpt_response(text, dynamic=dynamic, mode=session["mode"], history=history, voice=session["voice"])
+
+
+def respond_on_media_stream(call, text, session, started):
+    chatgpt_start = time.time()
+    intent, line = media_stream_reply(text, session)
+    chatgpt_latency = time.time() - chatgpt_start
+    if not line:
+        return
+    tts_start = time.time()
+    call.say(line, session["voice"], started=started, intent=intent)
+    record_turn(session, text, line, {
+        "chatgpt": chatgpt_latency,
+        "tts": time.time() - tts_start,
+        "total": time.time() - started,
+    })
+    save_session(call.call_sid, session)
 
 
-############################### Flask App Tear Down ###############################
+def run_media_stream(ws):
+    call = MediaStreamCall(ws)
+    if not call.wait_for_start():
+        return
+    debug_log("Media stream started.", {"Call SID": call.call_sid, "Stream SID": call.stream_sid})
+    mark_call_active(call.call_sid)
+    session = get_session(call.call_sid)
+    job_executor.submit(call.say, WELCOME_MESSAGE, session["voice"])
 
-@app.teardown_appcontext
-def shutdown(exception=None):
-    debug_log("Flask app is shutting down...")
+    def barge_in(text):
+        # Stop listening early only to cut off a reply with "stop", "enough", ...
+        return call.speaking and intent_matcher.classify(text)[0] == "interrupt"
+
+    pool = get_recognizer_pool(MEDIA_SAMPLE_RATE)
+    try:
+        recognizer = pool.acquire()
+    except Exception as e:
+        debug_log(f"Media stream cannot transcribe: {e}")
+        return
+    frames = call.frames()
+    try:
+        while not call.closed:
+            # Vosk resamples the 8 kHz telephony audio to the model's rate internally
+            text = transcribe_stream(frames, recognizer, VoiceActivityDetector(MEDIA_SAMPLE_RATE),
+                                     MEDIA_FRAME_SECONDS, on_partial=barge_in)
+            recognizer.Reset()
+            if not text:
+                continue
+            started = time.time()
+            mark_call_active(call.call_sid)
+            if call.speaking:
+                call.clear()
+            debug_log("Media stream utterance.", {"Call SID": call.call_sid, "User Said": text})
+            job_executor.submit(respond_on_media_stream, call, text, session, started)
+    finally:
+        pool.release(recognizer)
+        debug_log("Media stream closed.", {"Call SID": call.call_sid})
+
+
+if sock is not None:
+    @sock.route("/voice/stream")
+    def media_stream(ws):
+        run_media_stream(ws)
+
+############################### Worker Lifecycle ###############################
+
+# Under gunicorn (see gunicorn.conf.py) the app is imported once in the master and
+# forked into workers. Each worker rebuilds what cannot cross a fork and shares
+# nothing with the others except the disk caches and, if configured, Redis.
+DRAIN_TIMEOUT = int(os.getenv("DRAIN_TIMEOUT", "25"))
+audio_bank_leader = None  # Lock file held by the worker that builds the audio bank
+
+def init_worker():
+    """
+    Rebuilds per-process state in a freshly forked worker: thread pools, provider
+    connection pools and the SQLite connection are not fork-safe, and none of the
+    parent's background threads exist in the child.
+    """
+    global executor, job_executor, tts_http, openai_client, response_cache, audio_bank_leader, media_publisher
+    detach_log_listener()
+    executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+    job_executor = ThreadPoolExecutor(max_workers=VOICE_JOB_WORKERS)
+    tts_http = build_tts_session()
+    openai_client = build_openai_client()
+    response_cache = ResponseCache(CACHE_DB)
+    media_publisher = build_media_publisher()
+    audio_store.scan()
+    start_preloads()
+    load_audio_bank()
+    # One worker fills the audio bank; the others find its clips through the audio store
+    audio_bank_leader = try_lead("audio_bank")
+    if audio_bank_leader:
+        executor.submit(build_audio_bank)
+    start_cache_janitor()
+    debug_log("Worker initialized.", {"PID": os.getpid()})
+
+def drain(timeout=DRAIN_TIMEOUT):
+    """
+    Graceful shutdown: stops the background loops, then gives queued and running
+    replies up to timeout seconds to finish before the process exits.
+    """
+    debug_log("Draining background work before shutdown...", {"PID": os.getpid()})
+    shutdown_event.set()
     stop_playback.set()
+    microphone.stop()
+    waiter = threading.Thread(
+        target=lambda: [pool.shutdown(wait=True) for pool in (job_executor, executor)], daemon=True
+    )
+    waiter.start()
+    waiter.join(timeout)
+    debug_log("Drained." if not waiter.is_alive() else f"Gave up draining after {timeout} seconds.")
+    stop_logging()
 
 ############################### Flask Server Health Check ###############################
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    return {"status": "OK"}, 200
+    ready = startup_ready.is_set()
+    return {
+        "status": "OK" if ready else "STARTING",
+        "ready": ready,
+        "startup": {"jobs": dict(startup_jobs), **startup_timing},
+        "providers": {breaker.name: breaker.state for breaker in (openai_breaker, tts_breaker)},
+    }, 200 if ready else 503
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return {
+        "responses": response_cache.stats(),
+        "audio": audio_store.report(),
+        "disk": audio_store.occupancy(),
+        "speculation": dict(speculation_stats),
+        "intents": intents_total.totals(),
+        "semantic": semantic_cache.stats() if semantic_cache is not None else None,
+        "publisher": media_publisher.stats() if media_publisher is not None else None,
+        "coalescing": {"llm": llm_flight.stats(), "tts": tts_flight.stats()},
+    }, 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    for name, cache in (("response", response_cache), ("audio", audio_store), ("semantic", semantic_cache)):
+        if cache is None:
+            continue
+        counters = cache.counters
+        hits = counters["hits"] + counters.get("disk_hits", 0)
+        misses = counters["misses"] if "misses" in counters else counters["renders"]
+        cache_lookups.set(hits, cache=name, result="hit")
+        cache_lookups.set(misses, cache=name, result="miss")
+    active_calls_gauge.set(count_active_calls())
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 ############################### Global Exception Handler ###############################
 
@@ -492,147 +3194,413 @@ def handle_exception(e):
 
 @app.errorhandler(429)
 def rate_limit_exceeded(e):
+    rate_limited.inc()
     debug_log("Rate limit exceeded.", structured_data={
         "Error": str(e),
-        "Remote Address": get_remote_address(),
+        "Caller": caller_key(),
         "Time": time.strftime("%Y-%m-%d %H:%M:%S"),
     })
+    # Twilio would end the call on a 429, so slow the caller down in character instead
     response = VoiceResponse()
-    response.say("You are making too many requests. Please slow down.")
-    return str(response), 429
+    busy_file = PRELOADED_RESPONSES.get("busy")
+    if busy_file:
+        response.play(cache_url(busy_file))
+    else:
+        response.say(COMMON_RESPONSES["busy"])
+    response.pause(length=2)
+    gather_speech(response)
+    return str(response), 200
 
 ############################### Serve Static Files ###############################
 
+# Audio store clips are named after the hash of what they contain, so they never
+# change and can be cached for good. Other files (welcome.mp3, fallback.mp3, ...)
+# may be re-rendered in place; they get an ETag from their content and a short max-age.
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "300"))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_ACCEL_REDIRECT = os.getenv("STATIC_ACCEL_REDIRECT")  # e.g. /internal-static, for nginx
+HOT_CLIP_CACHE_BYTES = int(os.getenv("HOT_CLIP_CACHE_MB", "16")) * 1024 * 1024
+HOT_CLIP_MAX_BYTES = 512 * 1024
+app.config["USE_X_SENDFILE"] = os.getenv("STATIC_X_SENDFILE", "false").lower() == "true"
+CONTENT_HASH_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+class HotClipCache:
+    """
+    Byte-bounded LRU of small clip contents, for files fetched over and over such
+    as welcome and fallback. A clip is only admitted on its second fetch, so the
+    stream of one-off replies doesn't push those out.
+    """
+
+    def __init__(self, max_bytes=HOT_CLIP_CACHE_BYTES, max_clip_bytes=HOT_CLIP_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.max_clip_bytes = max_clip_bytes
+        self.lock = threading.Lock()
+        self.clips = OrderedDict()  # (path, size, mtime) -> bytes
+        self.seen = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        with self.lock:
+            data = self.clips.get(key)
+            if data is not None:
+                self.clips.move_to_end(key)
+                return data
+            if key not in self.seen:
+                self.seen[key] = True
+                if len(self.seen) > 4096:
+                    self.seen.popitem(last=False)
+                return None
+        if not self.max_bytes or key[1] > self.max_clip_bytes:
+            return None
+        with open(key[0], "rb") as clip_file:
+            data = clip_file.read()
+        with self.lock:
+            self.seen.pop(key, None)
+            if key not in self.clips:
+                self.clips[key] = data
+                self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.clips.popitem(last=False)
+                self.size -= len(evicted)
+        return data
+
+hot_clips = HotClipCache()
+static_etags = {}  # (path, size, mtime) -> content hash, for files that can change
+static_etags_lock = threading.Lock()
+
+def static_etag(path, key):
+    """Returns (etag, immutable) for a static file."""
+    name, _ = os.path.splitext(os.path.basename(path))
+    if CONTENT_HASH_NAME.match(name):
+        return name, True
+    with static_etags_lock:
+        etag = static_etags.get(key)
+    if etag is None:
+        with open(path, "rb") as static_file:
+            etag = hashlib.sha256(static_file.read()).hexdigest()
+        with static_etags_lock:
+            if len(static_etags) > 1024:
+                static_etags.clear()
+            static_etags[key] = etag
+    return etag, False
+
 @app.route('/static/<path:filename>', methods=['GET'])
 def serve_static(filename):
-    file_path = os.path.join(CACHE_DIR, filename)
-    if not os.path.exists(file_path):
-        debug_log(f"Static file not found: {file_path}")
+    file_path = safe_join(STATIC_DIR, filename)
+    try:
+        stat = os.stat(file_path) if file_path else None
+    except OSError:
+        stat = None
+    if stat is None or not os.path.isfile(file_path):
+        if file_path and audio_store.manages(file_path) and os.path.isfile(FALLBACK_FILE):
+            # A reply clip that failed to render or isn't ready: Twilio would abandon
+            # the rest of the reply on a 404, so the caller hears the fallback line
+            debug_log("Clip not ready. Serving fallback audio.", {"Clip": filename})
+            response = serve_static(os.path.relpath(FALLBACK_FILE, STATIC_DIR))
+            # The clip's URL may serve the real audio later
+            response.headers["Cache-Control"] = "no-store"
+            return response
+        debug_log(f"Static file not found: {filename}")
         return "File not found", 404
-    debug_log(f"Serving static file: {file_path}")
-    return send_from_directory(CACHE_DIR, filename)
+
+    key = (file_path, stat.st_size, stat.st_mtime_ns)
+    etag, immutable = static_etag(file_path, key)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if STATIC_ACCEL_REDIRECT:
+        # nginx sends the file itself, so no worker is tied up streaming audio
+        response = app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = f"{STATIC_ACCEL_REDIRECT}/{filename}"
+    else:
+        data = None if app.config["USE_X_SENDFILE"] else hot_clips.get(key)
+        if data is not None:
+            response = app.response_class(data, mimetype=mimetype)
+        else:
+            # A file body lets the WSGI server use sendfile(2)
+            response = send_file(file_path, mimetype=mimetype, conditional=False, etag=False)
+    response.set_etag(etag)
+    response.last_modified = stat.st_mtime
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE if immutable else STATIC_MAX_AGE
+    if immutable:
+        response.cache_control.immutable = True
+    if STATIC_ACCEL_REDIRECT:
+        return response
+    return response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
 
 ############################### Flask Routes ###############################
 
 @app.route("/voice", methods=["POST"])
-@limiter.limit("10/minute")
+@limiter.limit(VOICE_RATE_LIMIT)
+@traced
 def voice():
+    voice_in_progress.inc()
     try:
         debug_log("Received /voice request")
         response = VoiceResponse()
         absolute_start = time.time()
+        call_sid = request.form.get("CallSid")
+        mark_call_active(call_sid)
+        session = get_session(call_sid)
 
         user_input = request.form.get("SpeechResult", "").strip().lower()
         debug_log(f"User Input: {user_input}")
 
         # Handle initial greeting if call is ringing
         if not user_input and request.form.get("CallStatus") == "ringing":
+            if MEDIA_STREAM_MODE and sock is not None:
+                debug_log("Connecting call to media stream.")
+                connect = Connect()
+                connect.stream(url=MEDIA_STREAM_URL)
+                response.append(connect)
+                return str(response)
             debug_log("Handling initial greeting.")
-            response.play("https://god.ngrok.app/static/cached_responses/welcome.mp3")
-            response.gather(input="speech", action="/voice", method="POST", timeout=2)
+            response.play(cache_url(os.path.join(CACHE_DIR, f"welcome{TWILIO_AUDIO_EXTENSION}")))
+            gather_speech(response, timeout=2)
             return str(response)
 
         # Handle fallback for empty input
         if not user_input:
             debug_log("No input received. Playing fallback response.")
             fallback_file = PRELOADED_RESPONSES.get("fallback", FALLBACK_FILE)
-            response.play(f"https://god.ngrok.app/static/cached_responses/{os.path.basename(fallback_file)}")
-            response.gather(input="speech", action="/voice", method="POST", timeout=2)
+            response.play(cache_url(fallback_file))
+            gather_speech(response, timeout=2)
             return str(response)
 
+        intent, payload, dynamic = intent_matcher.classify(user_input)
+        intents_total.inc(intent=intent)
+        trace_event("intent", intent=intent, dynamic=dynamic)
+
+        speculation = None
+        if intent in ("voice_switch", "song", "easter_egg", "interrupt"):
+            # Canned lines are already in the audio bank, so a head start is of no use
+            drop_speculation(call_sid)
+        elif SPECULATIVE_MODE:
+            speculation = claim_speculation(call_sid, user_input)
+
         # Handle voice switching
-        if switch_voice(user_input):
+        confirmation_message = switch_voice(user_input, session) if intent == "voice_switch" else None
+        if confirmation_message:
+            save_session(call_sid, session)
             debug_log("Voice switched. Playing confirmation.")
-            response.play("https://god.ngrok.app/static/response.mp3")
-            response.gather(input="speech", action="/voice", method="POST", timeout=3)
+            confirmation_file = canned_clip(confirmation_message, session["voice"])
+            if confirmation_file:
+                response.play(cache_url(confirmation_file))
+            else:
+                response.say(confirmation_message)
+            first_audio_latency.observe(time.time() - absolute_start, intent=intent)
+            gather_speech(response, timeout=3)
             return str(response)
 
-        if "sing me a song" in user_input or "song" in user_input:
+        if intent == "song":
             debug_log("Song request detected.")
-            response.play("https://god.ngrok.app/static/response.mp3")
-            response.gather(input="speech", action="/voice", method="POST", timeout=3)
+            song_file = handle_song_request(session["voice"])
+            response.play(cache_url(song_file) if song_file else cache_url(FALLBACK_FILE))
+            first_audio_latency.observe(time.time() - absolute_start, intent=intent)
+            gather_speech(response, timeout=3)
             return str(response)
         
         # Handle Easter Egg requests
-        if handle_easter_egg_request(user_input):
+        egg_file = handle_easter_egg_request(user_input, session["voice"], payload) if intent == "easter_egg" else None
+        if egg_file:
             debug_log("Easter egg response played.")
-            response.gather(input="speech", action="/voice", method="POST", timeout=3)
+            response.play(cache_url(egg_file))
+            first_audio_latency.observe(time.time() - absolute_start, intent=intent)
+            gather_speech(response, timeout=3)
+            return str(response)
+
+        # Caller cut in with "stop", "enough", ...
+        if intent == "interrupt":
+            interrupt_line = random.choice(INTERRUPT_RESPONSES)
+            interrupt_file = canned_clip(interrupt_line, session["voice"])
+            debug_log(f"Interrupt detected: {interrupt_line}")
+            if interrupt_file:
+                response.play(cache_url(interrupt_file))
+            else:
+                response.say(interrupt_line)
+            first_audio_latency.observe(time.time() - absolute_start, intent=intent)
+            gather_speech(response, timeout=3)
             return str(response)
 
         # Process dynamic requests
-        dynamic = any(keyword in user_input for keyword in DYNAMIC_KEYWORDS)
         debug_log("Processing user input.", {"Dynamic": dynamic})
 
-        chatgpt_start = time.time()
-        ai_response = get_chatgpt_response(user_input, dynamic=dynamic)
-        chatgpt_latency = time.time() - chatgpt_start
+        speculative_reply_text = speculation["ai_response"] if speculation and speculation["kind"] == "chat" else None
 
-        # Generate cache key tied to current voice
-        cache_key = hashlib.md5(f"{ai_response}_{current_voice}".encode()).hexdigest()
-        cached_file = os.path.join(CACHE_DIR, f"cached_{cache_key}.mp3")
+        # In async mode the LLM -> TTS work runs on job_executor and Twilio polls for it
+        if ASYNC_VOICE_MODE:
+            job_id = submit_voice_job(user_input, dynamic, session, speculative_reply_text)
+            play_filler(response)
+            response.redirect(f"/voice/result/{job_id}", method="POST")
+            debug_log("Queued async voice job.", {"Job ID": job_id, "Queued In (s)": round(time.time() - absolute_start, 3)})
+            return str(response)
 
-        if validate_cache(ai_response, cached_file):
-            debug_log(f"Cache hit for prompt: {user_input}")
-        else:
-            tts_start = time.time()
-            # IMPORTANT: Set play=False so that the Pi does NOT play the audio locally when handling Twilio calls
-            cached_file = generate_tts_streaming(ai_response, cached_file, play=False)
-            tts_latency = time.time() - tts_start
-            debug_log(f"TTS generated and cached for: {user_input}")
+        result = generate_reply_audio(user_input, dynamic=dynamic, session=session, ai_response=speculative_reply_text)
 
-        if cached_file and os.path.exists(cached_file):
+        if result["audio_files"]:
             playback_start = time.time()
-            response.play(f"https://god.ngrok.app/static/cached_responses/{os.path.basename(cached_file)}")
+            for audio_file in result["audio_files"]:
+                response.play(cache_url(audio_file))
             playback_latency = time.time() - playback_start
         else:
             debug_log("TTS generation failed. Falling back to default response.")
-            response.play("https://god.ngrok.app/static/fallback.mp3")
+            response.play(cache_url(FALLBACK_FILE))
             playback_latency = 0.0
 
         total_latency = time.time() - absolute_start
+        stage_latency.observe(playback_latency, stage="playback")
+        stage_latency.observe(total_latency, stage="total")
+        first_audio_latency.observe(total_latency, intent=intent)
+        record_turn(session, user_input, result["ai_response"], {
+            "chatgpt": result["chatgpt_latency"],
+            "tts": result["tts_latency"],
+            "total": total_latency,
+        })
+        save_session(call_sid, session)
         structured_data = {
             "Timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
             "Message": "Processed user input with detailed latencies.",
+            "Call SID": call_sid,
+            "Turn": session["turns"],
             "User Said": user_input,
-            "GOD Said": ai_response,
-            "Cached File": cached_file,
+            "GOD Said": result["ai_response"],
+            "Cached Files": result["audio_files"],
             "Latencies": {
-                "ChatGPT Latency (s)": round(chatgpt_latency, 2),
-                "TTS Latency (s)": round(tts_latency, 2) if 'tts_latency' in locals() else None,
+                "ChatGPT Latency (s)": round(result["chatgpt_latency"], 2),
+                "TTS Latency (s)": round(result["tts_latency"], 2) if result["tts_latency"] is not None else None,
                 "Playback Latency (s)": round(playback_latency, 2),
                 "Total Processing Latency (s)": round(total_latency, 2),
             }
         }
         debug_log("Completed interaction with absolute latency metrics.", structured_data=structured_data)
 
-        response.gather(input="speech", action="/voice", method="POST", timeout=3)
+        gather_speech(response, timeout=3)
         return str(response)
 
     except Exception as e:
         debug_log("Error in /voice route.", {"Error Message": str(e)})
-        return str(VoiceResponse().play("https://god.ngrok.app/static/fallback.mp3"))
+        return str(VoiceResponse().play(cache_url(FALLBACK_FILE)))
+    finally:
+        voice_in_progress.dec()
 
+@app.route("/voice/result/<job_id>", methods=["POST"])
+def voice_result(job_id):
+    """
+    Twilio lands here via <Redirect> after /voice queued a job. Plays the finished
+    clip, or pauses and redirects back here until the job is done.
+    """
+    response = VoiceResponse()
+    with voice_jobs_lock:
+        job = voice_jobs.get(job_id)
+    if job is None:
+        job = load_shared_voice_job(job_id)
+
+    if job is None:
+        debug_log(f"Unknown or expired voice job: {job_id}")
+        response.play(cache_url(FALLBACK_FILE))
+        gather_speech(response, timeout=3)
+        return str(response)
+
+    future = job.get("future")
+    done = future.done() if future is not None else job["done"]
+    if not done:
+        with voice_jobs_lock:
+            job["polls"] += 1
+            polls = job["polls"]
+        if polls <= ASYNC_MAX_POLLS:
+            response.pause(length=ASYNC_POLL_INTERVAL)
+            response.redirect(f"/voice/result/{job_id}?polls={polls}", method="POST")
+            return str(response)
+        debug_log(f"Voice job {job_id} timed out after {ASYNC_MAX_POLLS} polls.")
+
+    with voice_jobs_lock:
+        voice_jobs.pop(job_id, None)
+    if SHARED_JOB_STATE:
+        session_store.delete(f"job:{job_id}")
+
+    if future is not None:
+        result = None
+        if done and not future.cancelled():
+            if future.exception() is None:
+                result = future.result()
+            else:
+                # Same as the sync path: the caller hears the fallback clip, not a dropped call
+                debug_log("Voice job failed.", {"Job ID": job_id, "Error Message": str(future.exception())})
+    else:
+        result = job["result"]
+    if result:
+        call_sid = request.form.get("CallSid")
+        session = get_session(call_sid)
+        total_latency = time.time() - job["created"]
+        stage_latency.observe(total_latency, stage="total")
+        if result["audio_files"]:
+            first_audio_latency.observe(total_latency, intent="chat")
+        record_turn(session, job["user_input"], result["ai_response"], {
+            "chatgpt": result["chatgpt_latency"],
+            "tts": result["tts_latency"],
+            "total": total_latency,
+        })
+        save_session(call_sid, session)
+
+    if result and result["audio_files"]:
+        for audio_file in result["audio_files"]:
+            response.play(cache_url(audio_file))
+    else:
+        response.play(cache_url(FALLBACK_FILE))
+
+    debug_log("Served async voice job.", {
+        "Job ID": job_id,
+        "Polls": job["polls"],
+        "GOD Said": result["ai_response"] if result else None,
+        "Total Job Latency (s)": round(time.time() - job["created"], 2),
+    })
+    gather_speech(response, timeout=3)
+    return str(response)
+
+@app.route("/voice/partial", methods=["POST"])
+def voice_partial():
+    # Twilio's partialResultCallback; only the stable part of the transcript is used
+    call_sid = request.form.get("CallSid")
+    stable_text = request.form.get("StableSpeechResult", "")
+    if SPECULATIVE_MODE and call_sid and stable_text:
+        speculate(call_sid, stable_text)
+    return "", 204
+
+@app.route("/voice/status", methods=["POST"])
+def voice_status():
+    # Configure as the number's status callback so finished calls drop their session
+    if request.form.get("CallStatus") in ("completed", "busy", "failed", "no-answer", "canceled"):
+        call_sid = request.form.get("CallSid")
+        if call_sid:
+            session_store.delete(call_sid)
+            mark_call_ended(call_sid)
+            debug_log(f"Session closed for call {call_sid}.")
+    return "", 204
 
 ############################### Main Loop ###############################
 
 if __name__ == "__main__":
+    if "--build-audio-bank" in sys.argv:
+        build_audio_bank()
+        sys.exit(0)
+
     try:
         debug_log("Flask app is starting up.")
-        preload_responses()
-        preload_fallback()
-        preload_tts_responses()
-        
-        welcome_message = "Welcome, my child! What divine wisdom do you seek today?"
-        generate_tts_streaming(welcome_message, WELCOME_FILE, play=False)
-        debug_log("System ready. Welcome message preloaded.")
+        # Preloads render in the background; /health reports readiness
+        start_preloads()
+
+        # Serve whatever is already rendered right away and fill in the rest in the background
+        load_audio_bank()
+        executor.submit(build_audio_bank)
         
         idle_thread = threading.Thread(target=idle_mode_manager, daemon=True)
         idle_thread.start()
-        free_port(5001)
-        app.run(host="0.0.0.0", port=5001, debug=False)
+        start_cache_janitor()
+        # Single-process development server; use `gunicorn callgod:app` in production
+        app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5001")), debug=False)
         
     except KeyboardInterrupt:
         debug_log("Shutting down gracefully...")
-        stop_playback.set()
+        drain()
         idle_thread.join()
-        debug_log("Idle thread stopped. Goodbye!")
+        print("Idle thread stopped. Goodbye!")
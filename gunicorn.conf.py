@@ -0,0 +1,54 @@
+"""
+gunicorn settings for serving callgod.py with one process per core:
+
+    gunicorn callgod:app
+
+The app is imported once in the master (preload_app) and forked into threaded
+workers. post_fork gives each worker its own thread pools, provider clients
+and background jobs; worker_exit lets in-flight replies finish before the
+worker goes away. With more than one worker, set SESSION_REDIS_URL so calls
+keep their session (and async replies) whichever worker Twilio reaches.
+
+Some state stays per worker, whatever the settings:
+- /metrics and /cache/stats describe the worker that answered the request, so a
+  Prometheus scrape sees one random worker. Run one worker, or sum over several
+  scrapes, when exact totals matter.
+- A speculation started by /voice/partial lives in the worker that got the
+  partial. If the final /voice POST lands on another worker, it is not used and
+  that worker asks ChatGPT itself; the reply is the same, just not early.
+- Chunk renders are waited for across workers through .pending marker files.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+timeout = 60
+graceful_timeout = int(os.getenv("DRAIN_TIMEOUT", "25")) + 5
+keepalive = 5
+
+
+def on_starting(server):
+    import callgod
+    # Workers hand their log records to the master, the only process writing app_debug.log
+    callgod.share_log_queue()
+    if workers > 1 and not callgod.SESSION_REDIS_URL:
+        server.log.warning("Running %d workers without SESSION_REDIS_URL: call sessions are per worker.", workers)
+    if workers > 1 and callgod.RATE_LIMIT_STORAGE_URI.startswith("memory://"):
+        server.log.warning("Running %d workers with in-memory rate limits: each worker counts separately.", workers)
+    if workers > 1 and callgod.SPECULATIVE_MODE:
+        server.log.warning("Running %d workers with SPECULATIVE_MODE: a speculation only helps when the final "
+                           "transcript reaches the worker that started it.", workers)
+
+
+def post_fork(server, worker):
+    import callgod
+    callgod.init_worker()
+
+
+def worker_exit(server, worker):
+    import callgod
+    callgod.drain()
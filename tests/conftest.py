@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# callgod resolves its files against the working directory at import time, so
+# the suite runs in a scratch directory and never touches the checkout's cache.
+WORK_DIR = tempfile.mkdtemp(prefix="callgod-tests-")
+os.makedirs(os.path.join(WORK_DIR, "static", "cached_responses"))
+os.chdir(WORK_DIR)
+os.environ.setdefault("ELEVENLABS_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["DEBUG"] = "false"
+# Nothing listens here; a test that reaches a provider by mistake fails fast
+os.environ["ELEVENLABS_API_BASE"] = "http://127.0.0.1:9"
+os.environ["OPENAI_API_BASE"] = "http://127.0.0.1:9/v1"
+os.environ["PROVIDER_MAX_RETRIES"] = "0"
+for flag in ("ASYNC_VOICE_MODE", "CHUNKED_TTS_MODE", "STREAMING_REPLY_MODE", "SPECULATIVE_MODE",
+             "SEMANTIC_CACHE_MODE", "MEDIA_STREAM_MODE", "TRACE_DIR", "SESSION_REDIS_URL",
+             "RATE_LIMIT_STORAGE_URI", "MEDIA_BUCKET"):
+    os.environ.pop(flag, None)
+
+import callgod  # noqa: E402
+
+callgod.limiter.enabled = False
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh static/ tree, audio store and response cache for one test."""
+    static_dir = tmp_path / "static"
+    cache_dir = static_dir / "cached_responses"
+    cache_dir.mkdir(parents=True)
+    monkeypatch.setattr(callgod, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(callgod, "STATIC_DIR", str(static_dir))
+    monkeypatch.setattr(callgod, "CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(callgod, "FALLBACK_FILE", str(static_dir / f"fallback{callgod.TWILIO_AUDIO_EXTENSION}"))
+    monkeypatch.setattr(callgod, "audio_store", callgod.AudioStore(str(cache_dir)))
+    monkeypatch.setattr(callgod, "response_cache", callgod.ResponseCache(str(tmp_path / "response_cache.db")))
+    monkeypatch.setattr(callgod, "PRELOADED_RESPONSES", {})
+    return callgod.audio_store
+
+
+@pytest.fixture
+def fake_tts(store, monkeypatch):
+    """Renders every clip locally instead of calling ElevenLabs. Returns the texts rendered."""
+    rendered = []
+
+    def render(text, filename=None, play=False, voice=None):
+        filename = filename or callgod.audio_store.path_for(text, voice)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "wb") as audio_file:
+            audio_file.write(f"audio:{text}".encode())
+        callgod.audio_store.add(filename)
+        rendered.append(text)
+        return filename
+
+    monkeypatch.setattr(callgod, "generate_tts_streaming", render)
+    return rendered
+
+
+@pytest.fixture
+def fake_llm(store, monkeypatch):
+    """Answers every prompt without calling OpenAI. Returns the prompts sent."""
+    prompts = []
+
+    def fetch(prompt, dynamic=False, mode=None, history=None, splitter=None, remember=True):
+        prompts.append(prompt)
+        reply = f"The answer to {prompt} is within you."
+        if splitter is not None:
+            splitter.feed(reply)
+            splitter.close()
+        if not dynamic and remember:
+            callgod.response_cache.put_reply(prompt, reply)
+        return reply
+
+    monkeypatch.setattr(callgod, "fetch_chatgpt_reply", fetch)
+    return prompts
+
+
+@pytest.fixture
+def client(store):
+    return callgod.app.test_client()
+
+
+@pytest.fixture
+def fetch_clip(client):
+    """GETs a file under static/ by its path, as Twilio would from its URL."""
+    return lambda path, **kwargs: client.get(f"/static/{os.path.relpath(path, callgod.STATIC_DIR)}", **kwargs)
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import callgod
+
+
+@pytest.fixture
+def bank(fake_tts, tmp_path, monkeypatch):
+    monkeypatch.setattr(callgod, "AUDIO_BANK_MANIFEST", str(tmp_path / "audio_bank.json"))
+    monkeypatch.setattr(callgod, "canned_lines", lambda: ["Hallelujah!", "Not now.", "Behold."])
+    monkeypatch.setattr(callgod, "audio_bank", {})
+    return fake_tts
+
+
+def test_build_audio_bank_survives_a_failing_clip(bank, monkeypatch):
+    render = callgod.generate_tts_streaming
+
+    def flaky(text, *args, **kwargs):
+        if text == "Not now.":
+            raise ConnectionError("ElevenLabs hung up")
+        return render(text, *args, **kwargs)
+
+    monkeypatch.setattr(callgod, "generate_tts_streaming", flaky)
+    manifest = callgod.build_audio_bank(voices=["voice"], workers=2)
+
+    assert sorted(manifest["voice"]) == ["Behold.", "Hallelujah!"]
+    assert callgod.canned_clip("Behold.", "voice") == callgod.audio_store.path_for("Behold.", "voice")
+
+
+def test_canned_clip_rerenders_a_deleted_bank_clip(bank):
+    callgod.build_audio_bank(voices=["voice"])
+    path = callgod.canned_clip("Behold.", "voice")
+    os.remove(path)
+
+    assert callgod.canned_clip("Behold.", "voice") == path
+    assert os.path.exists(path)
+    assert bank.count("Behold.") == 2
+
+
+def test_bank_is_loaded_from_the_manifest(bank, monkeypatch):
+    built = callgod.build_audio_bank(voices=["voice"])
+    monkeypatch.setattr(callgod, "audio_bank", {})
+
+    loaded = callgod.load_audio_bank()
+    assert sorted(loaded["voice"]) == sorted(built["voice"])
+    assert callgod.canned_clip("Hallelujah!", "voice") == loaded["voice"]["Hallelujah!"]
+    assert bank.count("Hallelujah!") == 1  # Never rendered again
+
+
+def test_bank_clips_in_another_format_are_rendered_again(bank, monkeypatch):
+    built = callgod.build_audio_bank(voices=["voice"])
+    assert built["voice"]["Behold."].endswith(".mp3")
+    monkeypatch.setattr(callgod, "TWILIO_AUDIO_FORMAT", "ulaw")
+    monkeypatch.setattr(callgod, "TWILIO_AUDIO_EXTENSION", ".wav")
+
+    path = callgod.canned_clip("Behold.", "voice")  # The loaded bank still lists the MP3
+    assert path == callgod.audio_store.path_for("Behold.", "voice", "ulaw")
+    assert bank.count("Behold.") == 2
+    assert callgod.load_audio_bank() == {}
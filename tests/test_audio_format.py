@@ -0,0 +1,86 @@
+import struct
+
+import pytest
+
+import callgod
+
+
+class FakeTTSResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, audio):
+        self.audio = audio
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size):
+        return [self.audio[index:index + chunk_size] for index in range(0, len(self.audio), chunk_size)]
+
+
+@pytest.fixture
+def ulaw_mode(store, monkeypatch):
+    monkeypatch.setattr(callgod, "TWILIO_AUDIO_FORMAT", "ulaw")
+    monkeypatch.setattr(callgod, "TWILIO_AUDIO_EXTENSION", ".wav")
+
+
+def test_store_paths_follow_the_audio_format(store, ulaw_mode):
+    assert store.path_for("hello", "voice").endswith(".wav")
+    assert store.path_for("hello", "voice", "mp3").endswith(".mp3")
+    assert store.path_for("hello", "voice", "ulaw") != store.path_for("hello", "voice", "mp3")
+
+
+def test_ulaw_clip_is_rendered_as_a_wav(ulaw_mode, monkeypatch):
+    samples = bytes(range(255))  # Odd length, so the data chunk is padded
+    requests = []
+
+    def post(url, json, **kwargs):
+        requests.append(url)
+        return FakeTTSResponse(samples)
+
+    monkeypatch.setattr(callgod.tts_http, "post", post)
+    path = callgod.generate_tts_streaming("Be still.", voice="voice")
+
+    assert path.endswith(".wav")
+    assert "output_format=ulaw_8000" in requests[0]
+    assert callgod.read_ulaw_wav(path) == samples
+    with open(path, "rb") as clip_file:
+        audio = clip_file.read()
+    riff_size, = struct.unpack("<I", audio[4:8])
+    audio_format, channels, sample_rate = struct.unpack("<HHI", audio[20:28])
+    assert riff_size == len(audio) - 8
+    assert (audio_format, channels, sample_rate) == (7, 1, 8000)  # WAVE_FORMAT_MULAW, mono, 8 kHz
+
+
+def test_mp3_clip_requests_the_default_format(store, monkeypatch):
+    requests = []
+
+    def post(url, json, **kwargs):
+        requests.append(url)
+        return FakeTTSResponse(b"mp3 audio")
+
+    monkeypatch.setattr(callgod.tts_http, "post", post)
+    path = callgod.generate_tts_streaming("Be still.", voice="voice")
+
+    assert path.endswith(".mp3")
+    assert "output_format" not in requests[0]
+
+
+def test_read_ulaw_wav_rejects_a_file_without_data(tmp_path):
+    path = tmp_path / "broken.wav"
+    path.write_bytes(callgod.ulaw_wav_header(0)[:40])
+    with pytest.raises(ValueError):
+        callgod.read_ulaw_wav(str(path))
+
+
+def test_voice_plays_wav_clips_in_ulaw_mode(client, ulaw_mode, fake_llm, fake_tts):
+    response = client.post("/voice", data={"CallSid": "CA1", "SpeechResult": "who made the stars"})
+    body = response.get_data(as_text=True)
+    clip = callgod.audio_store.path_for("The answer to who made the stars is within you.", callgod.current_voice)
+
+    assert clip.endswith(".wav")
+    assert callgod.cache_url(clip) in body
@@ -0,0 +1,26 @@
+import os
+
+import callgod
+
+
+def test_path_is_content_addressed(store):
+    assert store.path_for("hello", "voice") == store.path_for("hello ", "voice")
+    assert store.path_for("hello", "voice") != store.path_for("hello", "other")
+
+
+def test_lookup_finds_clips_rendered_by_another_process(store):
+    path = store.path_for("from elsewhere", "voice")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as clip_file:
+        clip_file.write(b"x")
+
+    assert store.lookup("from elsewhere", "voice") == path
+    assert store.contains("from elsewhere", "voice")
+
+
+def test_get_or_render_renders_once(fake_tts):
+    first = callgod.audio_store.get_or_render("hello there", "voice")
+    second = callgod.audio_store.get_or_render("hello there", "voice")
+
+    assert first == second
+    assert fake_tts == ["hello there"]
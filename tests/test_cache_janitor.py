@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+import callgod
+
+
+def write_clip(store, text, size=100, age=0):
+    path = store.path_for(text, "voice")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as clip_file:
+        clip_file.write(b"x" * size)
+    store.add(path)
+    store.index[os.path.abspath(path)][1] = time.time() - age
+    return os.path.abspath(path)
+
+
+def test_evict_removes_least_recently_used_first(store):
+    oldest = write_clip(store, "one", age=30)
+    middle = write_clip(store, "two", age=20)
+    newest = write_clip(store, "three", age=10)
+
+    assert store.evict(max_bytes=10**6, max_files=2, max_age=3600) == [oldest]
+    assert not os.path.exists(oldest)
+    assert os.path.exists(middle) and os.path.exists(newest)
+    assert store.lookup("one", "voice") is None
+
+
+def test_evict_skips_pinned_clips(store):
+    pinned = write_clip(store, "canned", age=1000)
+    stale = write_clip(store, "reply", age=1000)
+    store.pin([pinned])
+
+    assert store.evict(max_bytes=10**6, max_files=100, max_age=60) == [stale]
+    assert os.path.exists(pinned)
+
+
+def test_evict_by_size(store):
+    first = write_clip(store, "one", size=600, age=30)
+    second = write_clip(store, "two", size=600, age=20)
+
+    assert store.evict(max_bytes=1000, max_files=100, max_age=3600) == [first]
+    assert os.path.exists(second)
+
+
+def test_scan_skips_clips_evicted_meanwhile(store, monkeypatch):
+    kept = write_clip(store, "kept")
+    gone = write_clip(store, "gone")
+    stat = os.stat
+
+    def racing_stat(path, *args, **kwargs):
+        if path == gone:
+            raise FileNotFoundError(path)  # Another worker evicted it after listdir
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(callgod.os, "stat", racing_stat)
+    store.scan()
+    assert list(store.index) == [kept]
+
+
+def test_janitor_thread_survives_a_failing_pass(store, monkeypatch):
+    monkeypatch.setattr(callgod, "shutdown_event", threading.Event())
+    monkeypatch.setattr(callgod, "JANITOR_INTERVAL", 0.01)
+    monkeypatch.setattr(callgod, "try_lead", lambda name: True)
+    passes = []
+
+    def run():
+        passes.append(time.time())
+        if len(passes) == 1:
+            raise OSError("disk went away")
+        if len(passes) == 3:
+            callgod.shutdown_event.set()
+
+    monkeypatch.setattr(callgod, "run_cache_janitor", run)
+    janitor = callgod.start_cache_janitor()
+    janitor.join(5)
+    assert not janitor.is_alive()
+    assert len(passes) == 3
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import pytest
+
+import callgod
+
+
+def test_split_sentences_merges_short_sentences():
+    assert callgod.split_sentences("Yes. No. Perhaps, my child. Ask again tomorrow!") == [
+        "Yes. No. Perhaps, my child.",
+        "Ask again tomorrow!",
+    ]
+    assert callgod.split_sentences("Fine.") == ["Fine."]
+
+
+def test_first_chunk_is_rendered_before_the_rest(fake_tts):
+    text = "The first sentence is long enough. The second one renders later. And so does the third."
+    files = callgod.generate_tts_chunked(text, "voice")
+
+    assert fake_tts[0] == "The first sentence is long enough."
+    assert files == [callgod.audio_store.path_for(chunk, "voice") for chunk in callgod.split_sentences(text)]
+    deadline = time.time() + 5
+    while len(fake_tts) < len(files) and time.time() < deadline:
+        time.sleep(0.01)
+    assert sorted(fake_tts) == sorted(callgod.split_sentences(text))
+
+
+def test_voice_plays_every_chunk_in_order(client, fake_tts, monkeypatch):
+    monkeypatch.setattr(callgod, "CHUNKED_TTS_MODE", True)
+    reply = "Be patient, my child. All will be revealed in time."
+    monkeypatch.setattr(callgod, "fetch_chatgpt_reply", lambda prompt, **kwargs: reply)
+    body = client.post("/voice", data={"CallSid": "CA1", "SpeechResult": "when"}).get_data(as_text=True)
+
+    urls = [callgod.cache_url(callgod.audio_store.path_for(chunk, callgod.current_voice))
+            for chunk in ("Be patient, my child.", "All will be revealed in time.")]
+    assert body.index(urls[0]) < body.index(urls[1])
+
+
+def test_static_waits_for_a_chunk_rendering_in_another_worker(fetch_clip):
+    clip = callgod.audio_store.path_for("Second sentence of the reply.", "voice")
+    os.makedirs(os.path.dirname(clip), exist_ok=True)
+    marker = f"{clip}{callgod.PENDING_SUFFIX}"
+    open(marker, "a").close()
+
+    def finish_render():
+        with open(clip, "wb") as clip_file:
+            clip_file.write(b"audio")
+        os.remove(marker)
+
+    timer = threading.Timer(0.2, finish_render)
+    timer.start()
+    response = fetch_clip(clip)
+    timer.join()
+    assert response.status_code == 200
+    assert response.data == b"audio"
+
+
+@pytest.fixture
+def fallback_clip(store):
+    with open(callgod.FALLBACK_FILE, "wb") as clip_file:
+        clip_file.write(b"fallback audio")
+    return callgod.FALLBACK_FILE
+
+
+def test_failed_chunk_is_answered_with_the_fallback_clip(fetch_clip, fallback_clip, monkeypatch):
+    monkeypatch.setattr(callgod, "generate_tts_streaming", lambda *args, **kwargs: None)
+    clip, future = callgod.queue_chunk_render("A chunk that will fail to render.", "voice")
+    future.result(5)
+
+    response = fetch_clip(clip)
+    assert response.status_code == 200
+    assert response.data == b"fallback audio"
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+def test_chunk_waiters_are_bounded(fetch_clip, fallback_clip, monkeypatch):
+    monkeypatch.setattr(callgod, "chunk_render_waiters", callgod.threading.BoundedSemaphore(1))
+    assert callgod.chunk_render_waiters.acquire(blocking=False)  # Another request is already waiting
+    clip = callgod.audio_store.path_for("A chunk rendering elsewhere.", "voice")
+    os.makedirs(os.path.dirname(clip), exist_ok=True)
+    open(f"{clip}{callgod.PENDING_SUFFIX}", "a").close()
+
+    start = time.time()
+    response = fetch_clip(clip)
+    assert time.time() - start < 1
+    # A moment of silence rather than the "didn't catch that" line in the middle of the reply
+    samples = int(callgod.ULAW_SAMPLE_RATE * callgod.CHUNK_SILENCE_SECONDS)
+    assert response.mimetype == "audio/wav"
+    assert response.data == callgod.ulaw_wav_header(samples) + b"\xff" * samples
+    assert response.headers["Cache-Control"] == "no-store"
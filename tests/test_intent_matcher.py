@@ -0,0 +1,58 @@
+import pytest
+
+import callgod
+
+
+@pytest.mark.parametrize("text, intent, payload", [
+    ("switch to tom", "voice_switch", callgod.VOICE_TOM),
+    ("let me talk to nikki", "voice_switch", callgod.VOICE_NIKKI),
+    ("can i speak to major tom please", "voice_switch", callgod.VOICE_TOM),
+    ("what will happen tomorrow", "chat", None),
+    ("stop", "interrupt", None),
+    ("okay stop", "interrupt", None),
+    ("don't stop believing in me lord", "chat", None),
+    ("what is the meaning of life", "chat", None),
+])
+def test_intent_matcher_classifies(text, intent, payload):
+    assert callgod.intent_matcher.classify(text)[:2] == (intent, payload)
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("sing me a song", "song"),
+    ("can you sing a lullaby", "song"),
+    ("another song please", "song"),
+    ("is tom hanks a good actor", "chat"),
+    ("tell nikki i said hello", "chat"),
+    ("switch to tomorrow", "chat"),
+    ("i sing in the shower is that a sin", "chat"),
+    ("do angels sing", "chat"),
+    ("what is the song of the universe", "chat"),
+    ("next", "interrupt"),
+    ("next please", "interrupt"),
+    ("okay that's enough", "interrupt"),
+    ("god shut your face", "interrupt"),
+    ("stop it now", "interrupt"),
+    ("what is next", "chat"),
+    ("what comes next for me", "chat"),
+    ("is it enough to be good", "chat"),
+    ("when will the war stop", "chat"),
+    ("stop global warming for us all please", "chat"),
+])
+def test_intent_matcher_false_positives(text, intent):
+    assert callgod.intent_matcher.classify(text)[0] == intent
+
+
+def test_intent_matcher_flags_dynamic_requests():
+    assert callgod.intent_matcher.classify("tell me something else")[2]
+    assert not callgod.intent_matcher.classify("tell me a story")[2]
+
+
+def test_intent_matcher_finds_easter_eggs_with_extra_words():
+    key = next(iter(callgod.EASTER_EGGS))
+    intent, payload, _ = callgod.intent_matcher.classify(f"{key} please")
+    assert (intent, payload) == ("easter_egg", key)
+
+
+def test_wake_words():
+    assert callgod.intent_matcher.has_wake_word("hey god are you there")
+    assert not callgod.intent_matcher.has_wake_word("good morning")
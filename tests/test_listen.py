@@ -0,0 +1,111 @@
+import json
+from array import array
+
+import pytest
+
+import callgod
+
+FRAME_SECONDS = callgod.VAD_FRAME_MS / 1000
+FRAME_SAMPLES = callgod.MIC_SAMPLE_RATE * callgod.VAD_FRAME_MS // 1000
+SPEECH = array("h", [2000, -2000] * (FRAME_SAMPLES // 2)).tobytes()
+SILENCE = bytes(FRAME_SAMPLES * 2)
+
+
+class FakeRecognizer:
+    """Stands in for KaldiRecognizer; hears one word per voiced frame."""
+
+    def __init__(self):
+        self.words = []
+        self.frames = 0
+
+    def AcceptWaveform(self, frame):
+        self.frames += 1
+        if frame == SPEECH:
+            self.words.append(f"word{len(self.words)}")
+        return False
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.words)})
+
+    def FinalResult(self):
+        return json.dumps({"text": " ".join(self.words)})
+
+    def Reset(self):
+        self.words.clear()
+
+
+@pytest.fixture
+def vad():
+    detector = callgod.VoiceActivityDetector(callgod.MIC_SAMPLE_RATE)
+    detector.vad = None  # Energy threshold, whether or not webrtcvad is installed
+    return detector
+
+
+def silent_frames(seconds):
+    return [SILENCE] * round(seconds / FRAME_SECONDS)
+
+
+def test_energy_vad_separates_speech_from_silence(vad):
+    assert vad.is_speech(SPEECH)
+    assert not vad.is_speech(SILENCE)
+    assert not vad.is_speech(b"")
+
+
+def test_utterance_ends_after_trailing_silence(vad):
+    recognizer = FakeRecognizer()
+    frames = silent_frames(0.3) + [SPEECH] * 5 + silent_frames(callgod.VAD_END_SILENCE) + [SPEECH] * 5
+
+    text = callgod.transcribe_stream(iter(frames), recognizer, vad, FRAME_SECONDS)
+    assert text == "word0 word1 word2 word3 word4"
+    assert recognizer.frames == len(frames) - 5  # The speech after the pause is left unread
+
+
+def test_listening_gives_up_without_speech(vad):
+    recognizer = FakeRecognizer()
+    text = callgod.transcribe_stream(iter(silent_frames(10)), recognizer, vad, FRAME_SECONDS, no_speech_timeout=1)
+    assert text == ""
+    assert recognizer.frames * FRAME_SECONDS == pytest.approx(1, abs=FRAME_SECONDS)
+
+
+def test_partial_transcript_can_stop_listening(vad):
+    heard = []
+
+    def on_partial(transcript):
+        heard.append(transcript)
+        return transcript.endswith("word2")
+
+    text = callgod.transcribe_stream(iter([SPEECH] * 10), FakeRecognizer(), vad, FRAME_SECONDS, on_partial=on_partial)
+    assert text == "word0 word1 word2"
+    assert heard == ["word0", "word0 word1", "word0 word1 word2"]
+
+
+def test_recognizers_are_reused(monkeypatch):
+    monkeypatch.setattr(callgod, "KaldiRecognizer", lambda model, rate: FakeRecognizer())
+    monkeypatch.setattr(callgod, "get_vosk_model", lambda: None)
+    pool = callgod.RecognizerPool(callgod.MIC_SAMPLE_RATE, size=1)
+
+    recognizer = pool.acquire()
+    recognizer.AcceptWaveform(SPEECH)
+    pool.release(recognizer)
+    assert pool.acquire() is recognizer
+    assert recognizer.words == []
+
+
+class FakeArecord:
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+
+def test_late_microphone_frames_count_as_silence():
+    microphone = callgod.MicrophoneStream()
+    microphone.process = FakeArecord()
+    microphone.frames.append(SPEECH)
+    stream = microphone.stream()
+
+    assert next(stream) == SPEECH
+    assert next(stream) == bytes(microphone.frame_bytes)  # Timed out, but still listening
+    microphone.process.returncode = 0
+    assert list(stream) == []
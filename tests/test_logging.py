@@ -0,0 +1,58 @@
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+
+import callgod
+
+
+def make_record():
+    record = logging.LogRecord("app_logger", logging.DEBUG, __file__, 1, "Rendered %s clips", (3,), None)
+    record.structured_data = {"Lock": threading.Lock(), "Files": ["a.mp3"]}
+    return record
+
+
+def test_records_stay_deferred_on_an_in_process_queue():
+    record = make_record()
+    assert callgod.DeferredQueueHandler(queue.SimpleQueue()).prepare(record) is record
+
+
+def test_records_are_flattened_for_a_multiprocessing_queue():
+    handler = callgod.DeferredQueueHandler(multiprocessing.Queue())
+    prepared = pickle.loads(pickle.dumps(handler.prepare(make_record())))
+
+    assert prepared.getMessage() == "Rendered 3 clips"
+    assert prepared.args is None and prepared.exc_info is None
+    assert prepared.structured_data["Files"] == ["a.mp3"]
+    assert isinstance(prepared.structured_data["Lock"], str)
+    assert callgod.JsonLineFormatter().format(prepared)
+
+
+def test_workers_log_through_the_master(monkeypatch):
+    records = queue.SimpleQueue()
+    collector = logging.Handler()
+    collector.emit = records.put
+    monkeypatch.setattr(callgod, "log_handlers", [collector])
+    monkeypatch.setattr(callgod, "worker_log_queue", None)
+    monkeypatch.setattr(callgod, "worker_log_listener", None)
+    monkeypatch.setattr(callgod.queue_handler, "queue", callgod.log_queue)
+
+    callgod.share_log_queue()
+    try:
+        # The master itself never puts to the shared queue
+        assert callgod.queue_handler.queue is callgod.log_queue
+        pid = os.fork()
+        if pid == 0:
+            callgod.detach_log_listener()
+            callgod.logger.info("Hello from a worker", extra={"structured_data": {"Lock": threading.Lock()}})
+            callgod.worker_log_queue.close()
+            callgod.worker_log_queue.join_thread()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        record = records.get(timeout=5)
+        assert record.getMessage() == "Hello from a worker"
+        assert isinstance(record.structured_data["Lock"], str)
+    finally:
+        callgod.worker_log_listener.stop()
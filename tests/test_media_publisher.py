@@ -0,0 +1,104 @@
+import os
+import time
+import uuid
+
+import pytest
+
+import callgod
+
+# Point this at a local MinIO (e.g. http://localhost:9000, with AWS_ACCESS_KEY_ID and
+# AWS_SECRET_ACCESS_KEY set) to test against a real bucket; otherwise moto stands in.
+TEST_BUCKET_ENDPOINT = os.getenv("TEST_MEDIA_BUCKET_ENDPOINT")
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    if callgod.boto3 is None:
+        pytest.skip("boto3 was not importable when callgod loaded")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
+    if TEST_BUCKET_ENDPOINT:
+        yield boto3.client("s3", endpoint_url=TEST_BUCKET_ENDPOINT)
+        return
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    with moto.mock_aws():
+        yield boto3.client("s3")
+
+
+@pytest.fixture
+def publisher(s3, fake_tts, monkeypatch):
+    bucket = f"callgod-test-{uuid.uuid4().hex[:12]}"
+    s3.create_bucket(Bucket=bucket)
+    publisher = callgod.MediaPublisher(bucket, TEST_BUCKET_ENDPOINT, "audio", "https://cdn.example.com")
+    monkeypatch.setattr(callgod, "media_publisher", publisher)
+    yield publisher
+    publisher.pool.shutdown(wait=True)
+
+
+def wait_for_uploads(publisher):
+    deadline = time.time() + 10
+    while publisher.stats()["pending"] and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_rendered_clip_is_served_from_the_bucket_once_uploaded(publisher, s3):
+    clip = callgod.audio_store.get_or_render("Let there be light.", "voice")  # Schedules the upload
+    wait_for_uploads(publisher)
+    key = f"audio/{os.path.relpath(clip, callgod.STATIC_DIR)}"
+    assert callgod.cache_url(clip) == f"https://cdn.example.com/{key}"
+
+    uploaded = s3.get_object(Bucket=publisher.bucket, Key=key)
+    assert uploaded["Body"].read() == b"audio:Let there be light."
+    assert uploaded["CacheControl"] == "public, max-age=31536000, immutable"
+    assert publisher.stats()["uploads"] == 1
+
+
+def test_clip_already_in_the_bucket_is_not_uploaded_again(publisher, s3):
+    # Rendered before a restart, so the store finds it on disk instead of adding it
+    clip = callgod.audio_store.path_for("Be still.", "voice")
+    os.makedirs(os.path.dirname(clip), exist_ok=True)
+    with open(clip, "wb") as clip_file:
+        clip_file.write(b"audio:Be still.")
+    key = f"audio/{os.path.relpath(clip, callgod.STATIC_DIR)}"
+    s3.put_object(Bucket=publisher.bucket, Key=key, Body=b"audio:Be still.")
+
+    assert callgod.cache_url(clip).startswith(callgod.PUBLIC_BASE_URL)
+    wait_for_uploads(publisher)
+    assert callgod.cache_url(clip) == f"https://cdn.example.com/{key}"
+    assert publisher.stats()["already_present"] == 1
+    assert publisher.stats()["uploads"] == 0
+
+
+def test_files_outside_the_audio_store_stay_local(publisher):
+    fallback = os.path.join(callgod.STATIC_DIR, "fallback.mp3")
+    assert callgod.cache_url(fallback) == f"{callgod.PUBLIC_BASE_URL}/static/fallback.mp3"
+    assert publisher.stats()["pending"] == 0 and publisher.stats()["published"] == 0
+
+
+def test_failed_upload_keeps_serving_locally(publisher, s3):
+    s3.delete_bucket(Bucket=publisher.bucket)
+    clip = callgod.audio_store.get_or_render("Into the void.", "voice")
+    wait_for_uploads(publisher)
+    assert publisher.stats()["failures"] == 1
+    assert callgod.cache_url(clip).startswith(callgod.PUBLIC_BASE_URL)
+
+
+def test_clip_still_rendering_is_not_uploaded(publisher):
+    clip = callgod.audio_store.path_for("Not yet spoken.", "voice")
+    assert callgod.cache_url(clip).startswith(callgod.PUBLIC_BASE_URL)
+    assert publisher.stats()["pending"] == 0 and publisher.stats()["uploads"] == 0
+
+
+def test_published_urls_are_bounded(publisher, monkeypatch):
+    monkeypatch.setattr(callgod, "MEDIA_PUBLISHED_MAX", 2)
+    clips = [callgod.audio_store.get_or_render(line, "voice") for line in ("Light.", "Water.")]
+    wait_for_uploads(publisher)
+    assert callgod.cache_url(clips[0]).startswith("https://cdn.example.com/")  # Now the most recent
+
+    callgod.audio_store.get_or_render("Land.", "voice")
+    wait_for_uploads(publisher)
+    assert publisher.stats()["published"] == 2
+    assert callgod.cache_url(clips[0]).startswith("https://cdn.example.com/")
+    assert callgod.cache_url(clips[1]).startswith(callgod.PUBLIC_BASE_URL)
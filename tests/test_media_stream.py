@@ -0,0 +1,102 @@
+import base64
+import json
+import queue
+import warnings
+from array import array
+
+import pytest
+
+import callgod
+
+
+class FakeWebSocket:
+    """Plays a list of Twilio messages to the app and records what it sends back."""
+
+    def __init__(self, messages=()):
+        self.incoming = queue.Queue()
+        for message in messages:
+            self.incoming.put(json.dumps(message))
+        self.sent = []
+
+    def receive(self):
+        return self.incoming.get(timeout=5)
+
+    def send(self, raw):
+        self.sent.append(json.loads(raw))
+
+
+def media(payload):
+    return {"event": "media", "media": {"payload": base64.b64encode(payload).decode("ascii")}}
+
+
+START = {"event": "start", "start": {"streamSid": "MZ1", "callSid": "CA1"}}
+
+
+def test_ulaw_decodes_to_pcm16():
+    pcm = callgod.ulaw_to_pcm16(bytes([0xFF, 0x7F, 0x00, 0x80]))
+    assert list(array("h", pcm)) == [0, 0, -32124, 32124]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        audioop = pytest.importorskip("audioop")
+    payload = bytes(range(256))
+    assert callgod.ulaw_to_pcm16(payload) == audioop.ulaw2lin(payload, 2)
+
+
+def test_call_reads_caller_audio_until_stop():
+    ws = FakeWebSocket([START, media(b"\xff" * 160), {"event": "mark", "mark": {"name": "reply-1"}},
+                        media(b"\x00" * 160), {"event": "stop"}])
+    call = callgod.MediaStreamCall(ws)
+    call.pending_marks.add("reply-1")
+
+    assert call.wait_for_start()
+    assert (call.stream_sid, call.call_sid) == ("MZ1", "CA1")
+    frames = list(call.frames())
+    assert [len(frame) for frame in frames] == [320, 320]
+    assert not call.speaking
+    assert call.closed
+
+
+@pytest.fixture
+def cached_line(monkeypatch):
+    """A mu-law line already in memory, so say() never calls ElevenLabs."""
+    clip = bytes(range(256)) * 5
+    monkeypatch.setattr(callgod, "ulaw_clips", callgod.OrderedDict({("Be still.", "voice"): clip}))
+    return clip
+
+
+def test_say_sends_audio_then_a_mark(cached_line):
+    ws = FakeWebSocket()
+    call = callgod.MediaStreamCall(ws)
+    call.stream_sid = "MZ1"
+    call.say("Be still.", "voice")
+
+    sent_audio = b"".join(base64.b64decode(message["media"]["payload"])
+                          for message in ws.sent if message["event"] == "media")
+    assert sent_audio == cached_line
+    assert ws.sent[-1] == {"event": "mark", "streamSid": "MZ1", "mark": {"name": "reply-1"}}
+    assert call.speaking
+
+
+def test_clear_stops_a_reply_being_sent(monkeypatch):
+    ws = FakeWebSocket()
+    call = callgod.MediaStreamCall(ws)
+    call.stream_sid = "MZ1"
+
+    def speak(text, voice, on_chunk):
+        assert on_chunk(b"\xff" * 160)
+        call.clear()  # The caller barged in
+        return on_chunk(b"\xff" * 160)
+
+    monkeypatch.setattr(callgod, "stream_tts_ulaw", speak)
+    call.say("A long sermon.", "voice")
+
+    assert [message["event"] for message in ws.sent] == ["media", "clear"]
+    assert not call.speaking
+
+
+def test_stream_replies_to_an_interrupt_without_the_llm(monkeypatch):
+    monkeypatch.setattr(callgod, "fetch_chatgpt_reply", lambda *args, **kwargs: pytest.fail("LLM called"))
+    session = callgod.new_session()
+    intent, line = callgod.media_stream_reply("stop", session)
+    assert intent == "interrupt" and line in callgod.INTERRUPT_RESPONSES
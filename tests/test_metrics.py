@@ -0,0 +1,32 @@
+import callgod
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = callgod.Metric("test_seconds", "Test latency.", "histogram", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="tts")
+    histogram.observe(0.5, stage="tts")
+
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{stage="tts",le="0.1"} 1',
+        'test_seconds_bucket{stage="tts",le="1.0"} 2',
+        'test_seconds_bucket{stage="tts",le="+Inf"} 2',
+        'test_seconds_sum{stage="tts"} 0.55',
+        'test_seconds_count{stage="tts"} 2',
+    ]
+
+
+def test_labels_are_escaped():
+    counter = callgod.Metric("test_total", "Test counter.", "counter", ("intent",))
+    counter.inc(intent='say "hi"\n')
+    assert counter.render().splitlines()[-1] == 'test_total{intent="say \\"hi\\"\\n"} 1'
+
+
+def test_metrics_endpoint_reports_voice_requests(client, fake_llm, fake_tts):
+    client.post("/voice", data={"CallSid": "CA1", "SpeechResult": "who made the stars"})
+    response = client.get("/metrics")
+    body = response.get_data(as_text=True)
+
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'callgod_time_to_first_audio_seconds_count{intent="chat"}' in body
+    assert 'callgod_cache_lookups_total{cache="response",result="miss"}' in body
+    assert "callgod_active_calls " in body
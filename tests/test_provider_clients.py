@@ -0,0 +1,39 @@
+import callgod
+
+
+def test_circuit_breaker_opens_then_lets_one_trial_through(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(callgod.time, "time", lambda: now[0])
+    breaker = callgod.CircuitBreaker("Test", failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one trial at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_open_breaker_skips_the_provider(client, monkeypatch):
+    breaker = callgod.CircuitBreaker("OpenAI", failure_threshold=1)
+    monkeypatch.setattr(callgod, "openai_breaker", breaker)
+
+    # Nothing listens on OPENAI_API_BASE in the tests, so the first call fails fast
+    assert callgod.fetch_chatgpt_reply("are you there") == callgod.LLM_FALLBACK_RESPONSE
+    assert breaker.state == "open"
+
+    monkeypatch.setattr(callgod, "openai_client", None)  # Any call now would raise
+    assert callgod.fetch_chatgpt_reply("are you there") == callgod.LLM_FALLBACK_RESPONSE
+    assert client.get("/health").get_json()["providers"]["OpenAI"] == "open"
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+import callgod
+
+
+def test_rate_limited_caller_hears_busy_line(client, monkeypatch):
+    monkeypatch.setattr(callgod.limiter, "enabled", True)
+    limit = int(callgod.VOICE_RATE_LIMIT.split("/")[0])
+    form = {"CallSid": "CA9", "From": "+15550001111", "CallStatus": "ringing"}
+    for _ in range(limit):
+        assert "<Play>" in client.post("/voice", data=form).get_data(as_text=True)
+
+    response = client.post("/voice", data=form)
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert f"<Say>{callgod.COMMON_RESPONSES['busy']}</Say>" in body
+    assert "<Pause" in body and "<Gather" in body
+    # Other callers are unaffected
+    other = client.post("/voice", data=dict(form, From="+15550002222"))
+    assert "<Play>" in other.get_data(as_text=True)
+
+
+def test_rate_limit_is_keyed_on_the_caller():
+    with callgod.app.test_request_context("/voice", method="POST", data={"CallSid": "CA1", "From": "+15550001111"}):
+        assert callgod.caller_key() == "caller:+15550001111"
+    with callgod.app.test_request_context("/voice", method="POST", data={"CallSid": "CA1"}):
+        assert callgod.caller_key() == "caller:CA1"
+
+
+def test_provider_slots_cap_concurrent_calls(monkeypatch):
+    monkeypatch.setattr(callgod.provider_saturated, "values", {})
+    slots = callgod.ProviderSlots("Test", 2, storage_uri="memory://", timeout=0.05)
+    first, second = slots.acquire(), slots.acquire()
+
+    assert first and second
+    assert slots.acquire() is None  # Degrades like an outage instead of queueing forever
+    assert callgod.provider_saturated.totals() == {"Test": 1}
+    slots.release(first)
+    assert slots.acquire()
+
+
+def test_queued_call_gets_the_next_free_slot():
+    slots = callgod.ProviderSlots("Test", 1, storage_uri="memory://", timeout=5)
+    held = slots.acquire()
+    threading.Timer(0.05, slots.release, (held,)).start()
+
+    start = time.time()
+    assert slots.acquire()
+    assert time.time() - start < 5
+
+
+def test_uncapped_provider_never_waits():
+    slots = callgod.ProviderSlots("Test", 0, storage_uri="memory://")
+    assert [slots.acquire() for _ in range(100)] == [""] * 100
+
+
+def test_shared_slots_are_counted_across_workers(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(callgod.redis.Redis, "from_url", lambda url: fakeredis.FakeRedis(server=server))
+    workers = [callgod.ProviderSlots("Test", 1, storage_uri="redis://shared", timeout=0.05) for _ in range(2)]
+
+    token = workers[0].acquire()
+    assert token
+    assert workers[1].acquire() is None
+    workers[0].release(token)
+    assert workers[1].acquire()
@@ -0,0 +1,33 @@
+import callgod
+
+
+def test_replies_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / "response_cache.db")
+    callgod.ResponseCache(db_path).put_reply("Are you real?", "As real as you are.")
+
+    restarted = callgod.ResponseCache(db_path)
+    assert restarted.get_reply("are you real") == "As real as you are."
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.get_reply("are you real") == "As real as you are."
+    assert restarted.stats()["hits"] == 1
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = callgod.ResponseCache(str(tmp_path / "response_cache.db"), max_entries=2, max_disk_entries=2)
+    for prompt in ("first", "second", "third"):
+        cache.put_reply(prompt, f"reply to {prompt}")
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["disk_entries"] == 2
+    assert stats["evictions"] == 1
+    assert cache.get_reply("first") is None
+    assert cache.get_reply("third") == "reply to third"
+
+
+def test_replies_are_shared_across_voices(fake_llm, fake_tts):
+    # The cache holds text only; each voice renders its own clip of the same reply
+    first = callgod.get_chatgpt_response("who made the stars", voice="voice one")
+    second = callgod.get_chatgpt_response("Who made the stars?", voice="voice two")
+
+    assert first == second
+    assert fake_llm == ["who made the stars"]
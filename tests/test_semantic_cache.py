@@ -0,0 +1,109 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import callgod
+
+
+class FakeOpenAI:
+    """Stands in for openai_client; raises while `down` is set."""
+
+    def __init__(self):
+        self.down = False
+        self.prompts = []
+        self.reply = "Seek and you shall find {prompt}."
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        if self.down:
+            raise ConnectionError("OpenAI is unreachable")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply.format(prompt=prompt)))])
+
+
+@pytest.fixture
+def openai(store, monkeypatch):
+    client = FakeOpenAI()
+    monkeypatch.setattr(callgod, "openai_client", client)
+    monkeypatch.setattr(callgod, "openai_breaker", callgod.CircuitBreaker("OpenAI"))
+    return client
+
+
+@pytest.fixture
+def semantic_cache(fake_tts, monkeypatch):
+    pytest.importorskip("numpy")
+    cache = callgod.SemanticReplyCache(callgod.HashedNgramEmbedder(), threshold=0.8, max_entries=2)
+    monkeypatch.setattr(callgod, "semantic_cache", cache)
+    return cache
+
+
+def test_outage_reply_is_not_served_to_similar_prompts(openai, semantic_cache, fake_tts):
+    openai.down = True
+    result = callgod.generate_reply_audio("are you real")
+    assert result["ai_response"] == callgod.LLM_FALLBACK_RESPONSE
+    assert result["audio_files"]
+
+    openai.down = False
+    result = callgod.generate_reply_audio("are you real god")
+    assert result["ai_response"] == "Seek and you shall find are you real god."
+    assert openai.prompts == ["are you real", "are you real god"]
+    assert semantic_cache.stats()["hits"] == 0
+
+
+def test_real_replies_are_reused_for_similar_prompts(openai, semantic_cache, fake_tts):
+    first = callgod.generate_reply_audio("are you real")
+    second = callgod.generate_reply_audio("are you real god")
+
+    assert second["ai_response"] == first["ai_response"]
+    assert openai.prompts == ["are you real"]
+    assert fake_tts == [first["ai_response"]]
+
+
+def test_chunked_replies_are_reused_for_similar_prompts(openai, semantic_cache, fake_tts, monkeypatch):
+    monkeypatch.setattr(callgod, "CHUNKED_TTS_MODE", True)
+    openai.reply = "I am as real as the ground beneath you. Ask the ground about {prompt}."
+    first = callgod.generate_reply_audio("are you real")
+    assert len(first["audio_files"]) == 2
+    deadline = time.time() + 5
+    while len(fake_tts) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    second = callgod.generate_reply_audio("are you real god")
+    assert second["ai_response"] == first["ai_response"]
+    assert second["audio_files"] == first["audio_files"]
+    assert openai.prompts == ["are you real"]
+    assert len(fake_tts) == 2
+
+    # A chunk evicted since is a miss, not a reply with a hole in it
+    os.remove(first["audio_files"][1])
+    assert semantic_cache.lookup("are you real god", callgod.current_voice) is None
+
+
+def test_semantic_cache_matches_rewordings(semantic_cache):
+    reply = "I am as real as you believe."
+    callgod.audio_store.get_or_render(reply, "voice")
+    semantic_cache.add("are you real", reply, "voice")
+
+    match = semantic_cache.lookup("are you real god", "voice")
+    assert match is not None and match[0] == reply and match[2] == "are you real"
+    assert semantic_cache.lookup("what should i eat for dinner", "voice") is None
+    assert semantic_cache.lookup("are you real god", "other voice") is None
+
+
+def test_semantic_cache_needs_audio_in_the_voice(semantic_cache):
+    semantic_cache.add("are you real", "A reply never rendered.", "voice")
+    assert semantic_cache.lookup("are you real", "voice") is None
+
+
+def test_semantic_cache_overwrites_oldest_when_full(semantic_cache):
+    for prompt in ("first prompt here", "second prompt here", "third prompt here"):
+        reply = f"reply to {prompt}"
+        callgod.audio_store.get_or_render(reply, "voice")
+        semantic_cache.add(prompt, reply, "voice")
+
+    assert semantic_cache.stats()["entries"] == {"voice": 2}
+    match = semantic_cache.lookup("first prompt here", "voice")
+    assert match is None or match[2] != "first prompt here"
@@ -0,0 +1,46 @@
+import pytest
+
+import callgod
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setattr(callgod, "session_store", callgod.InMemorySessionStore())
+    return callgod.session_store
+
+
+def test_voice_switch_only_affects_the_calling_call(client, fake_tts, sessions):
+    client.post("/voice", data={"CallSid": "CA1", "SpeechResult": "switch to tom"})
+
+    assert callgod.get_session("CA1")["voice"] == callgod.VOICE_TOM
+    assert callgod.get_session("CA2")["voice"] == callgod.current_voice
+    assert callgod.current_voice == callgod.VOICE_NIKKI
+
+
+def test_sessions_expire(monkeypatch):
+    sessions = callgod.InMemorySessionStore(ttl=60)
+    sessions.store("CA1", "{}")
+    assert sessions.load("CA1") == "{}"
+
+    later = callgod.time.time() + 61
+    monkeypatch.setattr(callgod.time, "time", lambda: later)
+    assert sessions.load("CA1") is None
+
+
+def test_finished_call_drops_its_session(client, fake_tts, sessions):
+    client.post("/voice", data={"CallSid": "CA3", "SpeechResult": "switch to tom"})
+    assert sessions.load("CA3") is not None
+
+    response = client.post("/voice/status", data={"CallSid": "CA3", "CallStatus": "completed"})
+    assert response.status_code == 204
+    assert sessions.load("CA3") is None
+
+
+def test_record_turn_keeps_recent_history():
+    session = callgod.new_session()
+    for turn in range(callgod.MAX_HISTORY_TURNS + 2):
+        callgod.record_turn(session, f"question {turn}", f"answer {turn}", {"total": 0.1})
+
+    assert session["turns"] == callgod.MAX_HISTORY_TURNS + 2
+    assert len(session["history"]) == callgod.MAX_HISTORY_TURNS
+    assert session["history"][-1] == {"user": f"question {turn}", "god": f"answer {turn}"}
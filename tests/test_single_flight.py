@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+import callgod
+
+
+def test_single_flight_shares_one_call():
+    flight = callgod.SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", work, 21)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", work, 21))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == [21]
+    assert sorted(results) == [(42, False), (42, True), (42, True), (42, True)]
+    assert flight.stats() == {"calls": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_single_flight_propagates_errors_and_forgets_the_key():
+    flight = callgod.SingleFlight("test")
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == ("ok", False)
+
+
+def test_concurrent_callers_share_one_tts_render(fake_tts, monkeypatch):
+    render = callgod.generate_tts_streaming
+    release = threading.Event()
+
+    def slow_render(*args, **kwargs):
+        release.wait(5)
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(callgod, "generate_tts_streaming", slow_render)
+    monkeypatch.setattr(callgod, "tts_flight", callgod.SingleFlight("tts"))
+    paths = []
+    callers = [threading.Thread(target=lambda: paths.append(callgod.audio_store.get_or_render("Amen.", "voice")))
+               for _ in range(4)]
+    for caller in callers:
+        caller.start()
+    while callgod.tts_flight.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for caller in callers:
+        caller.join(5)
+
+    assert fake_tts == ["Amen."]
+    assert len(set(paths)) == 1 and len(paths) == 4
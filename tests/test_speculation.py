@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+import callgod
+
+
+@pytest.fixture
+def slow_llm(store, monkeypatch):
+    """A ChatGPT stand-in that holds every call until `release` is set."""
+    llm = type("SlowLLM", (), {})()
+    llm.prompts = []
+    llm.release = threading.Event()
+
+    def fetch(prompt, dynamic=False, mode=None, history=None, splitter=None, remember=True):
+        llm.prompts.append(prompt)
+        llm.release.wait(5)
+        reply = f"Reply to {prompt}."
+        if not dynamic and remember:
+            callgod.response_cache.put_reply(prompt, reply)
+        return reply
+
+    monkeypatch.setattr(callgod, "fetch_chatgpt_reply", fetch)
+    monkeypatch.setattr(callgod, "speculations", {})
+    monkeypatch.setattr(callgod, "speculation_stats", dict.fromkeys(callgod.speculation_stats, 0))
+    yield llm
+    llm.release.set()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_one_speculative_call_in_flight_per_call(slow_llm):
+    callgod.speculate("CA1", "what is the")
+    wait_for(lambda: slow_llm.prompts)
+    callgod.speculate("CA1", "what is the meaning")
+    callgod.speculate("CA1", "what is the meaning of life")
+    time.sleep(0.1)
+    assert slow_llm.prompts == ["what is the"]
+
+    slow_llm.release.set()
+    wait_for(lambda: len(slow_llm.prompts) == 2)
+    assert slow_llm.prompts[1] == "what is the meaning of life"
+    assert callgod.claim_speculation("CA1", "What is the meaning of life?")["ai_response"] == \
+        "Reply to what is the meaning of life."
+
+
+def test_speculative_reply_is_cached_only_when_committed(slow_llm):
+    slow_llm.release.set()
+    callgod.speculate("CA2", "tell me a joke")
+    callgod.speculate("CA3", "tell me a story")
+    wait_for(lambda: all(spec["future"].done() for spec in callgod.speculations.values()))
+    assert callgod.response_cache.get_reply("tell me a joke") is None
+
+    assert callgod.claim_speculation("CA2", "tell me a joke about cats") is None
+    assert callgod.claim_speculation("CA3", "Tell me a story")["ai_response"] == "Reply to tell me a story."
+    assert callgod.response_cache.get_reply("tell me a story") == "Reply to tell me a story."
+    assert callgod.response_cache.get_reply("tell me a joke") is None
+
+
+def test_claim_gives_up_on_a_slow_speculation(slow_llm, monkeypatch):
+    monkeypatch.setattr(callgod, "SPECULATION_COMMIT_TIMEOUT", 0.1)
+    callgod.speculate("CA4", "how old is the universe")
+    wait_for(lambda: slow_llm.prompts)
+
+    start = time.time()
+    assert callgod.claim_speculation("CA4", "how old is the universe") is None
+    assert time.time() - start < 1
+    assert callgod.speculation_stats["timed_out"] == 1
+
+
+def test_canned_turn_drops_the_speculation(client, slow_llm, fake_tts, monkeypatch):
+    monkeypatch.setattr(callgod, "SPECULATIVE_MODE", True)
+    callgod.speculate("CA5", "what is the meaning of")
+    wait_for(lambda: slow_llm.prompts)
+
+    start = time.time()
+    client.post("/voice", data={"CallSid": "CA5", "SpeechResult": "switch to tom"})
+    assert time.time() - start < 1
+    assert "CA5" not in callgod.speculations
+    assert callgod.speculation_stats["cancelled"] == 1
+
+    callgod.speculate("CA5", "sing me a song")
+    client.post("/voice", data={"CallSid": "CA5", "SpeechResult": "sing me a song"})
+    assert "CA5" not in callgod.speculations
+    assert callgod.speculation_stats["cancelled"] == 2
@@ -0,0 +1,76 @@
+import hashlib
+import os
+
+import pytest
+
+import callgod
+
+
+@pytest.fixture
+def welcome_clip(store):
+    path = os.path.join(callgod.STATIC_DIR, "welcome.mp3")
+    with open(path, "wb") as clip_file:
+        clip_file.write(bytes(range(256)) * 4)
+    return path
+
+
+def test_static_serves_files_with_a_content_etag(client, welcome_clip):
+    response = client.get("/static/welcome.mp3")
+    with open(welcome_clip, "rb") as clip_file:
+        data = clip_file.read()
+    assert response.status_code == 200
+    assert response.data == data
+    assert response.headers["ETag"] == f'"{hashlib.sha256(data).hexdigest()}"'
+    assert response.headers["Cache-Control"] == f"public, max-age={callgod.STATIC_MAX_AGE}"
+
+    cached = client.get("/static/welcome.mp3", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+def test_static_serves_ranges(client, welcome_clip):
+    response = client.get("/static/welcome.mp3", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.data == bytes(range(10, 20))
+    assert response.headers["Content-Range"] == "bytes 10-19/1024"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_static_marks_store_clips_immutable(fetch_clip, fake_tts):
+    clip = callgod.audio_store.get_or_render("Let there be light.", "voice")
+    response = fetch_clip(clip)
+    name = os.path.splitext(os.path.basename(clip))[0]
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{name}"'
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_static_etag_follows_content_changes(store, welcome_clip):
+    first, immutable = callgod.static_etag(welcome_clip, (welcome_clip, 1, 1))
+    with open(welcome_clip, "wb") as clip_file:
+        clip_file.write(b"new welcome")
+    second, _ = callgod.static_etag(welcome_clip, (welcome_clip, 2, 2))
+    assert not immutable
+    assert first != second
+
+
+@pytest.mark.parametrize("path", ["/static/missing.mp3", "/static/../callgod.py", "/static/cached_responses"])
+def test_static_missing_or_outside_files(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_hot_clip_cache_admits_on_second_fetch(welcome_clip):
+    hot = callgod.HotClipCache(max_bytes=1500)
+    stat = os.stat(welcome_clip)
+    key = (welcome_clip, stat.st_size, stat.st_mtime_ns)
+
+    assert hot.get(key) is None  # One-off fetches stay on disk
+    assert hot.get(key) == bytes(range(256)) * 4
+    os.remove(welcome_clip)
+    assert hot.get(key) == bytes(range(256)) * 4  # Served from memory
+
+
+def test_static_hands_off_to_nginx(client, welcome_clip, monkeypatch):
+    monkeypatch.setattr(callgod, "STATIC_ACCEL_REDIRECT", "/internal-static")
+    response = client.get("/static/welcome.mp3")
+    assert response.headers["X-Accel-Redirect"] == "/internal-static/welcome.mp3"
+    assert response.data == b""
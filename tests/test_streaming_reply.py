@@ -0,0 +1,88 @@
+import callgod
+
+
+def test_split_clauses_merges_short_clauses():
+    text = "Yes, my child. The universe is vast, and you are part of it; rejoice!"
+    assert callgod.split_clauses(text) == [
+        "Yes, my child. The universe is vast,",
+        "and you are part of it;",
+        "rejoice!",
+    ]
+
+
+def test_clause_splitter_is_independent_of_how_text_is_fed():
+    text = "Yes, my child. The universe is vast, and you are part of it; rejoice!"
+    clauses = []
+    splitter = callgod.ClauseSplitter(clauses.append)
+    for index in range(0, len(text), 3):
+        splitter.feed(text[index:index + 3])
+    splitter.close()
+    assert clauses == callgod.split_clauses(text)
+
+
+def test_split_clauses_of_empty_text():
+    assert callgod.split_clauses("") == []
+
+
+class FakeTTSResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, text):
+        self.audio = f"audio:{text}".encode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size):
+        return [self.audio[index:index + chunk_size] for index in range(0, len(self.audio), chunk_size)]
+
+
+def test_local_playback_is_not_killed_by_later_renders(store, monkeypatch):
+    reply = "Peace be with you, my child, and with your little dog too."
+
+    def fetch(prompt, splitter=None, **kwargs):
+        splitter.feed(reply)
+        splitter.close()
+        return reply
+
+    commands = []
+    monkeypatch.setattr(callgod.os, "system", commands.append)
+    monkeypatch.setattr(callgod.tts_http, "post", lambda url, json, **kwargs: FakeTTSResponse(json["text"]))
+    monkeypatch.setattr(callgod, "fetch_chatgpt_reply", fetch)
+
+    files = callgod.handle_user_request("bless me", play=True)
+
+    assert len(files) == 2
+    assert commands == [f"mpg123 {path}" for path in files]
+
+
+def test_first_clause_is_queued_while_the_reply_streams(store, fake_tts, monkeypatch):
+    reply = "Yes, my child. The universe is vast, and you are part of it; rejoice!"
+    queue_chunk_render = callgod.queue_chunk_render
+    queued = []
+    queued_while_streaming = []
+
+    def queue(clause, *args, **kwargs):
+        queued.append(clause)
+        return queue_chunk_render(clause, *args, **kwargs)
+
+    def fetch(prompt, splitter=None, **kwargs):
+        for index in range(0, len(reply), 5):
+            splitter.feed(reply[index:index + 5])
+        queued_while_streaming.extend(queued)
+        splitter.close()
+        return reply
+
+    monkeypatch.setattr(callgod, "queue_chunk_render", queue)
+    monkeypatch.setattr(callgod, "fetch_chatgpt_reply", fetch)
+    timeline = callgod.ReplyTimeline()
+    ai_response, clips = callgod.stream_reply_audio("are you there", "voice", timeline=timeline)
+
+    assert ai_response == reply
+    assert clips == [callgod.audio_store.path_for(clause, "voice") for clause in callgod.split_clauses(reply)]
+    assert queued_while_streaming == callgod.split_clauses(reply)[:2]  # Only the last clause waited for the end
+    assert "first token" in timeline.as_dict() and "first audio" in timeline.as_dict()
@@ -0,0 +1,63 @@
+import glob
+import json
+import os
+
+import pytest
+
+import callgod
+
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(callgod, "TRACE_DIR", str(tmp_path / "traces"))
+    monkeypatch.setattr(callgod, "trace_files", {})
+    yield callgod.TRACE_DIR
+    for trace_file in callgod.trace_files.values():
+        trace_file.close()
+
+
+def read_traces(trace_dir):
+    traces = []
+    for path in glob.glob(os.path.join(trace_dir, "*.jsonl")):
+        with open(path) as trace_file:
+            traces.extend(json.loads(line) for line in trace_file)
+    return traces
+
+
+def test_voice_turns_are_traced(client, trace_dir, fake_llm, fake_tts):
+    form = {"CallSid": "CA1", "From": "+15550001111", "SpeechResult": "who made the stars"}
+    client.post("/voice", data=form)
+    client.post("/voice", data=form)
+
+    first, second = read_traces(trace_dir)
+    assert first["path"] == "/voice" and first["status"] == 200
+    assert first["form"] == {"CallSid": "CA1", "SpeechResult": "who made the stars"}  # No caller number
+    assert first["flags"]["TWILIO_AUDIO_FORMAT"] == callgod.TWILIO_AUDIO_FORMAT
+    assert {"kind": "intent", "intent": "chat", "dynamic": False}.items() <= first["events"][0].items()
+    cache_results = [(event["cache"], event["result"]) for event in second["events"] if event["kind"] == "cache"]
+    assert ("response", "hit") in cache_results
+
+
+def test_nothing_is_traced_without_trace_dir(client, fake_llm, fake_tts):
+    client.post("/voice", data={"CallSid": "CA1", "SpeechResult": "who made the stars"})
+    assert callgod.TRACE_DIR is None
+    assert callgod.trace_files == {}
+
+
+def test_recorded_traces_replay_through_voice(client, trace_dir, fake_llm, fake_tts, monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+    replay_traces = pytest.importorskip("replay_traces")
+    for question in ("who made the stars", "are you real"):
+        client.post("/voice", data={"CallSid": "CA1", "SpeechResult": question})
+    paths = glob.glob(os.path.join(trace_dir, "*.jsonl"))
+
+    traces = replay_traces.load_traces(paths)
+    assert [trace["form"]["SpeechResult"] for trace in traces] == ["who made the stars", "are you real"]
+    assert set(replay_traces.stub_settings(traces)) == {"openai_latency", "tts_latency", "tts_cps"}
+
+    monkeypatch.setattr(callgod, "TRACE_DIR", None)
+    fake_llm.clear()
+    callgod.response_cache.clear_memory()
+    replayed = replay_traces.replay(client, traces)
+    assert len(replayed) == 2
+    assert fake_llm == []  # Answered from the warm response cache the recording left behind
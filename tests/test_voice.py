@@ -0,0 +1,103 @@
+import os
+import re
+from concurrent.futures import Future
+
+import callgod
+
+PLAY = re.compile(r"<Play>([^<]+)</Play>")
+
+
+def played(response):
+    return PLAY.findall(response.get_data(as_text=True))
+
+
+def test_voice_greets_a_ringing_call(client):
+    response = client.post("/voice", data={"CallSid": "CA1", "CallStatus": "ringing"})
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert played(response) == [callgod.cache_url(os.path.join(callgod.CACHE_DIR, "welcome.mp3"))]
+    assert "<Gather" in body
+
+
+def test_voice_without_speech_plays_fallback(client):
+    response = client.post("/voice", data={"CallSid": "CA1", "CallStatus": "in-progress"})
+    assert played(response) == [callgod.cache_url(callgod.FALLBACK_FILE)]
+
+
+def test_voice_plays_the_rendered_reply(client, fake_llm, fake_tts):
+    response = client.post("/voice", data={"CallSid": "CA2", "SpeechResult": "What is the meaning of life"})
+    reply = "The answer to what is the meaning of life is within you."
+
+    assert response.status_code == 200
+    assert fake_llm == ["what is the meaning of life"]
+    assert fake_tts == [reply]
+    clip = callgod.audio_store.path_for(reply, callgod.current_voice)
+    assert played(response) == [callgod.cache_url(clip)]
+    assert callgod.get_session("CA2")["turns"] == 1
+
+    # The same question again is answered from the caches
+    client.post("/voice", data={"CallSid": "CA3", "SpeechResult": "what is the meaning of life?"})
+    assert len(fake_llm) == 1 and len(fake_tts) == 1
+
+
+def test_voice_falls_back_when_tts_fails(client, fake_llm, monkeypatch):
+    monkeypatch.setattr(callgod, "generate_tts_streaming", lambda *args, **kwargs: None)
+    response = client.post("/voice", data={"CallSid": "CA4", "SpeechResult": "tell me a secret"})
+    assert response.status_code == 200
+    assert played(response) == [callgod.cache_url(callgod.FALLBACK_FILE)]
+
+
+def test_async_voice_answers_before_the_reply_is_ready(client, fake_llm, fake_tts, monkeypatch):
+    monkeypatch.setattr(callgod, "ASYNC_VOICE_MODE", True)
+    response = client.post("/voice", data={"CallSid": "CA10", "SpeechResult": "who made the stars"})
+    body = response.get_data(as_text=True)
+    job_id = re.search(r"/voice/result/(\w+)", body).group(1)
+    assert "<Redirect" in body and "<Pause" in body
+
+    callgod.voice_jobs[job_id]["future"].result(5)
+    result = client.post(f"/voice/result/{job_id}", data={"CallSid": "CA10"})
+    reply = "The answer to who made the stars is within you."
+    assert played(result) == [callgod.cache_url(callgod.audio_store.path_for(reply, callgod.current_voice))]
+
+
+def add_job(job_id, future):
+    with callgod.voice_jobs_lock:
+        callgod.voice_jobs[job_id] = {"future": future, "created": 0.0, "polls": 0, "user_input": "hello"}
+
+
+def test_voice_result_redirects_while_the_job_runs(client):
+    future = Future()
+    add_job("running", future)
+    response = client.post("/voice/result/running", data={"CallSid": "CA5"})
+    body = response.get_data(as_text=True)
+    assert "<Redirect" in body and "/voice/result/running?polls=1" in body
+    assert callgod.voice_jobs["running"]["polls"] == 1
+    future.cancel()
+
+
+def test_voice_result_plays_the_finished_reply(client, fake_tts):
+    clip = callgod.audio_store.get_or_render("Be still.", "voice")
+    future = Future()
+    future.set_result({"ai_response": "Be still.", "audio_files": [clip], "chatgpt_latency": 0.1, "tts_latency": 0.1})
+    add_job("finished", future)
+
+    response = client.post("/voice/result/finished", data={"CallSid": "CA6"})
+    assert played(response) == [callgod.cache_url(clip)]
+    assert "finished" not in callgod.voice_jobs
+
+
+def test_voice_result_plays_fallback_when_the_job_failed(client):
+    future = Future()
+    future.set_exception(RuntimeError("render crashed"))
+    add_job("failed", future)
+
+    response = client.post("/voice/result/failed", data={"CallSid": "CA7"})
+    assert response.status_code == 200
+    assert played(response) == [callgod.cache_url(callgod.FALLBACK_FILE)]
+    assert "<Gather" in response.get_data(as_text=True)
+
+
+def test_voice_result_for_an_unknown_job(client):
+    response = client.post("/voice/result/nope", data={"CallSid": "CA8"})
+    assert response.status_code == 200
+    assert played(response) == [callgod.cache_url(callgod.FALLBACK_FILE)]